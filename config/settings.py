@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 import dj_database_url
 from dotenv import load_dotenv
@@ -29,6 +30,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'users.middleware.ServerTimingMiddleware', # Server-Timing y log de peticiones lentas
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware', # Para servir estáticos en Vercel
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -43,7 +45,7 @@ ROOT_URLCONF = 'config.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'users.metricas.PlantillasMedidas', # DjangoTemplates + medición de render
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -66,6 +68,11 @@ DATABASES = {
         conn_health_checks=True,
     )
 }
+# .iterator() usa cursores del lado del servidor; el pooler de Neon (PgBouncer
+# en modo transacción, host con "-pooler") no los soporta
+DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = os.environ.get(
+    'DISABLE_SERVER_SIDE_CURSORS', str('-pooler' in os.environ.get('DATABASE_URL', ''))
+) == 'True'
 
 # 6. Configuración Regional
 LANGUAGE_CODE = 'es-mx'
@@ -106,4 +113,94 @@ MEDIA_URL = '/media/'
 AUTH_USER_MODEL = 'users.Evaluador'
 LOGIN_URL = 'users:login'
 LOGOUT_REDIRECT_URL = 'users:login'
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
\ No newline at end of file
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# 10. Rendimiento de Constancias
+# Número máximo de imágenes procesadas (fondo y firmas) que se guardan en memoria
+CONSTANCIAS_CACHE_IMAGENES_MAX = int(os.environ.get('CONSTANCIAS_CACHE_IMAGENES_MAX', 32))
+# En lotes, renderiza el diseño común una vez por grupo y estampa solo nombre y código
+CONSTANCIAS_MODO_PLANTILLA = os.environ.get('CONSTANCIAS_MODO_PLANTILLA', 'True') == 'True'
+# PDFs ya generados: alias de STORAGES donde guardarlos (ej. 'default') o, si no hay, carpeta local
+CONSTANCIAS_ALMACEN_PDF_STORAGE = os.environ.get('CONSTANCIAS_ALMACEN_PDF_STORAGE') or None
+CONSTANCIAS_ALMACEN_PDF_DIR = os.environ.get(
+    'CONSTANCIAS_ALMACEN_PDF_DIR', os.path.join(tempfile.gettempdir(), 'constancias_pdf')
+)
+# Procesos para renderizar lotes de PDFs en paralelo (1 = sin pool, todo dentro de la petición)
+CONSTANCIAS_PROCESOS_PDF = int(os.environ.get('CONSTANCIAS_PROCESOS_PDF', 1))
+CONSTANCIAS_PDF_POR_BLOQUE = int(os.environ.get('CONSTANCIAS_PDF_POR_BLOQUE', 25))
+# Descargas de firmas (Cloudinary): timeouts en segundos, reintentos y descargas simultáneas por lote
+CONSTANCIAS_HTTP_TIMEOUT_CONEXION = float(os.environ.get('CONSTANCIAS_HTTP_TIMEOUT_CONEXION', 3.05))
+CONSTANCIAS_HTTP_TIMEOUT_LECTURA = float(os.environ.get('CONSTANCIAS_HTTP_TIMEOUT_LECTURA', 10))
+CONSTANCIAS_HTTP_REINTENTOS = int(os.environ.get('CONSTANCIAS_HTTP_REINTENTOS', 3))
+CONSTANCIAS_HTTP_BACKOFF = float(os.environ.get('CONSTANCIAS_HTTP_BACKOFF', 0.3))
+CONSTANCIAS_HTTP_BACKOFF_MAX = float(os.environ.get('CONSTANCIAS_HTTP_BACKOFF_MAX', 2))
+CONSTANCIAS_DESCARGAS_CONCURRENTES = int(os.environ.get('CONSTANCIAS_DESCARGAS_CONCURRENTES', 8))
+# Firmas descargadas (bytes sin procesar) que se guardan por proceso para pedirlas con If-None-Match (0 = ninguna)
+CONSTANCIAS_HTTP_COPIAS_MAX = int(os.environ.get('CONSTANCIAS_HTTP_COPIAS_MAX', 16))
+
+# 11. Trabajos en Segundo Plano (python manage.py run_workers)
+# True = se ejecutan dentro de la misma petición (útil si no hay workers corriendo)
+CONSTANCIAS_TRABAJOS_SINCRONOS = os.environ.get('CONSTANCIAS_TRABAJOS_SINCRONOS', 'False') == 'True'
+# Dónde se guardan los ZIP generados: alias de STORAGES o carpeta compartida con los workers
+CONSTANCIAS_TRABAJOS_STORAGE = os.environ.get('CONSTANCIAS_TRABAJOS_STORAGE') or None
+CONSTANCIAS_TRABAJOS_DIR = os.environ.get(
+    'CONSTANCIAS_TRABAJOS_DIR', os.path.join(tempfile.gettempdir(), 'constancias_trabajos')
+)
+# Segundos sin latido tras los cuales un trabajo "en proceso" se vuelve a encolar
+CONSTANCIAS_TRABAJOS_TIMEOUT = int(os.environ.get('CONSTANCIAS_TRABAJOS_TIMEOUT', 600))
+# Hasta cuántas constancias se descargan en ZIP directo; arriba de eso se encola
+CONSTANCIAS_ZIP_DIRECTO_MAX = int(os.environ.get('CONSTANCIAS_ZIP_DIRECTO_MAX', 50))
+# Límite de correos por segundo en envíos masivos (0 = sin límite) y PDFs listos en espera de envío
+CONSTANCIAS_CORREOS_POR_SEGUNDO = float(os.environ.get('CONSTANCIAS_CORREOS_POR_SEGUNDO', 0))
+CONSTANCIAS_CORREOS_EN_COLA = int(os.environ.get('CONSTANCIAS_CORREOS_EN_COLA', 8))
+# Horas que se guarda un reporte de webinar sin confirmar y asistentes insertados por bloque
+CONSTANCIAS_IMPORTACION_WEBINAR_HORAS = int(os.environ.get('CONSTANCIAS_IMPORTACION_WEBINAR_HORAS', 24))
+CONSTANCIAS_IMPORTACION_BLOQUE = int(os.environ.get('CONSTANCIAS_IMPORTACION_BLOQUE', 500))
+# Filas que se traen de la base por vuelta al exportar a CSV / Excel
+CONSTANCIAS_EXPORTAR_BLOQUE = int(os.environ.get('CONSTANCIAS_EXPORTAR_BLOQUE', 2000))
+# Hasta cuántas filas se arma el Excel en la petición; arriba de eso se encola
+CONSTANCIAS_EXPORTAR_XLSX_DIRECTO_MAX = int(os.environ.get('CONSTANCIAS_EXPORTAR_XLSX_DIRECTO_MAX', 5000))
+
+# 12. Métricas de Rendimiento (encabezado Server-Timing y log estructurado)
+CONSTANCIAS_METRICAS_ACTIVAS = os.environ.get('CONSTANCIAS_METRICAS_ACTIVAS', 'True') == 'True'
+# Peticiones/trabajos que tarden más que esto (ms) se guardan para verlos en /rendimiento/lentas/
+CONSTANCIAS_UMBRAL_LENTO_MS = float(os.environ.get('CONSTANCIAS_UMBRAL_LENTO_MS', 1000))
+CONSTANCIAS_PETICIONES_LENTAS_MAX = int(os.environ.get('CONSTANCIAS_PETICIONES_LENTAS_MAX', 100))
+
+# 13. Caché y Límites de las Páginas Públicas (buscador y descarga de constancias)
+# Por defecto, memoria local de cada proceso; p. ej. CONSTANCIAS_CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache
+# con CONSTANCIAS_CACHE_LOCATION=constancias_cache (y manage.py createcachetable) para compartirla entre instancias
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CONSTANCIAS_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('CONSTANCIAS_CACHE_LOCATION', 'constancias'),
+    }
+}
+CONSTANCIAS_CACHE_ALIAS = 'default'
+# Segundos que se guarda el resultado de una búsqueda por correo (0 = sin caché)
+CONSTANCIAS_BUSCADOR_CACHE_SEGUNDOS = int(os.environ.get('CONSTANCIAS_BUSCADOR_CACHE_SEGUNDOS', 120))
+# Peticiones por minuto y por IP (0 = sin límite); detrás de Vercel la IP viene en X-Forwarded-For
+CONSTANCIAS_LIMITE_BUSQUEDAS_POR_MINUTO = int(os.environ.get('CONSTANCIAS_LIMITE_BUSQUEDAS_POR_MINUTO', 20))
+CONSTANCIAS_LIMITE_DESCARGAS_POR_MINUTO = int(os.environ.get('CONSTANCIAS_LIMITE_DESCARGAS_POR_MINUTO', 60))
+CONSTANCIAS_IP_ENCABEZADO = os.environ.get('CONSTANCIAS_IP_ENCABEZADO', 'HTTP_X_FORWARDED_FOR' if os.environ.get('VERCEL') else '')
+
+# 14. Dashboard: segundos que se guardan los conteos de vencimientos y renglones por página de cada lista
+CONSTANCIAS_TABLERO_CACHE_SEGUNDOS = int(os.environ.get('CONSTANCIAS_TABLERO_CACHE_SEGUNDOS', 60))
+CONSTANCIAS_TABLERO_POR_PAGINA = int(os.environ.get('CONSTANCIAS_TABLERO_POR_PAGINA', 10))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        # Una línea JSON por petición/trabajo; WARNING en producción para silenciarlas
+        'users.metricas': {
+            'handlers': ['console'],
+            'level': os.environ.get('CONSTANCIAS_METRICAS_LOG_NIVEL', 'INFO'),
+            'propagate': False,
+        },
+        'users': {'handlers': ['console'], 'level': 'WARNING'},
+    },
+}
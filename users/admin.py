@@ -1,6 +1,15 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
 from django.contrib.auth.admin import UserAdmin
-from .models import Evaluador, Curso, Participante, Constancia,Institucion,EncuestaRespuesta,LeadVenta
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import reverse
+from .emision import emitir_lote
+from .forms import EmisionLoteForm
+from .trabajos import encolar
+from .paginacion import PaginadorEstimado
+from .zip_streaming import zip_constancias
+from .models import Evaluador, Curso, Participante, Constancia,Institucion,EncuestaRespuesta,LeadVenta,Trabajo,EnvioCorreo
 
 @admin.register(Evaluador)
 class EvaluadorAdmin(UserAdmin):
@@ -27,14 +36,49 @@ class CursoAdmin(admin.ModelAdmin):
 @admin.register(Participante)
 class ParticipanteAdmin(admin.ModelAdmin):
     list_display = ('nombre_completo', 'email', 'titulo','institucion')
-    search_fields = ('nombre_completo', 'email','institucion')
+    search_fields = ('nombre_completo', 'email','institucion__nombre')
+    list_select_related = ('institucion',)
+    autocomplete_fields = ('institucion',)
+    # Con cientos de miles de filas el conteo total de cada búsqueda cuesta más que la página
+    show_full_result_count = False
+    paginator = PaginadorEstimado
+    actions = ['emitir_constancias']
+
+    @admin.action(description='Emitir constancias de un curso a los seleccionados')
+    def emitir_constancias(self, request, queryset):
+        # Primero se muestra el formulario del curso; al confirmarlo se emite
+        form = EmisionLoteForm(request.POST if 'aplicar' in request.POST else None)
+        if form.is_valid():
+            try:
+                creadas, omitidas = emitir_lote(participantes=queryset.values_list('pk', flat=True), **form.cleaned_data)
+            except Evaluador.DoesNotExist:
+                self.message_user(request, "No se ha designado un gerente en el sistema.", messages.ERROR)
+                return None
+            self.message_user(request, f"Se crearon {creadas} constancias; {omitidas} participantes ya la tenían.")
+            return None
+        return TemplateResponse(request, 'admin/users/participante/emitir_constancias.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Emitir constancias',
+            'form': form,
+            'participantes': queryset,
+            'opts': self.model._meta,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
 
 @admin.register(Constancia)
 class ConstanciaAdmin(admin.ModelAdmin):
     list_display = ('participante', 'curso', 'fecha_inicio', 'fecha_termino', 'fecha_emision')
-    search_fields = ('participante__nombre_completo', 'curso__nombre')
-    list_filter = ('fecha_emision', 'curso', 'firma_gerente', 'firma_especialista')
+    search_fields = ('participante__nombre_completo', 'participante__email', 'curso__nombre', '=codigo_verificacion')
+    # Filtros por FK listarían cada curso y evaluador en la barra lateral; para eso está la búsqueda
+    list_filter = ('fecha_emision', 'es_webinar')
+    list_select_related = ('participante', 'curso')
+    # Buscadores en lugar de listas desplegables con todas las filas
+    autocomplete_fields = ('participante', 'curso', 'firma_gerente', 'firma_especialista')
+    show_full_result_count = False
+    paginator = PaginadorEstimado
+    date_hierarchy = 'fecha_emision'
     readonly_fields = ('fecha_emision', 'codigo_verificacion','token_encuesta')
+    actions = ['descargar_zip', 'enviar_por_correo']
     
     def get_changeform_initial_data(self, request):
         try:
@@ -42,12 +86,26 @@ class ConstanciaAdmin(admin.ModelAdmin):
             return {'firma_gerente': gerente}
         except Evaluador.DoesNotExist:
             return {}
+
+    @admin.action(description='Descargar en ZIP las constancias seleccionadas')
+    def descargar_zip(self, request, queryset):
+        ids = list(queryset.values_list('pk', flat=True))
+        return zip_constancias(request, ids, reverse('admin:users_constancia_changelist'))
+
+    @admin.action(description='Enviar por correo las constancias seleccionadas')
+    def enviar_por_correo(self, request, queryset):
+        ids = list(queryset.values_list('pk', flat=True))
+        trabajo = encolar(Trabajo.TIPO_CORREO, {'ids': ids}, request.user, total=len(ids))
+        return redirect('users:trabajo', pk=trabajo.pk)
         
 @admin.register(EncuestaRespuesta)
 class EncuestaRespuestaAdmin(admin.ModelAdmin):
     list_display = ('nombre_completo', 'email', 'fecha_respuesta', 'interes_productos')
     list_filter = ('interes_productos', 'fecha_respuesta')
     search_fields = ('nombre_completo', 'email', 'constancia__curso__nombre')
+    show_full_result_count = False
+    paginator = PaginadorEstimado
+    date_hierarchy = 'fecha_respuesta'
     # Hacemos todos los campos de solo lectura para evitar modificaciones accidentales
     readonly_fields = [f.name for f in EncuestaRespuesta._meta.fields]
 
@@ -58,21 +116,50 @@ class EncuestaRespuestaAdmin(admin.ModelAdmin):
 class LeadVentaAdmin(admin.ModelAdmin):
     list_display = ('get_participante_nombre', 'get_participante_email', 'get_curso_nombre', 'fecha_creacion')
     search_fields = ('participante__nombre_completo', 'participante__email', 'curso__nombre')
-    list_filter = ('fecha_creacion', 'curso')
+    list_filter = ('fecha_creacion',)
+    list_select_related = ('participante', 'curso')
+    show_full_result_count = False
+    paginator = PaginadorEstimado
+    date_hierarchy = 'fecha_creacion'
     readonly_fields = ('participante', 'curso', 'fecha_creacion')
 
     def has_add_permission(self, request):
         return False
 
     # Funciones para mostrar datos de los modelos relacionados
-    @admin.display(description='Nombre del Participante')
+    @admin.display(description='Nombre del Participante', ordering='participante__nombre_completo')
     def get_participante_nombre(self, obj):
         return obj.participante.nombre_completo
 
-    @admin.display(description='Email del Participante')
+    @admin.display(description='Email del Participante', ordering='participante__email')
     def get_participante_email(self, obj):
         return obj.participante.email
 
-    @admin.display(description='Curso de Interés')
+    @admin.display(description='Curso de Interés', ordering='curso__nombre')
     def get_curso_nombre(self, obj):
-        return obj.curso.nombre
\ No newline at end of file
+        return obj.curso.nombre
+
+@admin.register(Trabajo)
+class TrabajoAdmin(admin.ModelAdmin):
+    list_display = ('pk', 'tipo', 'estado', 'progreso', 'total', 'creado_por', 'fecha_creacion', 'fecha_fin')
+    list_filter = ('estado', 'tipo')
+    list_select_related = ('creado_por',)
+    readonly_fields = ('fecha_creacion', 'fecha_inicio', 'fecha_fin', 'latido', 'worker')
+    actions = ['reencolar']
+
+    @admin.action(description='Volver a encolar los trabajos seleccionados')
+    def reencolar(self, request, queryset):
+        actualizados = queryset.exclude(estado=Trabajo.EN_PROCESO).update(
+            estado=Trabajo.PENDIENTE, progreso=0, mensaje='', errores='', worker=''
+        )
+        self.message_user(request, f"Se volvieron a encolar {actualizados} trabajos.")
+
+
+@admin.register(EnvioCorreo)
+class EnvioCorreoAdmin(admin.ModelAdmin):
+    list_display = ('email', 'lote', 'estado', 'intentos', 'fecha_envio')
+    list_filter = ('estado',)
+    search_fields = ('email', 'lote')
+    show_full_result_count = False
+    paginator = PaginadorEstimado
+    raw_id_fields = ('constancia',)
@@ -0,0 +1,143 @@
+# users/almacen_pdf.py
+"""
+Almacén de PDFs ya generados, direccionado por contenido.
+
+La clave es un hash de todo lo que lee `pdf/constancia_template.html`
+(participante, curso, fechas, firmantes y versión de cada firma), así que
+editar un participante o cambiar una firma produce otra clave y el PDF
+viejo simplemente deja de usarse.
+"""
+import hashlib
+import json
+import os
+import threading
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage, storages
+from django.template.loader import get_template
+
+from .pdf import TEMPLATE_CONSTANCIA, _generar_pdf_bytes, _ruta_fondo
+from .render_paralelo import generar_pdfs_paralelo
+
+_storage = None
+_version_diseno = None
+_locks = [threading.Lock() for _ in range(32)]
+
+
+def _almacen():
+    """
+    Usa el alias de STORAGES configurado en CONSTANCIAS_ALMACEN_PDF_STORAGE,
+    o una carpeta local si no hay ninguno.
+    """
+    global _storage
+    if _storage is None:
+        alias = getattr(settings, 'CONSTANCIAS_ALMACEN_PDF_STORAGE', None)
+        if alias:
+            _storage = storages[alias]
+        else:
+            _storage = FileSystemStorage(location=settings.CONSTANCIAS_ALMACEN_PDF_DIR)
+    return _storage
+
+
+def _version():
+    """
+    Huella del diseño: si cambia el template o el fondo, cambian todas las claves.
+    """
+    global _version_diseno
+    if _version_diseno is None:
+        h = hashlib.sha256(get_template(TEMPLATE_CONSTANCIA).template.source.encode('utf-8'))
+        try:
+            fondo = os.stat(_ruta_fondo())
+            h.update(f"{fondo.st_size}:{fondo.st_mtime_ns}".encode())
+        except OSError:
+            pass
+        _version_diseno = h.hexdigest()
+    return _version_diseno
+
+
+def clave_pdf(constancia):
+    def firmante(evaluador):
+        if not evaluador:
+            return None
+        return [evaluador.get_full_name(), evaluador.cargo, evaluador.firma_digital.name or '']
+
+    datos = {
+        'diseno': _version(),
+        'participante': constancia.participante.nombre_completo,
+        'codigo': constancia.codigo_verificacion,
+        'curso': constancia.curso.nombre,
+        'fecha_inicio': str(constancia.fecha_inicio),
+        'fecha_termino': str(constancia.fecha_termino),
+        'duracion': str(constancia.duracion_en_horas),
+        'gerente': firmante(constancia.firma_gerente),
+        'especialista': firmante(constancia.firma_especialista),
+    }
+    return hashlib.sha256(json.dumps(datos, sort_keys=True).encode('utf-8')).hexdigest()
+
+
+def _nombre_archivo(clave):
+    return f"constancias/{clave[:2]}/{clave}.pdf"
+
+
+def abrir_pdf_constancia(constancia):
+    """
+    Regresa el PDF como archivo abierto (para FileResponse), generándolo y
+    guardándolo solo si todavía no existe. Regresa None si el render falla.
+    """
+    storage = _almacen()
+    clave = clave_pdf(constancia)
+    nombre = _nombre_archivo(clave)
+
+    if storage.exists(nombre):
+        return storage.open(nombre, 'rb')
+
+    # Evita que varias peticiones simultáneas del mismo PDF lo rendericen a la vez
+    with _locks[int(clave[:8], 16) % len(_locks)]:
+        if not storage.exists(nombre):
+            pdf_bytes = _generar_pdf_bytes(constancia)
+            if not pdf_bytes:
+                return None
+            _guardar(storage, nombre, pdf_bytes)
+    return storage.open(nombre, 'rb')
+
+
+def validadores_pdf(constancia):
+    """
+    (etag, fecha de modificación o None) del PDF de la constancia, sin
+    generarlo. La clave ya cambia con cualquier dato que se imprime, así que
+    sirve como ETag.
+    """
+    clave = clave_pdf(constancia)
+    try:
+        modificado = _almacen().get_modified_time(_nombre_archivo(clave))
+    except (NotImplementedError, OSError):
+        # Todavía no se genera, o el storage (p. ej. Cloudinary) no da la fecha
+        modificado = None
+    # Débil: un PDF regenerado con los mismos datos no es idéntico byte a byte
+    return f'W/"{clave}"', modificado
+
+
+def _guardar(storage, nombre, pdf_bytes):
+    guardado = storage.save(nombre, ContentFile(pdf_bytes))
+    if guardado != nombre:
+        # Otro proceso lo guardó primero; el contenido es el mismo
+        storage.delete(guardado)
+
+
+def prerenderizar_constancias(constancias):
+    """
+    Genera y guarda de antemano los PDFs que aún no están en el almacén
+    (p. ej. justo después de emitir un webinar). Regresa (guardados, errores),
+    donde errores es una lista de (constancia, motivo).
+    """
+    storage = _almacen()
+    faltantes = [c for c in constancias if not storage.exists(_nombre_archivo(clave_pdf(c)))]
+    guardados, errores = 0, []
+    for constancia, pdf_bytes, error in generar_pdfs_paralelo(faltantes):
+        if error:
+            errores.append((constancia, error))
+            continue
+        _guardar(storage, _nombre_archivo(clave_pdf(constancia)), pdf_bytes)
+        guardados += 1
+    return guardados, errores
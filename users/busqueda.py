@@ -0,0 +1,63 @@
+# users/busqueda.py
+"""
+Búsqueda de texto libre en constancias y participantes.
+
+Se usa `icontains`, que Django traduce a `UPPER(campo) LIKE UPPER('%texto%')`.
+En Postgres las migraciones 0007 y 0008 crean índices de trigramas (pg_trgm) sobre
+UPPER(campo), así que esa misma condición se resuelve con el índice en lugar
+de recorrer la tabla; en SQLite es un recorrido normal, suficiente en local.
+"""
+from django.db.models import Q
+
+from .models import Constancia, Curso, Institucion, Participante
+
+
+def filtro_participantes(texto):
+    """Q que busca `texto` en nombre o correo del participante."""
+    return Q(nombre_completo__icontains=texto) | Q(email__icontains=texto)
+
+
+def buscar_participantes(queryset, texto):
+    """
+    Filtra `queryset` (de Participante) por nombre, correo o nombre de la
+    institución; las instituciones se resuelven aparte por la misma razón
+    que en `buscar_en_constancias`.
+    """
+    instituciones = Institucion.objects.filter(nombre__icontains=texto).values('pk')
+    return queryset.filter(filtro_participantes(texto) | Q(institucion__in=instituciones))
+
+
+def buscar_en_constancias(queryset, texto):
+    """
+    Filtra `queryset` (de Constancia) por nombre o correo del participante,
+    nombre del curso o código de verificación.
+
+    Participantes y cursos se buscan por separado, cada uno con su índice,
+    y la constancia solo compara contra esos IDs: un OR entre columnas de
+    tablas distintas unidas por JOIN no puede usar ningún índice.
+    """
+    participantes = Participante.objects.filter(filtro_participantes(texto)).values('pk')
+    cursos = Curso.objects.filter(nombre__icontains=texto).values('pk')
+    return queryset.filter(
+        Q(participante__in=participantes)
+        | Q(curso__in=cursos)
+        | Q(codigo_verificacion=texto.upper())
+    )
+
+
+def filtrar_constancias(parametros, queryset=None):
+    """
+    Aplica a `queryset` (por defecto todas las constancias) los filtros del
+    historial: `tipo` ('webinar' o 'curso') y `q`. Lo comparten el
+    historial y las exportaciones para que exporten lo mismo que se ve.
+    """
+    queryset = Constancia.objects.all() if queryset is None else queryset
+    tipo = parametros.get('tipo')
+    if tipo == 'webinar':
+        queryset = queryset.filter(es_webinar=True)
+    elif tipo == 'curso':
+        queryset = queryset.filter(es_webinar=False)
+    busqueda = parametros.get('q', '').strip()
+    if busqueda:
+        queryset = buscar_en_constancias(queryset, busqueda)
+    return queryset
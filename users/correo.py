@@ -0,0 +1,150 @@
+# users/correo.py
+"""
+Envío masivo de constancias por correo.
+
+Todo el lote sale por una sola conexión del backend de correo, los PDFs se
+generan en un hilo aparte mientras se envían los anteriores, se respeta un
+límite de mensajes por segundo y cada destinatario queda registrado en
+`EnvioCorreo`, así que un lote interrumpido se puede retomar sin duplicados.
+"""
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection
+from django.db.models import F
+from django.utils import timezone
+
+from .metricas import contexto_actual, medir
+from .models import EnvioCorreo
+from .render_paralelo import generar_pdfs_paralelo
+
+_FIN = object()
+
+
+def _mensaje(constancia, pdf_content, conexion):
+    # Configurar el correo
+    subject = f"Constancia: {constancia.curso.nombre}"
+    body = f"Hola {constancia.participante.nombre_completo},\n\nAdjuntamos tu constancia de participación.\n\nSaludos."
+
+    email = EmailMessage(
+        subject,
+        body,
+        settings.DEFAULT_FROM_EMAIL,
+        [constancia.participante.email],
+        connection=conexion,
+    )
+
+    filename = f"Constancia_{constancia.participante.nombre_completo}.pdf"
+    email.attach(filename, pdf_content, 'application/pdf')
+    return email
+
+
+def _renderizar_en_hilo(constancias, cola):
+    """Llena la cola con (constancia, pdf, error); se bloquea si el envío va más lento."""
+    try:
+        for resultado in generar_pdfs_paralelo(constancias):
+            cola.put(resultado)
+    except Exception as e:
+        cola.put(e)
+    finally:
+        cola.put(_FIN)
+        db_connection.close()
+
+
+class _Limitador:
+    """Espacia los envíos para no pasar de `por_segundo` mensajes por segundo."""
+
+    def __init__(self, por_segundo):
+        self.intervalo = 1.0 / por_segundo if por_segundo else 0
+        self._siguiente = time.monotonic()
+
+    def esperar(self):
+        if not self.intervalo:
+            return
+        ahora = time.monotonic()
+        if ahora < self._siguiente:
+            time.sleep(self._siguiente - ahora)
+        self._siguiente = max(ahora, self._siguiente) + self.intervalo
+
+
+def enviar_constancias_por_correo(constancias, al_avanzar=None, lote=None):
+    """
+    Genera y envía por correo la constancia de cada participante.
+    `lote` identifica el envío para poder retomarlo; las constancias que ya
+    figuran como enviadas en ese lote se saltan. `al_avanzar(procesadas)` se
+    llama después de cada constancia. Regresa (enviados, errores).
+    """
+    lote = lote or f"envio-{timezone.now():%Y%m%d%H%M%S%f}"
+    con_email = [c for c in constancias if c.participante.email]
+
+    EnvioCorreo.objects.bulk_create(
+        [EnvioCorreo(lote=lote, constancia=c, email=c.participante.email) for c in con_email],
+        ignore_conflicts=True,
+    )
+    ya_enviadas = set(
+        EnvioCorreo.objects.filter(lote=lote, estado=EnvioCorreo.ENVIADO).values_list('constancia_id', flat=True)
+    )
+    pendientes = [c for c in con_email if c.pk not in ya_enviadas]
+
+    procesadas = len(con_email) - len(pendientes)
+    if al_avanzar and procesadas:
+        al_avanzar(procesadas)
+
+    cola = queue.Queue(maxsize=getattr(settings, 'CONSTANCIAS_CORREOS_EN_COLA', 8))
+    # El hilo hereda el contexto para que sus tiempos de render también se midan
+    hilo = threading.Thread(
+        target=contexto_actual().run, args=(_renderizar_en_hilo, pendientes, cola), daemon=True
+    )
+    hilo.start()
+
+    limitador = _Limitador(getattr(settings, 'CONSTANCIAS_CORREOS_POR_SEGUNDO', 0))
+    enviados = 0
+    errores = []
+    conexion = get_connection()
+    try:
+        conexion.open()
+        while True:
+            resultado = cola.get()
+            if resultado is _FIN:
+                break
+            if isinstance(resultado, Exception):
+                raise resultado
+            constancia, pdf_content, error = resultado
+            envio = EnvioCorreo.objects.filter(lote=lote, constancia=constancia)
+
+            if error:
+                errores.append(f"Constancia {constancia.pk}: no se pudo generar el PDF. {error}")
+                envio.update(estado=EnvioCorreo.FALLIDO, error=error)
+            else:
+                limitador.esperar()
+                try:
+                    with medir('correo'):
+                        conexion.send_messages([_mensaje(constancia, pdf_content, conexion)])
+                except Exception as e:
+                    errores.append(f"Error enviando a {constancia.participante.email}: {e}")
+                    envio.update(estado=EnvioCorreo.FALLIDO, error=str(e), intentos=F('intentos') + 1)
+                    # La conexión pudo quedar inservible; se abre otra para el resto del lote
+                    conexion.close()
+                    conexion.open()
+                else:
+                    enviados += 1
+                    envio.update(
+                        estado=EnvioCorreo.ENVIADO, error='', intentos=F('intentos') + 1, fecha_envio=timezone.now()
+                    )
+
+            procesadas += 1
+            if al_avanzar:
+                al_avanzar(procesadas)
+    finally:
+        conexion.close()
+        # Si salimos antes de tiempo, vaciamos la cola para que el hilo pueda terminar
+        while hilo.is_alive():
+            try:
+                cola.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+    return enviados, errores
@@ -0,0 +1,135 @@
+# users/descargas.py
+"""
+Descarga de archivos remotos (firmas en Cloudinary).
+
+Cada proceso mantiene una sola `requests.Session` con su pool de conexiones,
+así las firmas de un lote reutilizan la misma conexión TLS. Todas las
+peticiones llevan timeout de conexión y de lectura, se reintentan con
+espera acotada ante errores temporales y, si ya tenemos una copia, se piden
+de forma condicional (ETag / If-Modified-Since) para no volver a bajarlas.
+
+`requests` se importa dentro de las funciones para que no cueste en el
+arranque de las peticiones que nunca descargan nada.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+from .imagenes import CacheImagenes
+from .metricas import medir
+
+logger = logging.getLogger(__name__)
+
+_sesion = None
+_sesion_pid = None
+_sesion_lock = threading.Lock()
+
+# Copias de lo ya descargado, con sus validadores, para las peticiones condicionales
+copias = CacheImagenes(max_entradas=getattr(settings, 'CONSTANCIAS_HTTP_COPIAS_MAX', 16))
+
+
+def _config(nombre, por_defecto):
+    return getattr(settings, nombre, por_defecto)
+
+
+def sesion():
+    """
+    La `requests.Session` del proceso. Si el proceso se bifurcó, la del padre
+    no se comparte (sus sockets no sirven en el hijo) y se crea otra.
+    """
+    global _sesion, _sesion_pid
+    with _sesion_lock:
+        if _sesion is None or _sesion_pid != os.getpid():
+            _sesion = _crear_sesion()
+            _sesion_pid = os.getpid()
+        return _sesion
+
+
+def _crear_sesion():
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.util.retry import Retry
+
+    reintentos = Retry(
+        total=_config('CONSTANCIAS_HTTP_REINTENTOS', 3),
+        backoff_factor=_config('CONSTANCIAS_HTTP_BACKOFF', 0.3),
+        backoff_max=_config('CONSTANCIAS_HTTP_BACKOFF_MAX', 2),
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=('GET',),
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+    conexiones = _config('CONSTANCIAS_DESCARGAS_CONCURRENTES', 8)
+    adaptador = HTTPAdapter(max_retries=reintentos, pool_connections=conexiones, pool_maxsize=conexiones)
+    nueva = requests.Session()
+    nueva.mount('http://', adaptador)
+    nueva.mount('https://', adaptador)
+    return nueva
+
+
+def _timeout():
+    return (
+        _config('CONSTANCIAS_HTTP_TIMEOUT_CONEXION', 3.05),
+        _config('CONSTANCIAS_HTTP_TIMEOUT_LECTURA', 10),
+    )
+
+
+def descargar(url):
+    """
+    Regresa el contenido de la URL, o None si no se pudo obtener (error de
+    red, timeout o respuesta distinta de 200/304).
+    """
+    import requests
+
+    clave = ('url', url)
+    copia = copias.obtener(clave)
+    encabezados = {}
+    if copia is not None:
+        etag, modificado, _ = copia
+        if etag:
+            encabezados['If-None-Match'] = etag
+        if modificado:
+            encabezados['If-Modified-Since'] = modificado
+
+    try:
+        response = sesion().get(url, headers=encabezados, timeout=_timeout())
+    except requests.RequestException as e:
+        logger.warning("No se pudo descargar %s: %s", url, e)
+        return None
+
+    if response.status_code == 304 and copia is not None:
+        return copia[2]
+    if response.status_code != 200:
+        logger.warning("Descarga de %s respondió %s", url, response.status_code)
+        return None
+
+    etag = response.headers.get('ETag')
+    modificado = response.headers.get('Last-Modified')
+    if etag or modificado:
+        copias.guardar(clave, (etag, modificado, response.content))
+    return response.content
+
+
+def precargar_firmas(constancias):
+    """
+    Procesa de una vez, en paralelo, las firmas distintas de un lote para que
+    el render las encuentre en `cache_imagenes` en lugar de descargarlas una
+    por una a mitad del lote.
+    """
+    from .imagenes import _imagen_a_base64
+
+    firmas = {}
+    for constancia in constancias:
+        for evaluador in (constancia.firma_gerente, constancia.firma_especialista):
+            if evaluador and evaluador.firma_digital:
+                firmas.setdefault(evaluador.firma_digital.name, evaluador.firma_digital)
+    if len(firmas) <= 1:
+        # Con una sola firma no hay nada que traslapar; el render la procesa al usarla
+        return
+
+    hilos = min(len(firmas), _config('CONSTANCIAS_DESCARGAS_CONCURRENTES', 8))
+    with medir('imagen'), ThreadPoolExecutor(max_workers=hilos, thread_name_prefix='firmas') as executor:
+        list(executor.map(_imagen_a_base64, firmas.values()))
@@ -0,0 +1,94 @@
+# users/emision.py
+"""
+Piezas comunes para emitir constancias en lote.
+"""
+import uuid
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+from django.db import transaction
+
+from .models import Constancia, Evaluador
+from .publico import invalidar_participantes
+from .tablero import invalidar_tablero
+
+# Un choque de 8 caracteres hexadecimales es rarísimo; esto solo evita un ciclo infinito
+MAX_INTENTOS_CODIGOS = 5
+
+
+def nuevo_codigo():
+    return str(uuid.uuid4()).split('-')[0].upper()
+
+
+def generar_codigos(cantidad):
+    """
+    Regresa `cantidad` códigos de verificación distintos entre sí y que no
+    existen en la tabla. Se verifican todos con una sola consulta (más una
+    por cada ronda extra si llegara a haber choques).
+    """
+    codigos = set()
+    for _ in range(MAX_INTENTOS_CODIGOS):
+        while len(codigos) < cantidad:
+            codigos.add(nuevo_codigo())
+        usados = set(
+            Constancia.objects.filter(codigo_verificacion__in=codigos).values_list('codigo_verificacion', flat=True)
+        )
+        if not usados:
+            return list(codigos)
+        codigos -= usados
+    raise RuntimeError("No se pudieron generar códigos de verificación únicos.")
+
+
+def emitir_lote(curso, participantes, fecha_inicio, fecha_termino, duracion_en_horas,
+                firma_especialista, firma_gerente=None, es_webinar=False):
+    """
+    Emite constancias de `curso` para los participantes dados (objetos o IDs).
+    Es idempotente: a quien ya tiene constancia de ese curso con la misma
+    fecha de inicio no se le crea otra. Regresa (creadas, omitidas).
+
+    Si no se indica el gerente se usa el designado en el sistema; si no hay
+    ninguno se lanza Evaluador.DoesNotExist.
+    """
+    if firma_gerente is None:
+        firma_gerente = Evaluador.objects.filter(es_gerente=True).first()
+        if firma_gerente is None:
+            raise Evaluador.DoesNotExist("No se ha designado un gerente en el sistema.")
+
+    ids = {getattr(p, 'pk', p) for p in participantes}
+    with transaction.atomic():
+        ya_tienen = set(
+            Constancia.objects.filter(curso=curso, fecha_inicio=fecha_inicio, participante_id__in=ids)
+            .values_list('participante_id', flat=True)
+        )
+        pendientes = sorted(ids - ya_tienen)
+        if not pendientes:
+            return 0, len(ids)
+
+        # fecha_emision la pone auto_now_add con la fecha de hoy; el vencimiento va desde antes del INSERT
+        vencimiento = date.today() + relativedelta(years=1)
+        codigos = generar_codigos(len(pendientes))
+        Constancia.objects.bulk_create(
+            [
+                Constancia(
+                    participante_id=participante_id,
+                    curso=curso,
+                    fecha_inicio=fecha_inicio,
+                    fecha_termino=fecha_termino,
+                    duracion_en_horas=duracion_en_horas,
+                    firma_gerente=firma_gerente,
+                    firma_especialista=firma_especialista,
+                    codigo_verificacion=codigo,
+                    es_webinar=es_webinar,
+                    fecha_vencimiento=vencimiento,
+                )
+                for participante_id, codigo in zip(pendientes, codigos)
+            ],
+            ignore_conflicts=True,
+        )
+        # Con ignore_conflicts no sabemos cuáles entraron (otra petición pudo
+        # ganarnos alguna); contamos por código para que el número sea exacto
+        creadas = Constancia.objects.filter(codigo_verificacion__in=codigos).count()
+        # bulk_create no manda señales: avisamos al buscador público y al dashboard directamente
+        invalidar_participantes(pendientes)
+        invalidar_tablero()
+    return creadas, len(ids) - creadas
@@ -0,0 +1,165 @@
+# users/encuestas.py
+"""
+Resumen de la encuesta de satisfacción por curso.
+
+Cada respuesta suma 1 en `ResumenEncuesta` a la opción que eligió en cada
+pregunta de opción múltiple. Las sumas se hacen con UPDATE ... total + 1,
+dentro de la misma transacción que guarda la respuesta, así que dos
+respuestas simultáneas no se pisan y una respuesta que falla no cuenta.
+El NPS, la tasa de respuesta y la conversión a lead se calculan al leer.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .models import Constancia, EncuestaRespuesta, ResumenEncuesta
+
+# Preguntas de opción múltiple que se resumen (campos de EncuestaRespuesta)
+PREGUNTAS = ('recomendacion', 'organizacion', 'duracion', 'horario_preferido', 'dia_preferido', 'interes_productos')
+ETIQUETAS = {
+    'recomendacion': 'Recomendación (1 a 10)',
+    'organizacion': 'Organización',
+    'duracion': 'Duración',
+    'horario_preferido': 'Horario preferido',
+    'dia_preferido': 'Día preferido',
+    'interes_productos': 'Interés en productos',
+}
+
+
+def _opcion(valor):
+    if isinstance(valor, bool):
+        return 'si' if valor else 'no'
+    return str(valor)
+
+
+def _filtro_opciones(respuesta):
+    condicion = Q()
+    for pregunta in PREGUNTAS:
+        condicion |= Q(pregunta=pregunta, opcion=_opcion(getattr(respuesta, pregunta)))
+    return condicion
+
+
+def registrar_respuesta(respuesta, curso_id):
+    """Suma la respuesta al resumen de su curso (2 consultas)."""
+    with transaction.atomic():
+        # Las filas que falten se crean en 0; ignore_conflicts por si otra respuesta las crea a la vez
+        ResumenEncuesta.objects.bulk_create(
+            [
+                ResumenEncuesta(curso_id=curso_id, pregunta=pregunta, opcion=_opcion(getattr(respuesta, pregunta)))
+                for pregunta in PREGUNTAS
+            ],
+            ignore_conflicts=True,
+        )
+        ResumenEncuesta.objects.filter(_filtro_opciones(respuesta), curso_id=curso_id).update(total=F('total') + 1)
+
+
+def descontar_respuesta(respuesta, curso_id):
+    """Lo contrario de `registrar_respuesta`, para cuando se borra una respuesta."""
+    ResumenEncuesta.objects.filter(_filtro_opciones(respuesta), curso_id=curso_id, total__gt=0).update(
+        total=F('total') - 1
+    )
+
+
+def reconstruir_resumen(curso_ids=None):
+    """
+    Vuelve a calcular el resumen desde EncuestaRespuesta (todos los cursos o
+    solo `curso_ids`). Una consulta agregada por pregunta. Regresa cuántas
+    filas de resumen quedaron.
+    """
+    respuestas = EncuestaRespuesta.objects.all()
+    resumen = ResumenEncuesta.objects.all()
+    if curso_ids is not None:
+        respuestas = respuestas.filter(constancia__curso_id__in=curso_ids)
+        resumen = resumen.filter(curso_id__in=curso_ids)
+
+    filas = []
+    for pregunta in PREGUNTAS:
+        conteos = respuestas.values('constancia__curso_id', pregunta).annotate(total=Count('pk')).order_by()
+        filas += [
+            ResumenEncuesta(
+                curso_id=c['constancia__curso_id'], pregunta=pregunta,
+                opcion=_opcion(c[pregunta]), total=c['total'],
+            )
+            for c in conteos
+        ]
+    with transaction.atomic():
+        resumen.delete()
+        ResumenEncuesta.objects.bulk_create(filas, batch_size=1000)
+    return len(filas)
+
+
+def _nps(recomendacion):
+    """(% promotores 9-10) - (% detractores 1-6), de -100 a 100; None sin respuestas."""
+    total = sum(recomendacion.values())
+    if not total:
+        return None
+    promotores = sum(n for opcion, n in recomendacion.items() if int(opcion) >= 9)
+    detractores = sum(n for opcion, n in recomendacion.items() if int(opcion) <= 6)
+    return round((promotores - detractores) * 100 / total, 1)
+
+
+def _porcentaje(parte, total):
+    return round(parte * 100 / total, 1) if total else None
+
+
+def resumen_cursos(curso_ids=None):
+    """
+    Indicadores por curso con respuestas, con dos consultas sin importar
+    cuántos cursos o respuestas haya: los conteos del resumen (con el
+    nombre del curso) y las constancias emitidas por curso.
+    """
+    filas = ResumenEncuesta.objects.select_related('curso').filter(total__gt=0)
+    if curso_ids is not None:
+        filas = filas.filter(curso_id__in=curso_ids)
+
+    cursos = {}
+    distribuciones = defaultdict(lambda: defaultdict(dict))
+    for fila in filas:
+        cursos[fila.curso_id] = fila.curso
+        distribuciones[fila.curso_id][fila.pregunta][fila.opcion] = fila.total
+
+    emitidas = dict(
+        Constancia.objects.filter(curso_id__in=list(cursos))
+        .values_list('curso_id').annotate(total=Count('pk')).order_by()
+    ) if cursos else {}
+
+    resultado = []
+    for curso_id, curso in sorted(cursos.items(), key=lambda par: par[1].nombre):
+        distribucion = distribuciones[curso_id]
+        recomendacion = distribucion.get('recomendacion', {})
+        respuestas = sum(recomendacion.values())
+        leads = distribucion.get('interes_productos', {}).get('si', 0)
+        promedio = sum(int(o) * n for o, n in recomendacion.items()) / respuestas if respuestas else None
+        resultado.append({
+            'curso_id': curso_id,
+            'curso': curso.nombre,
+            'respuestas': respuestas,
+            'constancias': emitidas.get(curso_id, 0),
+            'tasa_respuesta': _porcentaje(respuestas, emitidas.get(curso_id, 0)),
+            'nps': _nps(recomendacion),
+            'recomendacion_promedio': round(promedio, 2) if promedio is not None else None,
+            'leads': leads,
+            'conversion_leads': _porcentaje(leads, respuestas),
+            'distribucion': {pregunta: dict(opciones) for pregunta, opciones in distribucion.items()},
+        })
+    return resultado
+
+
+def distribucion_para_mostrar(resumen):
+    """[(etiqueta, [(opción, total), ...]), ...] en el orden de PREGUNTAS, para las plantillas."""
+    preguntas = []
+    for pregunta in PREGUNTAS:
+        opciones = resumen['distribucion'].get(pregunta, {})
+        if pregunta == 'recomendacion':
+            orden = sorted(opciones.items(), key=lambda par: int(par[0]), reverse=True)
+        else:
+            orden = sorted(opciones.items(), key=lambda par: par[1], reverse=True)
+        preguntas.append((ETIQUETAS[pregunta], orden))
+    return preguntas
+
+
+def curso_de_respuesta(respuesta):
+    """curso_id de la constancia de la respuesta, sin cargar la constancia entera."""
+    return Constancia.objects.filter(pk=respuesta.constancia_id).values_list('curso_id', flat=True).first()
+
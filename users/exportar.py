@@ -0,0 +1,228 @@
+# users/exportar.py
+"""
+Exportación de constancias, respuestas de encuesta y leads a CSV o Excel.
+
+Las filas se leen por bloques de CONSTANCIAS_EXPORTAR_BLOQUE ordenados por
+llave (`pk > último`), así que la memoria no crece con el número de filas
+aunque no haya cursores del lado del servidor (pooler de Neon), y se
+escriben conforme llegan:
+
+- CSV: se genera mientras se envía (StreamingHttpResponse).
+- Excel: openpyxl en modo solo escritura va pasando las filas a un archivo
+  temporal y el archivo solo se puede enviar ya completo. Por eso la vista
+  lo arma directo hasta CONSTANCIAS_EXPORTAR_XLSX_DIRECTO_MAX filas; arriba
+  de eso lo arma un trabajo en segundo plano (como los ZIP grandes).
+
+Los filtros son los del historial (`tipo` y `q`, ver busqueda.filtrar_constancias).
+Las respuestas de encuesta y los leads (correos y contactos de venta) solo
+los exporta el staff.
+"""
+import csv
+import tempfile
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+from .busqueda import filtrar_constancias
+from .hojas import libro_nuevo
+from .models import Constancia, EncuestaRespuesta, LeadVenta
+
+FORMATOS = ('csv', 'xlsx')
+# Exportaciones con datos personales o de ventas: solo para el staff
+SOLO_STAFF = ('encuestas', 'leads')
+# Caracteres con que Excel interpreta una celda como fórmula
+INICIO_FORMULA = ('=', '+', '-', '@')
+
+
+def _bloque():
+    return getattr(settings, 'CONSTANCIAS_EXPORTAR_BLOQUE', 2000)
+
+
+def _filtrado(parametros):
+    return bool(parametros.get('tipo') or parametros.get('q', '').strip())
+
+
+def _si_no(valor):
+    return 'Sí' if valor else 'No'
+
+
+# --- QUÉ SE EXPORTA ---
+
+def _constancias(parametros):
+    queryset = Constancia.objects.select_related('participante__institucion', 'curso').order_by('pk')
+    return filtrar_constancias(parametros, queryset)
+
+
+COLUMNAS_CONSTANCIAS = (
+    ('Código', lambda c: c.codigo_verificacion),
+    ('Participante', lambda c: c.participante.nombre_completo),
+    ('Email', lambda c: c.participante.email),
+    ('Institución', lambda c: c.participante.institucion.nombre if c.participante.institucion else ''),
+    ('Curso', lambda c: c.curso.nombre),
+    ('Tipo', lambda c: 'Webinar' if c.es_webinar else 'Curso'),
+    ('Fecha de inicio', lambda c: c.fecha_inicio),
+    ('Fecha de término', lambda c: c.fecha_termino),
+    ('Duración (horas)', lambda c: c.duracion_en_horas),
+    ('Fecha de emisión', lambda c: c.fecha_emision),
+    ('Fecha de vencimiento', lambda c: c.fecha_vencimiento),
+)
+
+
+def _encuestas(parametros):
+    queryset = EncuestaRespuesta.objects.select_related('constancia__curso').order_by('pk')
+    if _filtrado(parametros):
+        queryset = queryset.filter(constancia__in=filtrar_constancias(parametros).values('pk'))
+    return queryset
+
+
+def _columna_encuesta(campo):
+    if campo.get_internal_type() == 'BooleanField':
+        return (campo.verbose_name.strip(), lambda r: _si_no(getattr(r, campo.attname)))
+    return (campo.verbose_name.strip(), lambda r: getattr(r, campo.attname))
+
+
+COLUMNAS_ENCUESTAS = (
+    ('Código', lambda r: r.constancia.codigo_verificacion),
+    ('Curso', lambda r: r.constancia.curso.nombre),
+) + tuple(_columna_encuesta(campo) for campo in EncuestaRespuesta._meta.fields if campo.name != 'constancia')
+
+
+def _leads(parametros):
+    queryset = LeadVenta.objects.select_related('participante', 'curso').order_by('pk')
+    if _filtrado(parametros):
+        # Un lead no apunta a una constancia: cuenta si el participante tiene una del curso que pase el filtro
+        queryset = queryset.filter(Exists(
+            filtrar_constancias(parametros).filter(participante=OuterRef('participante'), curso=OuterRef('curso'))
+        ))
+    return queryset
+
+
+COLUMNAS_LEADS = (
+    ('Participante', lambda l: l.participante.nombre_completo),
+    ('Email', lambda l: l.participante.email),
+    ('Curso', lambda l: l.curso.nombre),
+    ('Fecha', lambda l: l.fecha_creacion),
+)
+
+EXPORTACIONES = {
+    'constancias': (_constancias, COLUMNAS_CONSTANCIAS),
+    'encuestas': (_encuestas, COLUMNAS_ENCUESTAS),
+    'leads': (_leads, COLUMNAS_LEADS),
+}
+
+
+def parametros_exportacion(parametros):
+    """Solo los filtros que usa la exportación, como dict (para guardarlos en un trabajo)."""
+    return {clave: parametros.get(clave, '') for clave in ('tipo', 'q')}
+
+
+def contar_filas(tipo, parametros):
+    consulta, _ = EXPORTACIONES[tipo]
+    return consulta(parametros).count()
+
+
+def _filas(tipo, parametros, avanzar=None):
+    consulta, columnas = EXPORTACIONES[tipo]
+    queryset = consulta(parametros).order_by('pk')
+    tamano = _bloque()
+    ultimo = None
+    hechas = 0
+    while True:
+        bloque = queryset if ultimo is None else queryset.filter(pk__gt=ultimo)
+        bloque = list(bloque[:tamano])
+        for objeto in bloque:
+            yield [valor(objeto) for _, valor in columnas]
+        hechas += len(bloque)
+        if avanzar:
+            avanzar(hechas)
+        if len(bloque) < tamano:
+            break
+        ultimo = bloque[-1].pk
+
+
+# --- FORMATOS ---
+
+class _Eco:
+    """Archivo falso para csv.writer: regresa lo escrito en lugar de guardarlo."""
+
+    def write(self, valor):
+        return valor
+
+
+def _texto_csv(valor):
+    if valor is None:
+        return ''
+    if hasattr(valor, 'isoformat'):
+        if hasattr(valor, 'tzinfo') and timezone.is_aware(valor):
+            valor = timezone.localtime(valor).replace(tzinfo=None)
+        return valor.isoformat(sep=' ', timespec='seconds') if hasattr(valor, 'hour') else valor.isoformat()
+    valor = str(valor)
+    # Que Excel no lo tome como fórmula al abrir el CSV
+    return "'" + valor if valor.startswith(INICIO_FORMULA) else valor
+
+
+def _csv(tipo, parametros):
+    escritor = csv.writer(_Eco())
+    # BOM: Excel abre el archivo como UTF-8 (acentos bien)
+    yield '\ufeff' + escritor.writerow([titulo for titulo, _ in EXPORTACIONES[tipo][1]])
+    trozo = []
+    for fila in _filas(tipo, parametros):
+        trozo.append(escritor.writerow([_texto_csv(valor) for valor in fila]))
+        if len(trozo) >= 500:
+            yield ''.join(trozo)
+            trozo = []
+    if trozo:
+        yield ''.join(trozo)
+
+
+def archivo_xlsx(tipo, parametros, avanzar=None):
+    """Archivo temporal (ya al inicio) con el libro de Excel completo."""
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+    libro = libro_nuevo()
+    hoja = libro.create_sheet(tipo.capitalize())
+    hoja.append([titulo for titulo, _ in EXPORTACIONES[tipo][1]])
+
+    def celda(valor):
+        if hasattr(valor, 'tzinfo') and valor.tzinfo is not None:
+            # Excel no guarda zona horaria
+            return timezone.localtime(valor).replace(tzinfo=None)
+        if isinstance(valor, str):
+            valor = ILLEGAL_CHARACTERS_RE.sub('', valor)
+            if valor.startswith('='):
+                # openpyxl trataría el texto como fórmula
+                texto = WriteOnlyCell(hoja, valor)
+                texto.data_type = 's'
+                return texto
+        return valor
+
+    for fila in _filas(tipo, parametros, avanzar):
+        hoja.append([celda(valor) for valor in fila])
+    archivo = tempfile.TemporaryFile()
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
+
+
+def nombre_archivo(tipo, formato):
+    return f"{tipo}_{timezone.localdate():%Y%m%d}.{formato}"
+
+
+def respuesta_exportacion(tipo, formato, parametros):
+    """
+    Respuesta HTTP con la exportación `tipo` ('constancias', 'encuestas' o
+    'leads') en `formato`. El Excel se arma completo antes de enviarse: la
+    vista solo lo pide así para selecciones chicas.
+    """
+    nombre = nombre_archivo(tipo, formato)
+    if formato == 'xlsx':
+        return FileResponse(
+            archivo_xlsx(tipo, parametros), as_attachment=True, filename=nombre,
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+        )
+    response = StreamingHttpResponse(_csv(tipo, parametros), content_type='text/csv; charset=utf-8')
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    return response
@@ -2,6 +2,7 @@
 from django import forms
 from django.contrib.auth.forms import UserCreationForm
 from .models import Evaluador, Curso, Participante,Institucion,Constancia,EncuestaRespuesta
+from .widgets import SelectorRemoto, SelectorRemotoMultiple
 
 class EvaluadorCreationForm(UserCreationForm):
     class Meta(UserCreationForm.Meta):
@@ -39,37 +40,76 @@ class InstitucionForm(forms.ModelForm):
         model = Institucion
         fields = ['nombre', 'ubicacion']
 
-class LoteConstanciaForm(forms.Form):
+def especialistas_firmantes():
+    """Evaluadores que pueden firmar como especialista (lo usa también la vista JSON del selector)."""
+    return Evaluador.objects.filter(is_active=True)
+
+
+class EmisionLoteForm(forms.Form):
+    """Datos de la sesión del curso; los comparten la vista de lote y el admin."""
     # Campo para seleccionar un solo curso
     curso = forms.ModelChoiceField(
         queryset=Curso.objects.all(),
         label="Selecciona el Curso"
     )
-    # Campo para seleccionar MÚLTIPLES participantes
-    participantes = forms.ModelMultipleChoiceField(
-        queryset=Participante.objects.all(),
-        widget=forms.CheckboxSelectMultiple, # Esto crea la lista de checkboxes
-        label="Selecciona los Participantes"
-    )
     # Campos de la sesión específica del curso
     fecha_inicio = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}), label="Fecha de Inicio del Evento")
     fecha_termino = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}), label="Fecha de Término del Evento")
     duracion_en_horas = forms.DecimalField(max_digits=4, decimal_places=1, label="Duración (Horas)")
     firma_especialista = forms.ModelChoiceField(
-        queryset=Evaluador.objects.all(),
+        queryset=especialistas_firmantes(),
         label="Selecciona el Especialista que firma"
     )
+
+class ParticipantesField(forms.ModelMultipleChoiceField):
+    def label_from_instance(self, obj):
+        return etiqueta_participante(obj)
+
+
+def etiqueta_participante(participante):
+    """Texto con que se muestra un participante en el selector (lo usa también la vista JSON)."""
+    return f"{participante.nombre_completo} <{participante.email}>"
+
+
+class LoteConstanciaForm(EmisionLoteForm):
+    # Participantes y especialista se buscan desde el navegador: la página no
+    # lleva la tabla completa y al validar solo se consultan los IDs enviados
+    participantes = ParticipantesField(
+        queryset=Participante.objects.all(),
+        widget=SelectorRemotoMultiple('users:buscar_participantes_json'),
+        label="Selecciona los Participantes"
+    )
+    firma_especialista = forms.ModelChoiceField(
+        queryset=especialistas_firmantes(),
+        widget=SelectorRemoto('users:buscar_evaluadores_json'),
+        label="Selecciona el Especialista que firma"
+    )
+
+    field_order = ['curso', 'participantes', 'fecha_inicio', 'fecha_termino', 'duracion_en_horas', 'firma_especialista']
+
 class WebinarStep1Form(forms.Form):
     curso_nombre = forms.CharField(label="Nombre del Evento/Webinar")
     fecha_inicio = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}), label="Fecha de Inicio")
     fecha_termino = forms.DateField(widget=forms.DateInput(attrs={'type': 'date'}), label="Fecha de Término")
     duracion_en_horas = forms.DecimalField(max_digits=4, decimal_places=1, label="Duración (Horas)")
     firma_especialista = forms.ModelChoiceField(
-        queryset=Evaluador.objects.all(),
+        queryset=especialistas_firmantes(),
         label="Especialista que firma"
     )
     archivo_csv = forms.FileField(label="Selecciona el archivo CSV de WebEx")
 
+class ImportarParticipantesForm(forms.Form):
+    archivo = forms.FileField(
+        label="Archivo Excel (.xlsx) o CSV",
+        help_text="Columnas: Nombre, Email y, si se tienen, Título e Institución.",
+    )
+
+    def clean_archivo(self):
+        archivo = self.cleaned_data['archivo']
+        if not archivo.name.lower().endswith(('.xlsx', '.csv', '.txt')):
+            raise forms.ValidationError("Sube un archivo .xlsx o .csv.")
+        return archivo
+
 class EncuestaForm(forms.ModelForm):
     class Meta:
         model = EncuestaRespuesta
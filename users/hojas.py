@@ -0,0 +1,101 @@
+# users/hojas.py
+"""
+Lectura y escritura de hojas de cálculo (CSV / Excel).
+
+openpyxl tarda en importarse, así que solo se carga dentro de las funciones
+que lo necesitan; importar este módulo es barato.
+"""
+import codecs
+import csv
+import itertools
+
+
+def _lineas(archivo, encoding):
+    """Decodifica el archivo subido por trozos y produce sus líneas sin leerlo completo."""
+    archivo.seek(0)
+    pendiente = ''
+    for texto in codecs.iterdecode(archivo.chunks(), encoding):
+        pendiente += texto
+        lineas = pendiente.splitlines(keepends=True)
+        # La última puede estar incompleta: se completa con el siguiente trozo
+        pendiente = lineas.pop() if lineas and not lineas[-1].endswith(('\n', '\r')) else ''
+        yield from lineas
+    if pendiente:
+        yield pendiente
+
+
+def _filas_webinar(lineas):
+    reader = csv.reader(lineas, delimiter='\t')
+    next(reader, None) # Saltar encabezado
+    next(reader, None)  # Saltar fila 2 (nombres de columnas: "Attendee", "Duration"...)
+    for row in reader:
+        try:
+            # Basado en tu archivo: 8:Nombre, 9:Apellido, 10:Institución, 11:Email, 14:Duración
+            nombre_completo = f"{row[8]} {row[9]}".strip()
+            institucion = row[10].strip() if row[10] else "N/A"
+            email = row[11].strip().lower()
+            minutos = int(row[14].split()[0])
+        except (IndexError, ValueError):
+            continue
+        if email:
+            yield email, nombre_completo, institucion, minutos
+
+
+def leer_reporte_webinar(archivo):
+    """
+    Lee el reporte de asistentes de GoToWebinar (separado por tabuladores)
+    y suma los minutos de cada asistente. Regresa un dict por email con
+    nombre_completo, institucion y duracion_total, o None si el archivo no
+    se pudo decodificar.
+
+    El archivo se decodifica por trozos; en memoria solo queda un registro
+    por asistente, no el texto completo.
+    """
+    for encoding in ('utf-8-sig', 'utf-16'):
+        participantes_raw = {}
+        try:
+            for email, nombre_completo, institucion, minutos in _filas_webinar(_lineas(archivo, encoding)):
+                if email not in participantes_raw:
+                    participantes_raw[email] = {
+                        'nombre_completo': nombre_completo,
+                        'institucion': institucion,
+                        'duracion_total': 0
+                    }
+                participantes_raw[email]['duracion_total'] += minutos
+        except UnicodeDecodeError:
+            continue
+        return participantes_raw
+    return None
+
+
+def filas_csv(archivo, encoding):
+    """
+    Filas de un CSV subido, decodificado por trozos. El separador (coma,
+    punto y coma o tabulador) se deduce de la primera línea.
+    """
+    lineas = _lineas(archivo, encoding)
+    primera = next(lineas, '')
+    separador = max((',', ';', '\t'), key=primera.count)
+    yield from csv.reader(itertools.chain([primera], lineas), delimiter=separador)
+
+
+def filas_xlsx(archivo):
+    """Filas de la primera hoja de un .xlsx, leídas en modo solo lectura (sin cargar la hoja entera)."""
+    libro = abrir_libro(archivo)
+    try:
+        yield from libro.worksheets[0].iter_rows(values_only=True)
+    finally:
+        # En solo lectura openpyxl deja el archivo abierto hasta cerrar el libro
+        libro.close()
+
+
+def abrir_libro(archivo, solo_lectura=True):
+    """Abre un .xlsx con openpyxl (importado aquí para no pagarlo en cada arranque)."""
+    import openpyxl
+    return openpyxl.load_workbook(archivo, read_only=solo_lectura, data_only=True)
+
+
+def libro_nuevo(solo_escritura=True):
+    """Libro vacío de openpyxl; en modo solo escritura las filas no se guardan en memoria."""
+    import openpyxl
+    return openpyxl.Workbook(write_only=solo_escritura)
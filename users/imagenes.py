@@ -0,0 +1,174 @@
+# users/imagenes.py
+import base64
+import io
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from .metricas import medir
+
+logger = logging.getLogger(__name__)
+
+
+class CacheImagenes:
+    """
+    Caché LRU acotada (por proceso) de imágenes ya procesadas como data URI.
+
+    Evita volver a leer, aplanar y codificar el fondo y las firmas en cada
+    constancia de un mismo lote.
+    """
+
+    def __init__(self, max_entradas=None):
+        self._max_entradas = max_entradas
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def max_entradas(self):
+        if self._max_entradas is not None:
+            return self._max_entradas
+        return getattr(settings, 'CONSTANCIAS_CACHE_IMAGENES_MAX', 32)
+
+    def obtener(self, clave):
+        with self._lock:
+            if clave in self._datos:
+                self._datos.move_to_end(clave)
+                self.hits += 1
+                return self._datos[clave]
+            self.misses += 1
+            return None
+
+    def guardar(self, clave, valor):
+        limite = self.max_entradas
+        if limite <= 0:
+            return
+        with self._lock:
+            self._datos[clave] = valor
+            self._datos.move_to_end(clave)
+            while len(self._datos) > limite:
+                self._datos.popitem(last=False)
+
+    def invalidar(self, nombre):
+        """Elimina todas las entradas de un archivo (ruta local o nombre en storage)."""
+        if not nombre:
+            return
+        with self._lock:
+            for clave in [c for c in self._datos if c[1] == str(nombre)]:
+                del self._datos[clave]
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'entradas': len(self._datos),
+                'max_entradas': self.max_entradas,
+            }
+
+
+cache_imagenes = CacheImagenes()
+
+
+def _clave_cache(imagen_source):
+    """
+    Archivos en storage (Cloudinary) se identifican por su nombre, que cambia
+    al subir una firma nueva; los archivos locales por ruta + fecha de modificación.
+    """
+    if hasattr(imagen_source, 'url'):
+        return ('storage', str(imagen_source.name))
+    ruta = str(imagen_source)
+    try:
+        mtime = os.stat(ruta).st_mtime_ns
+    except OSError:
+        mtime = None
+    return ('archivo', ruta, mtime)
+
+
+@medir('imagen')
+def _imagen_a_base64(imagen_source):
+    """
+    Descarga/Lee imagen, elimina transparencia (para evitar cuadros negros)
+    y retorna Base64. El resultado se guarda en `cache_imagenes`.
+    """
+    if not imagen_source:
+        return ""
+
+    clave = _clave_cache(imagen_source)
+    data_uri = cache_imagenes.obtener(clave)
+    if data_uri is not None:
+        return data_uri
+
+    data_uri = _procesar_imagen(imagen_source)
+    # Solo guardamos resultados válidos para reintentar descargas fallidas
+    if data_uri:
+        cache_imagenes.guardar(clave, data_uri)
+    return data_uri
+
+
+def _procesar_imagen(imagen_source):
+    # Pillow solo se carga cuando de verdad hay que procesar una imagen
+    from PIL import Image
+
+    from .descargas import descargar
+
+    try:
+        image_data = None
+
+        # 1. OBTENER LOS DATOS DE LA IMAGEN (Sea URL o Archivo Local)
+        ruta_o_url = str(imagen_source)
+        if hasattr(imagen_source, 'url'):
+            ruta_o_url = imagen_source.url
+
+        if ruta_o_url.startswith('http'):
+            image_data = descargar(ruta_o_url)
+        else:
+            # Lógica para archivo local
+            path_local = ""
+            if hasattr(imagen_source, 'path'):
+                try: path_local = imagen_source.path
+                except: pass
+            if not path_local: path_local = ruta_o_url
+
+            if os.path.exists(path_local):
+                with open(path_local, "rb") as f:
+                    image_data = f.read()
+
+        if not image_data:
+            return ""
+
+        # 2. PROCESAMIENTO CON PILLOW (El secreto anti-cuadros negros)
+        img = Image.open(io.BytesIO(image_data))
+
+        # Si tiene transparencia (RGBA), la convertimos a fondo blanco
+        if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
+            # Crear lienzo blanco del mismo tamaño
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            # Convertir a RGBA para asegurar compatibilidad de pegado
+            img = img.convert("RGBA")
+            # Pegar la imagen original usando su canal alfa como máscara
+            background.paste(img, mask=img.split()[3]) # 3 es el canal Alpha
+            img = background
+        else:
+            img = img.convert("RGB")
+
+        # 3. GUARDAR EN BUFFER COMO JPEG (Más ligero y sin transparencia)
+        buffered = io.BytesIO()
+        img.save(buffered, format="JPEG", quality=95)
+        encoded = base64.b64encode(buffered.getvalue()).decode('utf-8')
+
+        return f"data:image/jpeg;base64,{encoded}"
+
+    except Exception as e:
+        logger.warning("Error procesando imagen %s: %s", imagen_source, e)
+        return ""
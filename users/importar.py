@@ -0,0 +1,235 @@
+# users/importar.py
+"""
+Importación de participantes desde Excel o CSV.
+
+El archivo se lee una vez y queda un registro por correo (si se repite,
+gana la última fila). Luego, por bloques de CONSTANCIAS_IMPORTACION_BLOQUE
+correos: una consulta trae los que ya existen, `bulk_update` cambia solo
+los que traen datos distintos y `bulk_create` inserta los nuevos. Las
+instituciones se resuelven contra un índice en memoria por nombre
+normalizado que se arma una sola vez por importación.
+"""
+import unicodedata
+from itertools import islice
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Upper
+
+from .hojas import filas_csv, filas_xlsx
+from .models import Institucion, Participante
+from .publico import invalidar_participantes, normalizar_email
+
+# Encabezados aceptados (ya normalizados) y el campo al que corresponden
+ENCABEZADOS = {
+    'nombre': 'nombre_completo',
+    'nombre completo': 'nombre_completo',
+    'nombre_completo': 'nombre_completo',
+    'email': 'email',
+    'e-mail': 'email',
+    'correo': 'email',
+    'correo electronico': 'email',
+    'titulo': 'titulo',
+    'titulo profesional': 'titulo',
+    'institucion': 'institucion',
+    'institucion de origen': 'institucion',
+}
+# Textos que en los reportes significan "sin institución"
+SIN_INSTITUCION = {'', 'n/a', 'na', 'ninguna', '-'}
+
+
+def normalizar_texto(valor):
+    """Minúsculas, sin acentos y con los espacios colapsados: 'Hospital  Ángeles ' == 'hospital angeles'."""
+    texto = unicodedata.normalize('NFKD', str(valor or ''))
+    texto = ''.join(c for c in texto if not unicodedata.combining(c))
+    return ' '.join(texto.casefold().split())
+
+
+def _titulos():
+    """Título normalizado (valor o etiqueta de OPCIONES_TITULO) -> valor que se guarda."""
+    titulos = {}
+    for valor, etiqueta in Participante.OPCIONES_TITULO:
+        if valor:
+            titulos[normalizar_texto(valor)] = valor
+            titulos[normalizar_texto(valor).rstrip('.')] = valor
+            titulos[normalizar_texto(etiqueta)] = valor
+    return titulos
+
+
+class IndiceInstituciones:
+    """
+    Instituciones por nombre normalizado, cargadas una vez. Las que falten se
+    crean todas juntas con `resolver`. Si ya hay duplicados en la tabla, se
+    usa la más antigua.
+    """
+
+    def __init__(self):
+        self._cargar()
+
+    def _cargar(self):
+        self._ids = {}
+        for pk, nombre in Institucion.objects.order_by('-pk').values_list('pk', 'nombre').iterator():
+            self._ids[normalizar_texto(nombre)] = pk
+
+    def resolver(self, nombres):
+        """Crea las instituciones de `nombres` que no existan. Regresa {nombre normalizado: id}."""
+        nuevas = {}
+        for nombre in nombres:
+            clave = normalizar_texto(nombre)
+            if clave not in SIN_INSTITUCION and clave not in self._ids:
+                nuevas.setdefault(clave, ' '.join(str(nombre).split())[:255])
+        if nuevas:
+            creadas = Institucion.objects.bulk_create([Institucion(nombre=nombre) for nombre in nuevas.values()])
+            if any(i.pk is None for i in creadas):
+                # Backends que no regresan los IDs al insertar
+                self._cargar()
+            else:
+                self._ids.update(zip(nuevas, (i.pk for i in creadas)))
+        return self._ids
+
+    def id_de(self, nombre):
+        return self._ids.get(normalizar_texto(nombre))
+
+
+def _textos(filas):
+    for fila in filas:
+        yield ['' if v is None else str(v).strip() for v in fila]
+
+
+def _leer(archivo, nombre_archivo):
+    """`leer_participantes` sobre el archivo; None si un CSV no se pudo decodificar."""
+    if nombre_archivo.lower().endswith('.xlsx'):
+        return leer_participantes(_textos(filas_xlsx(archivo)))
+    for encoding in ('utf-8-sig', 'cp1252'):
+        try:
+            return leer_participantes(_textos(filas_csv(archivo, encoding)))
+        except UnicodeDecodeError:
+            continue
+    return None
+
+
+def leer_participantes(filas):
+    """
+    Valida las filas (la primera con datos es el encabezado). Regresa
+    ({email: {'fila', 'nombre_completo', 'titulo', 'institucion'}}, errores).
+    """
+    filas = iter(filas)
+    numero, columnas = 0, {}
+    for numero, encabezado in enumerate(filas, start=1):
+        if any(encabezado):
+            for i, nombre in enumerate(map(normalizar_texto, encabezado)):
+                if nombre in ENCABEZADOS:
+                    columnas.setdefault(ENCABEZADOS[nombre], i)
+            break
+    if 'nombre_completo' not in columnas or 'email' not in columnas:
+        return {}, ["El archivo debe tener en su primera fila las columnas 'Nombre' y 'Email' (y opcionalmente 'Título' e 'Institución')."]
+
+    titulos = _titulos()
+    registros, errores = {}, []
+    for numero, fila in enumerate(filas, start=numero + 1):
+        if not any(fila):
+            continue
+        valor = {campo: fila[i] if i < len(fila) else '' for campo, i in columnas.items()}
+        email = normalizar_email(valor['email'])
+        nombre = ' '.join(valor['nombre_completo'].split())
+        try:
+            validate_email(email)
+        except ValidationError:
+            errores.append(f"Fila {numero}: el correo '{valor['email']}' no es válido.")
+            continue
+        if not nombre:
+            errores.append(f"Fila {numero}: falta el nombre.")
+            continue
+        if len(nombre) > 255:
+            errores.append(f"Fila {numero}: el nombre pasa de 255 caracteres.")
+            continue
+        titulo = valor.get('titulo', '')
+        if titulo:
+            if normalizar_texto(titulo) not in titulos:
+                errores.append(f"Fila {numero}: el título '{titulo}' no está entre las opciones.")
+                continue
+            titulo = titulos[normalizar_texto(titulo)]
+        if email in registros:
+            errores.append(f"Fila {numero}: el correo {email} ya venía en la fila {registros[email]['fila']}; se usa esta fila.")
+        registros[email] = {
+            'fila': numero,
+            'nombre_completo': nombre,
+            'titulo': titulo,
+            'institucion': valor.get('institucion', ''),
+        }
+    return registros, errores
+
+
+def guardar_participantes(registros, avanzar=None):
+    """
+    Inserta o actualiza los participantes de `registros` por bloques. Un
+    título o institución vacíos no borran los que ya tenga el participante.
+    Regresa (nuevos, actualizados).
+    """
+    indice = IndiceInstituciones()
+    indice.resolver(r['institucion'] for r in registros.values())
+
+    tamano = getattr(settings, 'CONSTANCIAS_IMPORTACION_BLOQUE', 500)
+    correos = iter(registros)
+    nuevos = actualizados = hechos = 0
+    while bloque := list(islice(correos, tamano)):
+        with transaction.atomic():
+            # Por UPPER(email): usa el índice del buscador y encuentra correos guardados con mayúsculas
+            existentes = {
+                p.email.lower(): p
+                for p in Participante.objects.alias(email_upper=Upper('email'))
+                .filter(email_upper__in=[email.upper() for email in bloque])
+            }
+            crear, cambiados = [], []
+            for email in bloque:
+                registro = registros[email]
+                datos = {'nombre_completo': registro['nombre_completo']}
+                if registro['titulo']:
+                    datos['titulo'] = registro['titulo']
+                institucion_id = indice.id_de(registro['institucion'])
+                if institucion_id:
+                    datos['institucion_id'] = institucion_id
+
+                participante = existentes.get(email)
+                if participante is None:
+                    crear.append(Participante(email=email, **datos))
+                elif any(getattr(participante, campo) != v for campo, v in datos.items()):
+                    for campo, v in datos.items():
+                        setattr(participante, campo, v)
+                    cambiados.append(participante)
+            Participante.objects.bulk_create(crear)
+            if cambiados:
+                Participante.objects.bulk_update(cambiados, ['nombre_completo', 'titulo', 'institucion'])
+                # bulk_update no manda señales: avisamos al buscador público directamente
+                invalidar_participantes(p.pk for p in cambiados)
+        nuevos += len(crear)
+        actualizados += len(cambiados)
+        hechos += len(bloque)
+        if avanzar:
+            avanzar(hechos)
+    return nuevos, actualizados
+
+
+def importar_participantes(archivo, nombre_archivo, avanzar=None, al_leer=None):
+    """
+    Importa el archivo completo. `al_leer(total)` se llama cuando ya se sabe
+    cuántos participantes trae. Regresa (mensaje, errores por fila).
+    """
+    leido = _leer(archivo, nombre_archivo)
+    if leido is None:
+        return "No se pudo leer el archivo.", ["Error de codificación. Prueba guardar el Excel como 'CSV UTF-8'."]
+    registros, errores = leido
+    if al_leer:
+        al_leer(len(registros))
+    if not registros:
+        return "No se importó ningún participante.", errores
+
+    nuevos, actualizados = guardar_participantes(registros, avanzar)
+    sin_cambios = len(registros) - nuevos - actualizados
+    return (
+        f"Se importaron {len(registros)} participantes: {nuevos} nuevos, "
+        f"{actualizados} actualizados y {sin_cambios} sin cambios.",
+        errores,
+    )
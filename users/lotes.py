@@ -0,0 +1,29 @@
+# users/lotes.py
+from .models import Constancia
+
+# Relaciones que lee el template del PDF y los correos
+RELACIONES_CONSTANCIA = ('participante', 'curso', 'firma_gerente', 'firma_especialista')
+
+
+def cargar_constancias(ids):
+    """
+    Carga en una sola consulta las constancias seleccionadas, en el mismo
+    orden en que llegaron los IDs y con sus relaciones ya resueltas.
+    Regresa (constancias, ids_faltantes).
+    """
+    ids_validos = []
+    faltantes = []
+    for valor in ids:
+        try:
+            pk = int(valor)
+        except (TypeError, ValueError):
+            faltantes.append(valor)
+            continue
+        ids_validos.append(pk)
+    # Sin repetidos y en el orden de llegada
+    ids_validos = list(dict.fromkeys(ids_validos))
+
+    por_id = Constancia.objects.select_related(*RELACIONES_CONSTANCIA).in_bulk(ids_validos)
+    constancias = [por_id[pk] for pk in ids_validos if pk in por_id]
+    faltantes += [pk for pk in ids_validos if pk not in por_id]
+    return constancias, faltantes
@@ -0,0 +1,311 @@
+# users/management/commands/bench_constancias.py
+import io
+import json
+import math
+import platform
+import random
+import sys
+import tempfile
+import time
+from datetime import date
+
+import django
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from users.lotes import cargar_constancias
+from users.models import Constancia, Curso, Evaluador, Institucion, Participante
+from users.pdf import _generar_pdf_bytes
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _percentil(valores, p):
+    """Percentil por rango más cercano (suficiente para comparar corridas)."""
+    ordenados = sorted(valores)
+    return ordenados[max(0, math.ceil(p / 100 * len(ordenados)) - 1)]
+
+
+def _rss_pico_mb():
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux lo reporta en KiB, macOS en bytes
+    return round(pico / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _firma_falsa(texto):
+    from PIL import Image, ImageDraw
+
+    img = Image.new('RGBA', (600, 200), (0, 0, 0, 0))
+    dibujo = ImageDraw.Draw(img)
+    dibujo.line([(20, 150), (200, 40), (380, 160), (580, 60)], fill=(20, 20, 120, 255), width=6)
+    dibujo.text((30, 170), texto, fill=(20, 20, 120, 255))
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    return ContentFile(buffer.getvalue())
+
+
+def _reporte_webinar(asistentes):
+    """Reporte de asistentes como lo exporta GoToWebinar (tabuladores, UTF-16)."""
+    lineas = ["Attendee Report", "\t".join(f"col{i}" for i in range(15))]
+    for i in range(asistentes):
+        fila = [''] * 15
+        fila[8], fila[9] = f"Asistente{i}", "Benchmark"
+        fila[10] = f"Institución {i % 25}"
+        fila[11] = f"asistente{i}@bench.test"
+        fila[14] = f"{20 + (i % 60)} minutes"
+        lineas.append("\t".join(fila))
+    return "\n".join(lineas).encode('utf-16')
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de emisión, render y descarga de constancias sobre una base de datos "
+        "desechable con datos sintéticos. Reporta throughput, p50/p95, RSS pico y consultas en JSON."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--participantes', type=int, default=200, help="Tamaño del lote (asistentes del webinar, constancias del ZIP).")
+        parser.add_argument('--repeticiones', type=int, default=3, help="Corridas de cada etapa de lote.")
+        parser.add_argument('--pdfs', type=int, default=10, help="Renders individuales a medir.")
+        parser.add_argument('--busquedas', type=int, default=50, help="Búsquedas públicas a medir.")
+        parser.add_argument('--semilla', type=int, default=1, help="Semilla para que las corridas sean comparables.")
+        parser.add_argument('--salida', help="Guarda el reporte JSON en este archivo.")
+        parser.add_argument('--base', help="Reporte JSON previo contra el que se comparan p50 y p95.")
+
+    def handle(self, *args, **options):
+        if options['participantes'] < 1 or options['repeticiones'] < 1:
+            raise CommandError("--participantes y --repeticiones deben ser mayores que cero.")
+        random.seed(options['semilla'])
+
+        with tempfile.TemporaryDirectory() as carpeta:
+            # Nada de esto debe tocar Cloudinary, el correo real ni la base de datos de verdad
+            ajustes = override_settings(
+                STORAGES={
+                    **settings.STORAGES,
+                    'default': {
+                        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+                        'OPTIONS': {'location': carpeta, 'base_url': '/media/'},
+                    },
+                },
+                MEDIA_ROOT=carpeta,
+                EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend',
+                ALLOWED_HOSTS=['*'],
+                CONSTANCIAS_TRABAJOS_SINCRONOS=True,
+                CONSTANCIAS_TRABAJOS_STORAGE=None,
+                CONSTANCIAS_TRABAJOS_DIR=carpeta,
+                CONSTANCIAS_ALMACEN_PDF_STORAGE=None,
+                CONSTANCIAS_ALMACEN_PDF_DIR=carpeta,
+                CONSTANCIAS_ZIP_DIRECTO_MAX=options['participantes'],
+                # Todas las peticiones salen de la misma IP: sin límite, o se medirían respuestas 429
+                CONSTANCIAS_LIMITE_BUSQUEDAS_POR_MINUTO=0,
+                CONSTANCIAS_LIMITE_DESCARGAS_POR_MINUTO=0,
+            )
+            with ajustes:
+                nombre_original = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+                try:
+                    reporte = self._correr(options)
+                finally:
+                    connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+        if options['base']:
+            self._comparar(reporte, options['base'])
+        salida = json.dumps(reporte, indent=2, ensure_ascii=False)
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                archivo.write(salida)
+        self.stdout.write(salida)
+
+    # --- DATOS SINTÉTICOS ---
+
+    def _sembrar(self, n):
+        gerente = Evaluador.objects.create_user(
+            'bench_gerente', password='bench', first_name='Gerente', last_name='Benchmark',
+            cargo='Gerente', es_gerente=True, is_staff=True,
+        )
+        especialista = Evaluador.objects.create_user(
+            'bench_especialista', password='bench', first_name='Especialista', last_name='Benchmark',
+            cargo='Especialista',
+        )
+        gerente.firma_digital.save('firma_gerente.png', _firma_falsa('Gerente'))
+        especialista.firma_digital.save('firma_especialista.png', _firma_falsa('Especialista'))
+
+        instituciones = Institucion.objects.bulk_create(
+            [Institucion(nombre=f"Institución {i}") for i in range(max(1, n // 20))]
+        )
+        participantes = Participante.objects.bulk_create([
+            Participante(
+                nombre_completo=f"Participante Benchmark {i}",
+                email=f"participante{i}@bench.test",
+                institucion=instituciones[i % len(instituciones)],
+            )
+            for i in range(n)
+        ])
+        curso = Curso.objects.create(nombre="Curso Benchmark")
+        hoy = timezone.now().date()
+        Constancia.objects.bulk_create([
+            Constancia(
+                participante=p, curso=curso, fecha_inicio=hoy, fecha_termino=hoy, duracion_en_horas=8,
+                firma_gerente=gerente, firma_especialista=especialista, codigo_verificacion=f"BENCH{i:07d}",
+            )
+            for i, p in enumerate(participantes)
+        ])
+        return gerente, especialista, participantes, curso
+
+    # --- MEDICIÓN ---
+
+    def _medir(self, nombre, muestras, funcion, elementos=1, preparar=None):
+        """
+        Corre `funcion(i)` `muestras` veces y resume tiempos y consultas.
+        `preparar(i)` se ejecuta antes de cada muestra y no cuenta en el tiempo.
+        """
+        tiempos = []
+        consultas = 0
+        for i in range(muestras):
+            if preparar:
+                preparar(i)
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                funcion(i)
+                tiempos.append(time.perf_counter() - inicio)
+            consultas += len(capturadas.captured_queries)
+        total = sum(tiempos)
+        resultado = {
+            'muestras': muestras,
+            'elementos_por_muestra': elementos,
+            'total_s': round(total, 4),
+            'throughput_por_s': round(muestras * elementos / total, 2) if total else None,
+            'p50_ms': round(_percentil(tiempos, 50) * 1000, 2),
+            'p95_ms': round(_percentil(tiempos, 95) * 1000, 2),
+            'max_ms': round(max(tiempos) * 1000, 2),
+            'consultas': consultas,
+            'consultas_por_muestra': round(consultas / muestras, 1),
+            'rss_pico_mb': _rss_pico_mb(),
+        }
+        self.stderr.write(f"  {nombre}: p50 {resultado['p50_ms']} ms, p95 {resultado['p95_ms']} ms, {resultado['consultas_por_muestra']} consultas")
+        return resultado
+
+    def _correr(self, options):
+        n = options['participantes']
+        repeticiones = options['repeticiones']
+        self.stderr.write(f"Sembrando {n} participantes y constancias...")
+        gerente, especialista, participantes, curso_base = self._sembrar(n)
+
+        cliente = Client()
+        cliente.force_login(gerente)
+        reporte_webinar = _reporte_webinar(n)
+        hoy = date.today().isoformat()
+        etapas = {}
+
+        def subir_webinar(i):
+            respuesta = cliente.post(reverse('users:webinar_paso1'), {
+                'curso_nombre': f"Webinar Benchmark {i}",
+                'fecha_inicio': hoy,
+                'fecha_termino': hoy,
+                'duracion_en_horas': '1.5',
+                'firma_especialista': especialista.pk,
+                'archivo_csv': ContentFile(reporte_webinar, name='asistentes.csv'),
+            })
+            if respuesta.status_code != 302:
+                raise CommandError("La carga del reporte de webinar no redirigió al paso 2.")
+
+        etapas['webinar_csv'] = self._medir('webinar_csv', repeticiones, subir_webinar, elementos=n)
+
+        def emitir_webinar(i):
+            cliente.post(reverse('users:webinar_paso2'))
+
+        etapas['webinar_emision'] = self._medir(
+            'webinar_emision', repeticiones, emitir_webinar, elementos=n, preparar=subir_webinar
+        )
+
+        cursos_lote = []
+
+        def nuevo_curso(i):
+            cursos_lote.append(Curso.objects.create(nombre=f"Curso Lote Benchmark {i}"))
+
+        def crear_lote(i):
+            cliente.post(reverse('users:crear_lote'), {
+                'curso': cursos_lote[-1].pk,
+                'participantes': [p.pk for p in participantes],
+                'fecha_inicio': hoy,
+                'fecha_termino': hoy,
+                'duracion_en_horas': '8',
+                'firma_especialista': especialista.pk,
+            })
+
+        etapas['lote_constancias'] = self._medir(
+            'lote_constancias', repeticiones, crear_lote, elementos=n, preparar=nuevo_curso
+        )
+
+        ids_base = list(Constancia.objects.filter(curso=curso_base).values_list('pk', flat=True))
+        muestra_pdf, _ = cargar_constancias(random.sample(ids_base, min(options['pdfs'], len(ids_base))))
+
+        def render_pdf(i):
+            if _generar_pdf_bytes(muestra_pdf[i]) is None:
+                raise CommandError("xhtml2pdf no pudo generar la constancia.")
+
+        etapas['pdf_individual'] = self._medir('pdf_individual', len(muestra_pdf), render_pdf)
+
+        def descargar_zip(i):
+            respuesta = cliente.post(reverse('users:descargar_constancias_zip'), {'constancia_ids': ids_base})
+            if not respuesta.streaming:
+                raise CommandError("La descarga del ZIP no se sirvió en streaming.")
+            for _ in respuesta.streaming_content:
+                pass
+
+        etapas['zip'] = self._medir('zip', repeticiones, descargar_zip, elementos=len(ids_base))
+
+        publico = Client()
+        emails = [random.choice(participantes).email for _ in range(options['busquedas'])]
+
+        def buscar(i):
+            respuesta = publico.post(reverse('users:buscador_publico'), {'email': emails[i].upper()})
+            if respuesta.status_code != 200:
+                raise CommandError(f"El buscador respondió {respuesta.status_code}.")
+
+        etapas['buscador'] = self._medir('buscador', len(emails), buscar)
+
+        return {
+            'fecha': timezone.now().isoformat(timespec='seconds'),
+            'entorno': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'base_de_datos': connection.vendor,
+                'procesos_pdf': getattr(settings, 'CONSTANCIAS_PROCESOS_PDF', 1),
+                'modo_plantilla': getattr(settings, 'CONSTANCIAS_MODO_PLANTILLA', True),
+            },
+            'parametros': {
+                'participantes': n,
+                'repeticiones': repeticiones,
+                'pdfs': len(muestra_pdf),
+                'busquedas': len(emails),
+                'semilla': options['semilla'],
+            },
+            'etapas': etapas,
+        }
+
+    def _comparar(self, reporte, ruta_base):
+        """Agrega a cada etapa la razón actual/base de p50 y p95 (>1 = más lento)."""
+        try:
+            with open(ruta_base, encoding='utf-8') as archivo:
+                base = json.load(archivo)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"No se pudo leer el reporte base: {e}")
+        for nombre, etapa in reporte['etapas'].items():
+            anterior = base.get('etapas', {}).get(nombre)
+            if not anterior:
+                continue
+            etapa['vs_base'] = {
+                clave: round(etapa[clave] / anterior[clave], 2) if anterior.get(clave) else None
+                for clave in ('p50_ms', 'p95_ms')
+            }
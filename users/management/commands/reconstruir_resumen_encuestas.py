@@ -0,0 +1,21 @@
+# users/management/commands/reconstruir_resumen_encuestas.py
+from django.core.management.base import BaseCommand
+
+from users.encuestas import reconstruir_resumen
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula desde las respuestas el resumen de encuestas por curso "
+        "(para llenarlo la primera vez o corregirlo si se desajustó)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--curso', type=int, action='append', dest='cursos',
+            help="ID del curso a recalcular; se puede repetir. Sin esta opción se recalculan todos.",
+        )
+
+    def handle(self, *args, **options):
+        filas = reconstruir_resumen(options['cursos'])
+        self.stdout.write(self.style.SUCCESS(f"Resumen reconstruido: {filas} conteos."))
@@ -0,0 +1,73 @@
+# users/management/commands/run_workers.py
+import os
+import socket
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import DatabaseError, close_old_connections, connection
+
+from users.trabajos import ejecutar, liberar_atascados, reclamar_siguiente
+from users.webinar import limpiar_importaciones_expiradas
+
+
+class Command(BaseCommand):
+    help = "Procesa los trabajos en segundo plano (ZIP, envíos masivos, webinars) encolados en la base de datos."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Número de hilos que procesan trabajos a la vez.")
+        parser.add_argument('--intervalo', type=float, default=2.0, help="Segundos de espera cuando la cola está vacía.")
+        parser.add_argument('--una-vez', action='store_true', help="Vacía la cola y termina (útil para cron).")
+
+    def handle(self, *args, **options):
+        self.detener = threading.Event()
+        liberados = liberar_atascados()
+        if liberados:
+            self.stdout.write(f"Se volvieron a encolar {liberados} trabajos atascados.")
+
+        hilos = [
+            threading.Thread(
+                target=self._ciclo,
+                args=(f"{socket.gethostname()}:{os.getpid()}:{i}", options['intervalo'], options['una_vez']),
+                daemon=True,
+            )
+            for i in range(options['workers'])
+        ]
+        for hilo in hilos:
+            hilo.start()
+        self.stdout.write(self.style.SUCCESS(f"{len(hilos)} worker(s) esperando trabajos..."))
+
+        try:
+            while any(hilo.is_alive() for hilo in hilos):
+                for hilo in hilos:
+                    hilo.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self.stdout.write("Deteniendo workers; se termina el trabajo en curso...")
+            self.detener.set()
+            for hilo in hilos:
+                hilo.join()
+
+    def _ciclo(self, nombre, intervalo, una_vez):
+        try:
+            while not self.detener.is_set():
+                close_old_connections()
+                try:
+                    trabajo = reclamar_siguiente(nombre)
+                    if trabajo is None and not una_vez:
+                        liberar_atascados()
+                        limpiar_importaciones_expiradas()
+                except DatabaseError as e:
+                    # Base ocupada o conexión perdida: se reintenta en la siguiente vuelta
+                    self.stderr.write(f"[{nombre}] No se pudo consultar la cola: {e}")
+                    connection.close()
+                    self.detener.wait(intervalo)
+                    continue
+                if trabajo is None:
+                    if una_vez:
+                        return
+                    self.detener.wait(intervalo)
+                    continue
+                self.stdout.write(f"[{nombre}] Procesando {trabajo}")
+                trabajo = ejecutar(trabajo)
+                self.stdout.write(f"[{nombre}] {trabajo}: {trabajo.mensaje}")
+        finally:
+            connection.close()
@@ -0,0 +1,87 @@
+# users/management/commands/tiempos_importacion.py
+import json
+import os
+import subprocess
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Librerías que no deberían cargarse al arrancar: solo las usan rutas específicas
+PESADAS = ('xhtml2pdf', 'reportlab', 'pypdf', 'openpyxl', 'PIL', 'requests')
+
+# Lo mismo que ocurre en un arranque en frío: se carga la app WSGI y, con la
+# primera petición, las URLs (y con ellas todas las vistas).
+CODIGO_ARRANQUE = "import config.wsgi"
+CODIGO_URLS = "; from django.urls import get_resolver; get_resolver().url_patterns"
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide cuánto tarda en importarse config.wsgi (más las URLs) módulo por módulo, "
+        "para detectar regresiones en el arranque en frío."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=20, help="Cuántos módulos mostrar, de más a menos lento.")
+        parser.add_argument('--sin-urls', action='store_true', help="Medir solo config.wsgi, sin cargar las URLs.")
+        parser.add_argument(
+            '--presupuesto-ms', type=float, default=None,
+            help="Falla si el tiempo total de importación supera este valor.",
+        )
+        parser.add_argument(
+            '--estricto', action='store_true',
+            help=f"Falla si se carga alguna librería pesada ({', '.join(PESADAS)}).",
+        )
+        parser.add_argument('--json', action='store_true', help="Salida en JSON.")
+
+    def handle(self, *args, **options):
+        codigo = CODIGO_ARRANQUE + ("" if options['sin_urls'] else CODIGO_URLS)
+        # Proceso nuevo: en este ya está todo importado
+        proceso = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', codigo],
+            capture_output=True, text=True, env=os.environ.copy(),
+        )
+        if proceso.returncode != 0:
+            raise CommandError(f"No se pudo importar la aplicación:\n{proceso.stderr[-2000:]}")
+
+        modulos = self._leer_importtime(proceso.stderr)
+        total_ms = sum(m['propio_ms'] for m in modulos)
+        pesadas = sorted({m['modulo'].split('.')[0] for m in modulos} & set(PESADAS))
+        lentos = sorted(modulos, key=lambda m: m['acumulado_ms'], reverse=True)[:options['top']]
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'total_ms': round(total_ms, 1),
+                'modulos': len(modulos),
+                'pesadas_cargadas': pesadas,
+                'mas_lentos': lentos,
+            }, indent=2))
+        else:
+            self.stdout.write(f"Tiempo total de importación: {total_ms:.1f} ms ({len(modulos)} módulos)")
+            self.stdout.write(f"{'acumulado ms':>13} {'propio ms':>10}  módulo")
+            for m in lentos:
+                self.stdout.write(f"{m['acumulado_ms']:>13.1f} {m['propio_ms']:>10.1f}  {m['modulo']}")
+            if pesadas:
+                self.stdout.write(self.style.WARNING(f"Librerías pesadas cargadas al arrancar: {', '.join(pesadas)}"))
+
+        if options['estricto'] and pesadas:
+            raise CommandError(f"Se cargan librerías pesadas al arrancar: {', '.join(pesadas)}")
+        presupuesto = options['presupuesto_ms']
+        if presupuesto is not None and total_ms > presupuesto:
+            raise CommandError(f"El arranque tarda {total_ms:.1f} ms, por encima del presupuesto de {presupuesto:.0f} ms.")
+
+    def _leer_importtime(self, salida):
+        """Convierte las líneas 'import time: propio | acumulado | módulo' en dicts (tiempos en ms)."""
+        modulos = []
+        for linea in salida.splitlines():
+            if not linea.startswith('import time:'):
+                continue
+            propio, acumulado, modulo = (parte.strip() for parte in linea[len('import time:'):].split('|'))
+            if not propio.isdigit():
+                continue  # encabezado
+            modulos.append({
+                'modulo': modulo,
+                'propio_ms': int(propio) / 1000,
+                'acumulado_ms': int(acumulado) / 1000,
+            })
+        return modulos
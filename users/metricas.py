@@ -0,0 +1,171 @@
+# users/metricas.py
+"""
+Medición de tiempos por petición (y por trabajo en segundo plano).
+
+Uso:
+    with medir('pdf'):
+        ...
+
+Si no hay una recolección activa (`recolectar()` o el middleware
+`ServerTimingMiddleware`), `medir` no hace nada, así que se puede dejar en
+las rutas calientes sin costo. Las etapas que se usan en el proyecto son:
+db, plantilla, imagen, pdf, zip y correo.
+"""
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+
+from django.conf import settings
+from django.template.backends.django import DjangoTemplates, Template
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+_actual = ContextVar('metricas_constancias', default=None)
+# Etapas abiertas en el contexto actual, para no contar dos veces una etapa anidada
+_abiertas = ContextVar('metricas_etapas_abiertas', default=frozenset())
+
+
+class Metricas:
+    """Tiempo acumulado y número de veces de cada etapa."""
+
+    def __init__(self):
+        self.etapas = {}
+        self._lock = threading.Lock()
+
+    def agregar(self, etapa, segundos):
+        with self._lock:
+            total, veces = self.etapas.get(etapa, (0.0, 0))
+            self.etapas[etapa] = (total + segundos, veces + 1)
+
+    def resumen(self):
+        """{etapa: {'ms': ..., 'veces': ...}}"""
+        with self._lock:
+            return {
+                etapa: {'ms': round(total * 1000, 2), 'veces': veces}
+                for etapa, (total, veces) in self.etapas.items()
+            }
+
+    def server_timing(self, total_ms=None):
+        """Valor del encabezado Server-Timing (las etapas pueden traslaparse)."""
+        partes = [
+            f'{etapa};dur={datos["ms"]};desc="{datos["veces"]}x"'
+            for etapa, datos in self.resumen().items()
+        ]
+        if total_ms is not None:
+            partes.append(f'total;dur={round(total_ms, 2)}')
+        return ', '.join(partes)
+
+
+@contextmanager
+def recolectar(metricas=None):
+    """Activa la recolección para el bloque; regresa el objeto `Metricas`."""
+    metricas = metricas or Metricas()
+    token = _actual.set(metricas)
+    try:
+        yield metricas
+    finally:
+        _actual.reset(token)
+
+
+def contexto_actual():
+    """
+    Copia del contexto con la recolección activa, para seguir midiendo en
+    otro hilo o en un generador que se consume después (`contexto.run(...)`).
+    """
+    return copy_context()
+
+
+@contextmanager
+def medir(etapa):
+    """Suma la duración del bloque a `etapa`. También sirve como decorador."""
+    metricas = _actual.get()
+    abiertas = _abiertas.get()
+    if metricas is None or etapa in abiertas:
+        yield
+        return
+    token = _abiertas.set(abiertas | {etapa})
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        metricas.agregar(etapa, time.perf_counter() - inicio)
+        _abiertas.reset(token)
+
+
+def medir_consulta(execute, sql, params, many, context):
+    """Para `connection.execute_wrapper`: cuenta cada consulta como etapa 'db'."""
+    with medir('db'):
+        return execute(sql, params, many, context)
+
+
+def registrar(tipo, datos, metricas, total_ms):
+    """
+    Escribe la línea de log estructurada y, si pasó del umbral, la guarda en
+    `peticiones_lentas`.
+    """
+    entrada = {
+        'tipo': tipo,
+        'fecha': timezone.now().isoformat(timespec='seconds'),
+        **datos,
+        'total_ms': round(total_ms, 2),
+        'etapas': metricas.resumen(),
+    }
+    logger.info(json.dumps(entrada, ensure_ascii=False))
+    if total_ms >= getattr(settings, 'CONSTANCIAS_UMBRAL_LENTO_MS', 1000):
+        peticiones_lentas.agregar(entrada)
+    return entrada
+
+
+class PeticionesLentas:
+    """
+    Búfer circular (por proceso) con las últimas peticiones y trabajos que
+    pasaron del umbral. Lo consulta el personal desde `peticiones_lentas_view`.
+    """
+
+    def __init__(self):
+        self._entradas = None
+        self._lock = threading.Lock()
+
+    def _buffer(self):
+        if self._entradas is None:
+            self._entradas = deque(maxlen=getattr(settings, 'CONSTANCIAS_PETICIONES_LENTAS_MAX', 100))
+        return self._entradas
+
+    def agregar(self, entrada):
+        with self._lock:
+            self._buffer().append(entrada)
+
+    def listar(self):
+        """Las más recientes primero."""
+        with self._lock:
+            return list(reversed(self._buffer()))
+
+    def limpiar(self):
+        with self._lock:
+            self._buffer().clear()
+
+
+peticiones_lentas = PeticionesLentas()
+
+
+# --- BACKEND DE PLANTILLAS ---
+
+class _PlantillaMedida(Template):
+    def render(self, context=None, request=None):
+        with medir('plantilla'):
+            return super().render(context, request)
+
+
+class PlantillasMedidas(DjangoTemplates):
+    """DjangoTemplates que mide cada render como etapa 'plantilla'."""
+
+    def from_string(self, template_code):
+        return _PlantillaMedida(super().from_string(template_code).template, self)
+
+    def get_template(self, template_name):
+        return _PlantillaMedida(super().get_template(template_name).template, self)
@@ -0,0 +1,64 @@
+# users/middleware.py
+import time
+
+from django.conf import settings
+from django.db import connection
+
+from .metricas import contexto_actual, medir_consulta, recolectar, registrar
+
+
+class ServerTimingMiddleware:
+    """
+    Desglosa cada petición por etapas (db, plantilla, imagen, pdf, zip,
+    correo), las manda en el encabezado Server-Timing y deja una línea de
+    log estructurada. Va al principio de MIDDLEWARE para medir todo.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not getattr(settings, 'CONSTANCIAS_METRICAS_ACTIVAS', True):
+            return self.get_response(request)
+
+        inicio = time.perf_counter()
+        with recolectar() as metricas, connection.execute_wrapper(medir_consulta):
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - inicio) * 1000
+
+        response['Server-Timing'] = metricas.server_timing(total_ms)
+        # Un ZIP en streaming se genera después de salir de aquí: lo medimos
+        # mientras se envía y el log sale al terminar. Los archivos (FileResponse)
+        # los manda el servidor directamente y no tienen nada que medir.
+        if response.streaming and not response.is_async and getattr(response, 'file_to_stream', None) is None:
+            response.streaming_content = self._midiendo(response.streaming_content, request, response, metricas, inicio)
+        else:
+            self._registrar(request, response, metricas, total_ms)
+        return response
+
+    def _midiendo(self, contenido, request, response, metricas, inicio):
+        with recolectar(metricas):
+            contexto = contexto_actual()
+        iterador = iter(contenido)
+        try:
+            while True:
+                try:
+                    trozo = contexto.run(self._siguiente, iterador)
+                except StopIteration:
+                    return
+                yield trozo
+        finally:
+            self._registrar(request, response, metricas, (time.perf_counter() - inicio) * 1000)
+
+    @staticmethod
+    def _siguiente(iterador):
+        with connection.execute_wrapper(medir_consulta):
+            return next(iterador)
+
+    @staticmethod
+    def _registrar(request, response, metricas, total_ms):
+        registrar('peticion', {
+            'metodo': request.method,
+            'ruta': request.path,
+            'estado': response.status_code,
+        }, metricas, total_ms)
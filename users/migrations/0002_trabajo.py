@@ -0,0 +1,41 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:37
+
+import django.db.models.deletion
+import users.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Trabajo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('zip', 'Descarga ZIP de constancias'), ('correo', 'Envío masivo por correo'), ('webinar', 'Emisión de constancias de webinar')], max_length=20, verbose_name='Tipo de Trabajo')),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En proceso'), ('completado', 'Completado'), ('fallido', 'Fallido')], default='pendiente', max_length=20, verbose_name='Estado')),
+                ('parametros', models.JSONField(blank=True, default=dict)),
+                ('progreso', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('resultado', models.FileField(blank=True, null=True, storage=users.models._storage_trabajos, upload_to='trabajos/', verbose_name='Archivo Resultado')),
+                ('mensaje', models.CharField(blank=True, max_length=255)),
+                ('errores', models.TextField(blank=True, verbose_name='Bitácora de Errores')),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('latido', models.DateTimeField(blank=True, help_text='Última señal de vida del worker que lo procesa.', null=True)),
+                ('creado_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='trabajos', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Trabajo en Segundo Plano',
+                'verbose_name_plural': 'Trabajos en Segundo Plano',
+                'indexes': [models.Index(fields=['estado', 'fecha_creacion'], name='users_traba_estado_fb1e69_idx')],
+            },
+        ),
+    ]
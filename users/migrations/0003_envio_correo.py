@@ -0,0 +1,32 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:39
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0002_trabajo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EnvioCorreo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('lote', models.CharField(max_length=64, verbose_name='Lote de Envío')),
+                ('email', models.EmailField(max_length=254)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('enviado', 'Enviado'), ('fallido', 'Fallido')], default='pendiente', max_length=20)),
+                ('intentos', models.PositiveIntegerField(default=0)),
+                ('error', models.TextField(blank=True)),
+                ('fecha_envio', models.DateTimeField(blank=True, null=True)),
+                ('constancia', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='envios_correo', to='users.constancia')),
+            ],
+            options={
+                'verbose_name': 'Envío de Correo',
+                'verbose_name_plural': 'Envíos de Correo',
+                'unique_together': {('lote', 'constancia')},
+            },
+        ),
+    ]
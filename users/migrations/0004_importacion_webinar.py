@@ -0,0 +1,52 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:47
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0003_envio_correo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportacionWebinar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('curso_nombre', models.CharField(max_length=255, verbose_name='Nombre del Evento/Webinar')),
+                ('fecha_inicio', models.DateField()),
+                ('fecha_termino', models.DateField()),
+                ('duracion_en_horas', models.DecimalField(decimal_places=1, max_digits=4)),
+                ('calificados', models.PositiveIntegerField(default=0)),
+                ('no_calificados', models.PositiveIntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('expira', models.DateTimeField(db_index=True)),
+                ('creado_por', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='importaciones_webinar', to=settings.AUTH_USER_MODEL)),
+                ('firma_especialista', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Importación de Webinar',
+                'verbose_name_plural': 'Importaciones de Webinar',
+            },
+        ),
+        migrations.CreateModel(
+            name='AsistenteWebinar',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('nombre_completo', models.CharField(max_length=255)),
+                ('institucion', models.CharField(blank=True, max_length=255)),
+                ('duracion_total', models.PositiveIntegerField(default=0, verbose_name='Minutos conectado')),
+                ('califica', models.BooleanField(default=False)),
+                ('importacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='asistentes', to='users.importacionwebinar')),
+            ],
+            options={
+                'verbose_name': 'Asistente de Webinar',
+                'verbose_name_plural': 'Asistentes de Webinar',
+                'indexes': [models.Index(fields=['importacion', 'califica', 'id'], name='users_asist_importa_5c4d46_idx')],
+            },
+        ),
+    ]
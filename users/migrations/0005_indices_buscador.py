@@ -0,0 +1,22 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:50
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0004_importacion_webinar'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='constancia',
+            index=models.Index(fields=['participante', 'fecha_emision'], name='constancia_part_emision_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participante',
+            index=models.Index(django.db.models.functions.text.Upper('email'), name='participante_email_upper_idx'),
+        ),
+    ]
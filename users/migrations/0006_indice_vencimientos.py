@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_indices_buscador'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='constancia',
+            index=models.Index(fields=['es_webinar', 'fecha_vencimiento'], name='constancia_vencimiento_idx'),
+        ),
+    ]
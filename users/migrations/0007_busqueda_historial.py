@@ -0,0 +1,44 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+# Índices de trigramas para la búsqueda con icontains (users/busqueda.py).
+# Solo existen en Postgres; en SQLite la búsqueda recorre la tabla.
+INDICES_TRIGRAMAS = (
+    ('participante_nombre_trgm_idx', 'users_participante', 'nombre_completo'),
+    ('participante_email_trgm_idx', 'users_participante', 'email'),
+    ('curso_nombre_trgm_idx', 'users_curso', 'nombre'),
+)
+
+
+def crear_indices_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for nombre, tabla, columna in INDICES_TRIGRAMAS:
+        # Misma expresión que genera icontains: UPPER(columna::text)
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} USING gin (UPPER({columna}::text) gin_trgm_ops)'
+        )
+
+
+def borrar_indices_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre, _, _ in INDICES_TRIGRAMAS:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {nombre}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_indice_vencimientos'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='constancia',
+            index=models.Index(fields=['fecha_emision', 'id'], name='constancia_emision_id_idx'),
+        ),
+        migrations.RunPython(crear_indices_trigramas, borrar_indices_trigramas),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:55
+
+from django.db import migrations, models
+
+
+def crear_indice_trigramas(apps, schema_editor):
+    # Como en 0007: búsqueda por institución en el directorio, solo en Postgres
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS institucion_nombre_trgm_idx '
+        'ON users_institucion USING gin (UPPER(nombre::text) gin_trgm_ops)'
+    )
+
+
+def borrar_indice_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS institucion_nombre_trgm_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_busqueda_historial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='participante',
+            index=models.Index(fields=['nombre_completo', 'id'], name='participante_nombre_idx'),
+        ),
+        migrations.RunPython(crear_indice_trigramas, borrar_indice_trigramas),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_directorio_participantes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='encuestarespuesta',
+            index=models.Index(fields=['fecha_respuesta'], name='encuesta_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='leadventa',
+            index=models.Index(fields=['fecha_creacion'], name='leadventa_fecha_idx'),
+        ),
+    ]
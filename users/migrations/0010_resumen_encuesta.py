@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_indices_admin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenEncuesta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pregunta', models.CharField(max_length=30)),
+                ('opcion', models.CharField(max_length=50)),
+                ('total', models.PositiveIntegerField(default=0)),
+                ('curso', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_encuesta', to='users.curso')),
+            ],
+            options={
+                'verbose_name': 'Resumen de Encuesta',
+                'verbose_name_plural': 'Resúmenes de Encuestas',
+                'unique_together': {('curso', 'pregunta', 'opcion')},
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_resumen_encuesta'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='trabajo',
+            name='tipo',
+            field=models.CharField(choices=[('zip', 'Descarga ZIP de constancias'), ('correo', 'Envío masivo por correo'), ('webinar', 'Emisión de constancias de webinar'), ('participantes', 'Importación de participantes')], max_length=20, verbose_name='Tipo de Trabajo'),
+        ),
+    ]
@@ -1,6 +1,12 @@
 # users/models.py
 from django.db import models
+from django.conf import settings
 from django.contrib.auth.models import AbstractUser
+from django.core.files.storage import FileSystemStorage, storages
+from django.core.signals import setting_changed
+from django.db.models.functions import Upper
+from django.dispatch import receiver
+from django.utils.functional import LazyObject, empty
 import uuid
 
 class Evaluador(AbstractUser):
@@ -67,6 +73,12 @@ class Participante(models.Model):
     class Meta:
         verbose_name = "Participante"
         verbose_name_plural = "Participantes"
+        indexes = [
+            # El buscador público compara el correo sin distinguir mayúsculas
+            models.Index(Upper('email'), name='participante_email_upper_idx'),
+            # Directorio de participantes, ordenado por nombre
+            models.Index(fields=['nombre_completo', 'id'], name='participante_nombre_idx'),
+        ]
 
     def __str__(self):
         return self.nombre_completo
@@ -103,6 +115,14 @@ class Constancia(models.Model):
         verbose_name = "Constancia"
         verbose_name_plural = "Constancias"
         unique_together = ('participante', 'curso', 'fecha_inicio')
+        indexes = [
+            # Constancias recientes de un participante (buscador público)
+            models.Index(fields=['participante', 'fecha_emision'], name='constancia_part_emision_idx'),
+            # Listas de por vencer / vencidas del dashboard
+            models.Index(fields=['es_webinar', 'fecha_vencimiento'], name='constancia_vencimiento_idx'),
+            # Paginación por llave del historial
+            models.Index(fields=['fecha_emision', 'id'], name='constancia_emision_id_idx'),
+        ]
 
     def __str__(self):
         return f"Constancia para {self.participante} en el curso {self.curso}"
@@ -169,9 +189,34 @@ class EncuestaRespuesta(models.Model):
     
     fecha_respuesta = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        # Filtro por fecha (date_hierarchy) del admin
+        indexes = [models.Index(fields=['fecha_respuesta'], name='encuesta_fecha_idx')]
+
     def __str__(self):
         return f"Respuesta de {self.nombre_completo}"
 
+class ResumenEncuesta(models.Model):
+    """
+    Conteo de respuestas de la encuesta por curso, pregunta y opción. Se
+    incrementa al guardar cada respuesta (users/encuestas.py), así los
+    reportes no recorren EncuestaRespuesta. Si se desajusta:
+    python manage.py reconstruir_resumen_encuestas
+    """
+    curso = models.ForeignKey(Curso, on_delete=models.CASCADE, related_name='resumen_encuesta')
+    pregunta = models.CharField(max_length=30)
+    opcion = models.CharField(max_length=50)
+    total = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Resumen de Encuesta"
+        verbose_name_plural = "Resúmenes de Encuestas"
+        unique_together = ('curso', 'pregunta', 'opcion')
+
+    def __str__(self):
+        return f"{self.curso} · {self.pregunta} = {self.opcion}: {self.total}"
+
+
 class LeadVenta(models.Model):
     participante = models.ForeignKey(Participante, on_delete=models.CASCADE)
     curso = models.ForeignKey(Curso, on_delete=models.CASCADE)
@@ -180,6 +225,176 @@ class LeadVenta(models.Model):
     class Meta:
         # Evita que se cree el mismo lead dos veces
         unique_together = ('participante', 'curso')
+        # Filtro por fecha (date_hierarchy) del admin
+        indexes = [models.Index(fields=['fecha_creacion'], name='leadventa_fecha_idx')]
+
+    def __str__(self):
+        return f"Lead: {self.participante.nombre_completo} (desde el curso {self.curso.nombre})"
+
+
+class _StorageTrabajos(LazyObject):
+    """
+    Almacenamiento de los trabajos, resuelto con los settings del momento en
+    que se usa (no los del arranque) y vuelto a resolver si cambian, p. ej.
+    con override_settings en pruebas o en bench_constancias.
+    """
+
+    def _setup(self):
+        # Los workers y el sitio deben ver el mismo almacenamiento
+        alias = getattr(settings, 'CONSTANCIAS_TRABAJOS_STORAGE', None)
+        if alias:
+            self._wrapped = storages[alias]
+        else:
+            self._wrapped = FileSystemStorage(location=settings.CONSTANCIAS_TRABAJOS_DIR)
+
+
+_almacen_trabajos = _StorageTrabajos()
+
+
+@receiver(setting_changed)
+def _reiniciar_storage_trabajos(setting, **kwargs):
+    if setting in ('CONSTANCIAS_TRABAJOS_STORAGE', 'CONSTANCIAS_TRABAJOS_DIR', 'STORAGES'):
+        _almacen_trabajos._wrapped = empty
+
+
+def _storage_trabajos():
+    return _almacen_trabajos
+
+
+class Trabajo(models.Model):
+    """
+    Tarea pesada (ZIP, envío masivo, emisión de webinar, importación, exportación) que corre fuera de la
+    petición HTTP con `python manage.py run_workers`.
+    """
+    TIPO_ZIP = 'zip'
+    TIPO_CORREO = 'correo'
+    TIPO_WEBINAR = 'webinar'
+    TIPO_PARTICIPANTES = 'participantes'
+    TIPO_EXPORTAR = 'exportar'
+    TIPOS = [
+        (TIPO_ZIP, 'Descarga ZIP de constancias'),
+        (TIPO_CORREO, 'Envío masivo por correo'),
+        (TIPO_WEBINAR, 'Emisión de constancias de webinar'),
+        (TIPO_PARTICIPANTES, 'Importación de participantes'),
+        (TIPO_EXPORTAR, 'Exportación a Excel'),
+    ]
+
+    PENDIENTE = 'pendiente'
+    EN_PROCESO = 'en_proceso'
+    COMPLETADO = 'completado'
+    FALLIDO = 'fallido'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (EN_PROCESO, 'En proceso'),
+        (COMPLETADO, 'Completado'),
+        (FALLIDO, 'Fallido'),
+    ]
+
+    tipo = models.CharField(max_length=20, choices=TIPOS, verbose_name="Tipo de Trabajo")
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE, verbose_name="Estado")
+    parametros = models.JSONField(default=dict, blank=True)
+    progreso = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    resultado = models.FileField(upload_to='trabajos/', storage=_storage_trabajos, null=True, blank=True, verbose_name="Archivo Resultado")
+    mensaje = models.CharField(max_length=255, blank=True)
+    errores = models.TextField(blank=True, verbose_name="Bitácora de Errores")
+    creado_por = models.ForeignKey(Evaluador, on_delete=models.SET_NULL, null=True, blank=True, related_name='trabajos')
+    worker = models.CharField(max_length=100, blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+    latido = models.DateTimeField(null=True, blank=True, help_text="Última señal de vida del worker que lo procesa.")
+
+    class Meta:
+        verbose_name = "Trabajo en Segundo Plano"
+        verbose_name_plural = "Trabajos en Segundo Plano"
+        indexes = [models.Index(fields=['estado', 'fecha_creacion'])]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.get_estado_display()})"
+
+    @property
+    def terminado(self):
+        return self.estado in (self.COMPLETADO, self.FALLIDO)
+
+
+class EnvioCorreo(models.Model):
+    """
+    Estado de entrega de una constancia dentro de un envío masivo; permite
+    retomar un lote interrumpido sin volver a mandar lo que ya salió.
+    """
+    PENDIENTE = 'pendiente'
+    ENVIADO = 'enviado'
+    FALLIDO = 'fallido'
+    ESTADOS = [
+        (PENDIENTE, 'Pendiente'),
+        (ENVIADO, 'Enviado'),
+        (FALLIDO, 'Fallido'),
+    ]
+
+    lote = models.CharField(max_length=64, verbose_name="Lote de Envío")
+    constancia = models.ForeignKey(Constancia, on_delete=models.CASCADE, related_name='envios_correo')
+    email = models.EmailField()
+    estado = models.CharField(max_length=20, choices=ESTADOS, default=PENDIENTE)
+    intentos = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    fecha_envio = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name = "Envío de Correo"
+        verbose_name_plural = "Envíos de Correo"
+        unique_together = ('lote', 'constancia')
+
+    def __str__(self):
+        return f"{self.email} ({self.get_estado_display()})"
+
+
+class ImportacionWebinar(models.Model):
+    """
+    Reporte de asistentes ya leído, en espera de que se confirme en el paso 2
+    del asistente de webinar. Antes vivía completo en la sesión.
+    """
+    creado_por = models.ForeignKey(Evaluador, on_delete=models.CASCADE, related_name='importaciones_webinar')
+    curso_nombre = models.CharField(max_length=255, verbose_name="Nombre del Evento/Webinar")
+    fecha_inicio = models.DateField()
+    fecha_termino = models.DateField()
+    duracion_en_horas = models.DecimalField(max_digits=4, decimal_places=1)
+    firma_especialista = models.ForeignKey(Evaluador, on_delete=models.SET_NULL, null=True, related_name='+')
+    calificados = models.PositiveIntegerField(default=0)
+    no_calificados = models.PositiveIntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    expira = models.DateTimeField(db_index=True)
+
+    class Meta:
+        verbose_name = "Importación de Webinar"
+        verbose_name_plural = "Importaciones de Webinar"
+
+    def __str__(self):
+        return f"{self.curso_nombre} ({self.calificados} calificados)"
+
+    def evento(self):
+        """Datos del evento con la misma forma que usaba la sesión."""
+        return {
+            'curso_nombre': self.curso_nombre,
+            'fecha_inicio': self.fecha_inicio.isoformat(),
+            'fecha_termino': self.fecha_termino.isoformat(),
+            'duracion_en_horas': float(self.duracion_en_horas),
+            'firma_especialista_id': self.firma_especialista_id,
+        }
+
+
+class AsistenteWebinar(models.Model):
+    importacion = models.ForeignKey(ImportacionWebinar, on_delete=models.CASCADE, related_name='asistentes')
+    email = models.EmailField()
+    nombre_completo = models.CharField(max_length=255)
+    institucion = models.CharField(max_length=255, blank=True)
+    duracion_total = models.PositiveIntegerField(default=0, verbose_name="Minutos conectado")
+    califica = models.BooleanField(default=False)
+
+    class Meta:
+        verbose_name = "Asistente de Webinar"
+        verbose_name_plural = "Asistentes de Webinar"
+        indexes = [models.Index(fields=['importacion', 'califica', 'id'])]
 
     def __str__(self):
-        return f"Lead: {self.participante.nombre_completo} (desde el curso {self.curso.nombre})"
\ No newline at end of file
+        return self.email
@@ -0,0 +1,114 @@
+# users/paginacion.py
+"""
+Paginación por llave (keyset) para listas ordenadas por (fecha, id) de más
+reciente a más antiguo.
+
+A diferencia de `Paginator`, no cuenta el total ni usa OFFSET: cada página
+pide los N renglones que siguen (o preceden) al último que se mostró, así
+que la página 500 cuesta lo mismo que la primera. A cambio solo hay
+"Anterior" y "Siguiente", sin número de página.
+"""
+from datetime import date
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+class PaginaKeyset:
+    def __init__(self, objetos, siguiente=None, anterior=None):
+        self.objetos = objetos
+        # Cursores para pedir la página siguiente / anterior (None si no hay)
+        self.siguiente = siguiente
+        self.anterior = anterior
+
+    def __iter__(self):
+        return iter(self.objetos)
+
+    def __len__(self):
+        return len(self.objetos)
+
+
+def _cursor(objeto, campo_fecha):
+    return f"{getattr(objeto, campo_fecha).isoformat()}.{objeto.pk}"
+
+
+def _leer_cursor(cursor):
+    """'2026-01-31.123' -> (date, 123); None si no es válido."""
+    try:
+        fecha, pk = cursor.split('.')
+        return date.fromisoformat(fecha), int(pk)
+    except (AttributeError, ValueError):
+        return None
+
+
+def pagina_keyset(queryset, por_pagina, despues=None, antes=None, campo_fecha='fecha_emision'):
+    """
+    Página de `queryset` ordenada por (campo_fecha, pk) descendente.
+    `despues` / `antes` son los cursores que regresó la página anterior; si
+    no viene ninguno (o no es válido) se regresa la primera página.
+    """
+    antes = _leer_cursor(antes)
+    despues = None if antes else _leer_cursor(despues)
+
+    if antes:
+        fecha, pk = antes
+        # El límite simple sobre la fecha deja que la base use el índice como rango
+        queryset = queryset.filter(
+            Q(**{f'{campo_fecha}__gt': fecha}) | Q(**{campo_fecha: fecha, 'pk__gt': pk}),
+            **{f'{campo_fecha}__gte': fecha},
+        ).order_by(campo_fecha, 'pk')
+    else:
+        if despues:
+            fecha, pk = despues
+            queryset = queryset.filter(
+                Q(**{f'{campo_fecha}__lt': fecha}) | Q(**{campo_fecha: fecha, 'pk__lt': pk}),
+                **{f'{campo_fecha}__lte': fecha},
+            )
+        queryset = queryset.order_by(f'-{campo_fecha}', '-pk')
+
+    # Uno de más para saber si hay otra página en esa dirección
+    objetos = list(queryset[:por_pagina + 1])
+    hay_mas = len(objetos) > por_pagina
+    objetos = objetos[:por_pagina]
+
+    if antes:
+        objetos.reverse()
+        hay_siguiente, hay_anterior = True, hay_mas
+    else:
+        hay_siguiente, hay_anterior = hay_mas, despues is not None
+
+    if not objetos:
+        return PaginaKeyset(objetos)
+    return PaginaKeyset(
+        objetos,
+        siguiente=_cursor(objetos[-1], campo_fecha) if hay_siguiente else None,
+        anterior=_cursor(objetos[0], campo_fecha) if hay_anterior else None,
+    )
+
+
+class PaginadorEstimado(Paginator):
+    """
+    Paginator para el admin: sin búsqueda ni filtros, en Postgres toma el
+    total estimado de pg_class en vez de hacer COUNT(*) sobre toda la tabla
+    (`show_full_result_count = False` solo quita el segundo conteo, no este).
+    Con filtros, o en tablas chicas, cuenta normalmente.
+    """
+    MINIMO_ESTIMADO = 10000
+
+    @cached_property
+    def count(self):
+        consulta = getattr(self.object_list, 'query', None)
+        conexion = connections[self.object_list.db] if consulta is not None else None
+        if conexion is not None and conexion.vendor == 'postgresql' and not consulta.where:
+            with conexion.cursor() as cursor:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [self.object_list.model._meta.db_table],
+                )
+                fila = cursor.fetchone()
+            # reltuples es -1 (o 0) si la tabla nunca se ha analizado
+            if fila and fila[0] >= self.MINIMO_ESTIMADO:
+                return fila[0]
+        return super().count
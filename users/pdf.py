@@ -0,0 +1,112 @@
+# users/pdf.py
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from .imagenes import _imagen_a_base64
+from .metricas import medir
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_CONSTANCIA = 'pdf/constancia_template.html'
+
+MESES = {
+    1: "enero", 2: "febrero", 3: "marzo", 4: "abril",
+    5: "mayo", 6: "junio", 7: "julio", 8: "agosto",
+    9: "septiembre", 10: "octubre", 11: "noviembre", 12: "diciembre"
+}
+
+
+def link_callback(uri, rel):
+    if uri.startswith('data:'):
+        return uri
+    if uri.startswith('http://') or uri.startswith('https://'):
+        return uri
+    # Para cualquier archivo local
+    path = uri.lstrip('/').lstrip('\\')
+    full_path = os.path.join(settings.BASE_DIR, 'static', path)
+    if os.path.exists(full_path):
+        return full_path
+    return uri
+
+
+def _ruta_fondo():
+    # Construimos la ruta absoluta usando BASE_DIR para que funcione en Windows/Linux
+    bg_path = os.path.join(settings.BASE_DIR, 'static', 'images', 'fondo_constancia.png')
+    if not os.path.exists(bg_path):
+        bg_path = os.path.join(settings.BASE_DIR, 'staticfiles', 'images', 'fondo_constancia.png')
+    return bg_path
+
+
+def _contexto_pdf(constancia):
+    """
+    Arma el contexto que lee `pdf/constancia_template.html`.
+    """
+    # 1. Procesar FONDO (Archivo Estático Local)
+    bg_url = _imagen_a_base64(_ruta_fondo())
+
+    # 2. Procesar FIRMAS (Pueden estar en Local o en Cloudinary)
+    firma_g_url = ""
+    if constancia.firma_gerente and constancia.firma_gerente.firma_digital:
+        firma_g_url = _imagen_a_base64(constancia.firma_gerente.firma_digital)
+
+    firma_e_url = ""
+    if constancia.firma_especialista and constancia.firma_especialista.firma_digital:
+        firma_e_url = _imagen_a_base64(constancia.firma_especialista.firma_digital)
+
+    # 3. Formateo de Fechas
+    f = constancia.fecha_termino
+    fecha_texto = f"{f.day} de {MESES[f.month]} de {f.year}" if f else ""
+    duracion_formateada = f"{int(constancia.duracion_en_horas):02d}" if constancia.duracion_en_horas else "00"
+
+    # 4. Preparar Contexto para el HTML
+    return {
+        'constancia': constancia,
+        'nombre_participante': constancia.participante.nombre_completo,
+        'codigo_verificacion': constancia.codigo_verificacion,
+        'bg_url': bg_url,         # <--- Base64 del fondo
+        'firma_g_url': firma_g_url, # <--- Base64 de firma gerente
+        'firma_e_url': firma_e_url, # <--- Base64 de firma especialista
+        'fecha_texto': fecha_texto,
+        'duracion_formateada': duracion_formateada,
+    }
+
+
+def _html_a_pdf(html_string):
+    """
+    Convierte el HTML con xhtml2pdf. Regresa (bytes, errores); bytes es None si falló.
+    """
+    # xhtml2pdf (y reportlab detrás) es lo más lento de importar; solo se carga al generar
+    from xhtml2pdf import pisa
+
+    buffer = io.BytesIO()
+    with medir('pdf'):
+        pisa_status = pisa.CreatePDF(
+            html_string,
+            dest=buffer,
+            link_callback=link_callback,
+            encoding='UTF-8'
+        )
+    if pisa_status.err:
+        return None, pisa_status.err
+    return buffer.getvalue(), pisa_status.err
+
+
+def _generar_pdf_bytes(constancia):
+    context = _contexto_pdf(constancia)
+    if not context['bg_url']:
+        logger.warning("No se pudo cargar el fondo en Base64 (constancia %s)", constancia.pk)
+
+    # 5. Renderizar el HTML con los datos
+    # Asegúrate de que tu template HTML use: <img src="{{ bg_url }}">
+    html_string = render_to_string(TEMPLATE_CONSTANCIA, context)
+
+    # 6. Generar el PDF en Memoria
+    pdf_bytes, errores = _html_a_pdf(html_string)
+    if errores:
+        logger.warning("xhtml2pdf reportó %s errores en la constancia %s", errores, constancia.pk)
+
+    return pdf_bytes
@@ -0,0 +1,186 @@
+# users/pdf_plantilla.py
+"""
+Motor de "estampado" para lotes de constancias.
+
+Dentro de un lote, casi todo el diseño es igual para todos (fondo, firmas,
+firmantes, curso y fechas); solo cambian el nombre del participante y el
+código de verificación. Aquí se renderiza con xhtml2pdf una sola página base
+por grupo y después se estampa el texto variable con reportlab + pypdf.
+"""
+import io
+from collections import Counter
+
+from django.conf import settings
+from django.template.loader import render_to_string
+from pypdf import PdfReader, PdfWriter
+from reportlab.lib.colors import HexColor
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfgen import canvas
+
+from .pdf import TEMPLATE_CONSTANCIA, _contexto_pdf, _generar_pdf_bytes, _html_a_pdf
+
+# Marcadores que se usan para ubicar los campos variables en la página
+MARCADOR_NOMBRE = 'QQNOMBREQQ'
+MARCADOR_CODIGO = 'QQCODIGOQQ'
+
+# Colores tal como están en pdf/constancia_template.html
+COLOR_NOMBRE = '#004b31'
+COLOR_CODIGO = '#999999'
+
+# Con menos constancias por grupo no conviene (la plantilla cuesta dos renders)
+MINIMO_POR_GRUPO = 3
+
+
+def clave_plantilla(constancia):
+    """
+    Todo lo que el template muestra y que NO depende del participante.
+    """
+    def firmante(evaluador):
+        if not evaluador:
+            return None
+        return (evaluador.pk, evaluador.get_full_name(), evaluador.cargo, evaluador.firma_digital.name)
+
+    return (
+        constancia.curso.nombre,
+        constancia.fecha_termino,
+        int(constancia.duracion_en_horas) if constancia.duracion_en_horas else 0,
+        firmante(constancia.firma_gerente),
+        firmante(constancia.firma_especialista),
+    )
+
+
+class _Campo:
+    """Posición (centro y línea base) y fuente de un campo de texto en la página."""
+
+    def __init__(self, centro_x, base_y, fuente, tamano, color):
+        self.centro_x = centro_x
+        self.base_y = base_y
+        self.fuente = fuente
+        self.tamano = tamano
+        self.color = color
+
+
+class PlantillaConstancia:
+    """
+    Página base de un grupo + posiciones donde se estampan nombre y código.
+    """
+
+    def __init__(self, pdf_base, campos):
+        self.pdf_base = pdf_base
+        self.campos = campos
+        pagina = PdfReader(io.BytesIO(pdf_base)).pages[0]
+        self.ancho = float(pagina.mediabox.width)
+        self.alto = float(pagina.mediabox.height)
+
+    @classmethod
+    def construir(cls, constancia):
+        """
+        Hace dos renders: uno con marcadores para medir dónde caen los campos
+        y otro con los campos en blanco que sirve de fondo. Regresa None si no
+        se pudo ubicar algún campo.
+        """
+        context = _contexto_pdf(constancia)
+
+        context.update(nombre_participante=MARCADOR_NOMBRE, codigo_verificacion=MARCADOR_CODIGO)
+        pdf_calibracion, _ = _html_a_pdf(render_to_string(TEMPLATE_CONSTANCIA, context))
+        if not pdf_calibracion:
+            return None
+        campos = _medir_campos(pdf_calibracion)
+        if campos is None:
+            return None
+
+        context['modo_plantilla'] = True
+        pdf_base, _ = _html_a_pdf(render_to_string(TEMPLATE_CONSTANCIA, context))
+        if not pdf_base:
+            return None
+        return cls(pdf_base, campos)
+
+    def _cabe(self, campo, texto):
+        try:
+            texto.encode('cp1252')
+        except UnicodeEncodeError:
+            # Las fuentes estándar de reportlab no tienen esos caracteres
+            return False
+        margen = min(campo.centro_x, self.ancho - campo.centro_x)
+        return stringWidth(texto, campo.fuente, campo.tamano) <= 2 * margen
+
+    def estampar(self, constancia):
+        """
+        Regresa el PDF del participante, o None si el texto no cabe en una
+        línea (en ese caso el HTML reacomodaría el diseño y hay que renderizar completo).
+        """
+        textos = {
+            'nombre': ' '.join(constancia.participante.nombre_completo.split()),
+            'codigo': f"ID de Verificación: {constancia.codigo_verificacion}",
+        }
+        if not all(self._cabe(self.campos[k], t) for k, t in textos.items()):
+            return None
+
+        capa = io.BytesIO()
+        c = canvas.Canvas(capa, pagesize=(self.ancho, self.alto))
+        for clave, texto in textos.items():
+            campo = self.campos[clave]
+            c.setFont(campo.fuente, campo.tamano)
+            c.setFillColor(HexColor(campo.color))
+            c.drawCentredString(campo.centro_x, campo.base_y, texto)
+        c.save()
+
+        writer = PdfWriter(clone_from=io.BytesIO(self.pdf_base))
+        writer.pages[0].merge_page(PdfReader(capa).pages[0])
+        salida = io.BytesIO()
+        writer.write(salida)
+        return salida.getvalue()
+
+
+def _medir_campos(pdf_bytes):
+    encontrados = {}
+
+    def visitor(texto, cm, tm, font_dict, font_size):
+        texto = texto.strip()
+        if MARCADOR_NOMBRE in texto:
+            clave, color = 'nombre', COLOR_NOMBRE
+        elif MARCADOR_CODIGO in texto:
+            clave, color = 'codigo', COLOR_CODIGO
+        else:
+            return
+        fuente = str((font_dict or {}).get('/BaseFont', '/Helvetica')).lstrip('/')
+        x = cm[4] + tm[4]
+        y = cm[5] + tm[5]
+        ancho = stringWidth(texto, fuente, font_size)
+        encontrados[clave] = _Campo(x + ancho / 2, y, fuente, font_size, color)
+
+    PdfReader(io.BytesIO(pdf_bytes)).pages[0].extract_text(visitor_text=visitor)
+    if set(encontrados) != {'nombre', 'codigo'}:
+        return None
+    return encontrados
+
+
+def generar_pdfs_lote(constancias):
+    """
+    Genera los PDFs de un lote en el mismo orden en que llegan.
+    Produce tuplas (constancia, pdf_bytes); pdf_bytes es None si el render falló.
+
+    Las constancias que comparten diseño (mismo curso, fecha y firmantes)
+    se estampan sobre una plantilla; las demás se renderizan completas.
+    """
+    constancias = list(constancias)
+    usar_plantilla = getattr(settings, 'CONSTANCIAS_MODO_PLANTILLA', True)
+    claves = [clave_plantilla(c) for c in constancias] if usar_plantilla else []
+    tamanos = Counter(claves)
+    plantillas = {}
+
+    for i, constancia in enumerate(constancias):
+        pdf_bytes = None
+        if usar_plantilla and tamanos[claves[i]] >= MINIMO_POR_GRUPO:
+            clave = claves[i]
+            if clave not in plantillas:
+                try:
+                    plantillas[clave] = PlantillaConstancia.construir(constancia)
+                except Exception:
+                    # Falla compartida por el grupo: sus constancias se renderizan completas
+                    plantillas[clave] = None
+            if plantillas[clave] is not None:
+                pdf_bytes = plantillas[clave].estampar(constancia)
+        if pdf_bytes is None:
+            pdf_bytes = _generar_pdf_bytes(constancia)
+        yield constancia, pdf_bytes
@@ -0,0 +1,160 @@
+# users/publico.py
+"""
+Caché y límite de peticiones de las páginas públicas (buscador y descarga).
+
+Justo después de un webinar todos los asistentes buscan su correo y bajan
+su constancia en los mismos minutos. Para que esos picos no lleguen enteros
+a la base de datos:
+
+- El resultado del buscador se guarda por correo normalizado durante
+  CONSTANCIAS_BUSCADOR_CACHE_SEGUNDOS. Junto con el resultado se guarda la
+  "versión" de cada participante que aparece en él; crear, borrar o renovar
+  una de sus constancias (o editar al participante) cambia esa versión y el
+  resultado guardado deja de valer sin tener que saber con qué correo se buscó.
+- Cada cliente (IP) tiene un número máximo de búsquedas y de descargas por
+  minuto, contado en la misma caché.
+
+Usa el alias de CACHES indicado en CONSTANCIAS_CACHE_ALIAS. Con la caché en
+memoria local cada proceso lleva su propia cuenta; para compartirla entre
+instancias hay que configurar una caché común (base de datos, Redis, ...).
+"""
+import hashlib
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models.functions import Upper
+from django.utils import timezone
+
+from .models import Constancia
+
+# Días que una constancia sigue disponible en el buscador y la descarga pública
+DIAS_DISPONIBLE = 40
+
+
+def _cache():
+    return caches[getattr(settings, 'CONSTANCIAS_CACHE_ALIAS', 'default')]
+
+
+def normalizar_email(email):
+    return (email or '').strip().lower()
+
+
+def fecha_corte():
+    return timezone.now().date() - timedelta(days=DIAS_DISPONIBLE)
+
+
+def _clave_email(email):
+    # v2: el valor guardado es (versiones, constancias)
+    return 'buscador:email:v2:' + hashlib.sha256(email.encode('utf-8')).hexdigest()
+
+
+def _clave_version(participante_id):
+    return f'buscador:version:{participante_id}'
+
+
+def consulta_constancias(email):
+    """Queryset del buscador: usa participante_email_upper_idx y constancia_part_emision_idx."""
+    return (
+        Constancia.objects
+        .alias(email_participante=Upper('participante__email'))
+        .filter(email_participante=email.upper(), fecha_emision__gte=fecha_corte())
+        .select_related('curso')
+        .order_by('-fecha_emision', '-pk')
+    )
+
+
+def _consultar(email):
+    return list(consulta_constancias(email))
+
+
+def buscar_constancias(email):
+    """
+    Constancias recientes del correo (sin distinguir mayúsculas), de la
+    caché si el participante no ha cambiado desde que se guardaron.
+    """
+    email = normalizar_email(email)
+    if not email:
+        return []
+    segundos = getattr(settings, 'CONSTANCIAS_BUSCADOR_CACHE_SEGUNDOS', 120)
+    if not segundos:
+        return _consultar(email)
+
+    cache = _cache()
+    clave = _clave_email(email)
+    guardado = cache.get(clave)
+    if guardado is not None:
+        versiones, constancias = guardado
+        if cache.get_many(list(versiones)) == versiones:
+            return constancias
+
+    constancias = _consultar(email)
+    if not constancias:
+        # Los "sin resultados" no se guardan: el participante puede aparecer
+        # en cualquier momento (p. ej. al terminar la emisión de un webinar)
+        cache.delete(clave)
+        return constancias
+
+    # Sin distinguir mayúsculas, el correo puede ser de varios participantes:
+    # el resultado vale mientras ninguno de ellos cambie
+    claves = [_clave_version(pk) for pk in {c.participante_id for c in constancias}]
+    # Si una invalidación cae justo entre la consulta y estas líneas, el
+    # resultado viejo puede durar a lo más `segundos`
+    for clave_version in claves:
+        cache.add(clave_version, uuid.uuid4().hex, None)
+    versiones = cache.get_many(claves)
+    if len(versiones) == len(claves):
+        cache.set(clave, (versiones, constancias), segundos)
+    return constancias
+
+
+def invalidar_participantes(participante_ids):
+    """
+    Descarta las búsquedas guardadas de estos participantes al confirmarse
+    la transacción actual (antes, otra búsqueda volvería a guardar los datos
+    viejos con la versión nueva).
+    """
+    versiones = {_clave_version(pk): uuid.uuid4().hex for pk in set(participante_ids) if pk is not None}
+    if versiones:
+        transaction.on_commit(lambda: _cache().set_many(versiones, None))
+
+
+# --- LÍMITE DE PETICIONES ---
+
+def ip_cliente(request):
+    """
+    IP del cliente. Detrás de un proxy de confianza (Vercel) se toma del
+    encabezado CONSTANCIAS_IP_ENCABEZADO (p. ej. 'HTTP_X_FORWARDED_FOR').
+    """
+    encabezado = getattr(settings, 'CONSTANCIAS_IP_ENCABEZADO', '')
+    if encabezado and request.META.get(encabezado):
+        return request.META[encabezado].split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def esperar_limite(request, ambito, limite, ventana=60):
+    """
+    Cuenta una petición del cliente en `ambito`. Regresa 0 si todavía está
+    dentro de `limite` peticiones por `ventana` segundos, o los segundos que
+    faltan para que se reinicie la cuenta.
+    """
+    if not limite:
+        return 0
+    cache = _cache()
+    ahora = time.time()
+    clave = f'limite:{ambito}:{ip_cliente(request)}:{int(ahora // ventana)}'
+    if cache.add(clave, 1, ventana):
+        cuenta = 1
+    else:
+        try:
+            cuenta = cache.incr(clave)
+        except ValueError:
+            # La clave expiró entre add() e incr()
+            cache.set(clave, 1, ventana)
+            cuenta = 1
+    if cuenta <= limite:
+        return 0
+    return max(1, int(ventana - ahora % ventana))
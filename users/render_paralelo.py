@@ -0,0 +1,162 @@
+# users/render_paralelo.py
+"""
+Render de constancias en paralelo con un pool de procesos.
+
+xhtml2pdf es Python puro y ocupa un solo núcleo, así que para lotes grandes
+repartimos el trabajo en procesos. El pool se crea una sola vez, se
+"calienta" (Django, template, fondo) y se reutiliza entre peticiones.
+"""
+import atexit
+import multiprocessing
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _inicializar_worker():
+    import django
+    django.setup()
+
+    # Dejamos listo en el worker lo que todas las constancias van a usar
+    from django.template.loader import get_template
+    from .imagenes import _imagen_a_base64
+    from .pdf import TEMPLATE_CONSTANCIA, _ruta_fondo
+    get_template(TEMPLATE_CONSTANCIA)
+    _imagen_a_base64(_ruta_fondo())
+
+
+def _listo(_):
+    return True
+
+
+def _renderizar_iter(constancias):
+    """
+    Un error en una constancia no tumba al resto: se reporta como texto en su
+    lugar y se continúa con las siguientes.
+    """
+    from .descargas import precargar_firmas
+    from .pdf import _generar_pdf_bytes
+    from .pdf_plantilla import generar_pdfs_lote
+
+    precargar_firmas(constancias)
+    pendientes = deque(constancias)
+    try:
+        for constancia, pdf_bytes in generar_pdfs_lote(constancias):
+            pendientes.popleft()
+            yield pdf_bytes, None if pdf_bytes else "xhtml2pdf no pudo generar el PDF"
+    except Exception:
+        # No se sabe qué constancia lo provocó: lo que falta se renderiza una por una
+        pass
+    for constancia in pendientes:
+        try:
+            pdf_bytes = _generar_pdf_bytes(constancia)
+        except Exception:
+            yield None, traceback.format_exc(limit=3)
+            continue
+        yield pdf_bytes, None if pdf_bytes else "xhtml2pdf no pudo generar el PDF"
+
+
+def _renderizar_bloque(constancias):
+    # Corre dentro del worker
+    return list(_renderizar_iter(constancias))
+
+
+def _num_procesos():
+    return getattr(settings, 'CONSTANCIAS_PROCESOS_PDF', 1)
+
+
+def _obtener_pool():
+    """
+    Regresa el pool compartido, o None si está deshabilitado o el entorno no
+    permite crear procesos (p. ej. algunas plataformas serverless).
+    """
+    global _pool
+    procesos = _num_procesos()
+    if procesos <= 1:
+        return None
+    with _pool_lock:
+        if _pool is None:
+            try:
+                # 'spawn' para no heredar conexiones abiertas a la base de datos
+                _pool = ProcessPoolExecutor(
+                    max_workers=procesos,
+                    mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_inicializar_worker,
+                )
+                # Arrancamos todos los workers de una vez
+                list(_pool.map(_listo, range(procesos)))
+            except (OSError, NotImplementedError, BrokenProcessPool):
+                _pool = None
+        return _pool
+
+
+def _descartar_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+atexit.register(_descartar_pool)
+
+
+def _precargar(constancia):
+    # Así el worker recibe los objetos relacionados y no consulta la base de datos
+    constancia.participante, constancia.curso
+    constancia.firma_gerente, constancia.firma_especialista
+    return constancia
+
+
+def generar_pdfs_paralelo(constancias):
+    """
+    Genera los PDFs de un lote repartiéndolos entre los workers.
+    Produce tuplas (constancia, pdf_bytes, error) en el mismo orden de la
+    selección; si una constancia falla, pdf_bytes es None y error trae el motivo.
+    """
+    constancias = [_precargar(c) for c in constancias]
+    procesos = _num_procesos()
+    pool = _obtener_pool() if len(constancias) > 1 else None
+
+    if pool is None:
+        for constancia, (pdf_bytes, error) in zip(constancias, _renderizar_iter(constancias)):
+            yield constancia, pdf_bytes, error
+        return
+
+    # Bloques contiguos para que cada worker aproveche la plantilla del lote
+    tamano = getattr(settings, 'CONSTANCIAS_PDF_POR_BLOQUE', 25)
+    tamano = max(1, min(tamano, -(-len(constancias) // procesos)))
+    bloques = deque(constancias[i:i + tamano] for i in range(0, len(constancias), tamano))
+
+    # Solo mantenemos unos cuantos bloques en vuelo para no acumular PDFs en memoria
+    en_vuelo = deque()
+    while bloques or en_vuelo:
+        while bloques and len(en_vuelo) < procesos * 2:
+            bloque = bloques.popleft()
+            try:
+                futuro = pool.submit(_renderizar_bloque, bloque)
+            except (BrokenProcessPool, RuntimeError):
+                # El pool ya no sirve: lo que falta se renderiza aquí mismo
+                futuro = None
+            en_vuelo.append((bloque, futuro))
+        bloque, futuro = en_vuelo.popleft()
+        if futuro is None:
+            resultados = _renderizar_bloque(bloque)
+        else:
+            try:
+                resultados = futuro.result()
+            except BrokenProcessPool:
+                # Un worker murió (p. ej. sin memoria); se recrea el pool en la siguiente llamada
+                _descartar_pool()
+                resultados = [(None, "El proceso de render terminó inesperadamente")] * len(bloque)
+            except Exception as e:
+                resultados = [(None, str(e))] * len(bloque)
+        for constancia, (pdf_bytes, error) in zip(bloque, resultados):
+            yield constancia, pdf_bytes, error
@@ -0,0 +1,31 @@
+# users/signals.py
+"""
+Receptores de señales de los modelos. Se conectan en `UsersConfig.ready`.
+
+Las altas y cambios en lote (bulk_create / bulk_update / update) no mandan
+señales; quien los hace llama a `invalidar_participantes` por su cuenta.
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .encuestas import curso_de_respuesta, descontar_respuesta
+from .models import Constancia, EncuestaRespuesta, Participante
+from .publico import invalidar_participantes
+from .tablero import invalidar_tablero
+
+
+@receiver([post_save, post_delete], sender=Constancia, dispatch_uid='constancia_invalida_buscador')
+def constancia_cambiada(sender, instance, **kwargs):
+    invalidar_participantes([instance.participante_id])
+    invalidar_tablero()
+
+
+@receiver([post_save, post_delete], sender=Participante, dispatch_uid='participante_invalida_buscador')
+def participante_cambiado(sender, instance, **kwargs):
+    invalidar_participantes([instance.pk])
+
+
+@receiver(pre_delete, sender=EncuestaRespuesta, dispatch_uid='encuesta_descuenta_resumen')
+def respuesta_borrada(sender, instance, **kwargs):
+    # pre_delete: al borrar en cascada la constancia todavía existe y se puede saber su curso
+    descontar_respuesta(instance, curso_de_respuesta(instance))
@@ -0,0 +1,76 @@
+# users/tablero.py
+"""
+Datos del dashboard: cuántas constancias (de cursos, no webinars) están por
+vencer o ya vencieron, y la página que se muestra de cada lista.
+
+Los conteos salen de una sola consulta agregada y se guardan en caché
+CONSTANCIAS_TABLERO_CACHE_SEGUNDOS; cualquier alta, baja o cambio de una
+constancia los descarta. Las listas se piden por página, con participante y
+curso en el mismo JOIN.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.paginator import Paginator
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Constancia
+
+# Días hacia adelante que se consideran "por vencer"
+DIAS_POR_VENCER = 30
+
+
+def _cache():
+    return caches[getattr(settings, 'CONSTANCIAS_CACHE_ALIAS', 'default')]
+
+
+def _clave(hoy):
+    # Con la fecha en la clave el resumen de ayer no sirve para hoy
+    return f'tablero:resumen:{hoy.isoformat()}'
+
+
+def _filtros(hoy):
+    return {
+        'por_vencer': Q(fecha_vencimiento__gte=hoy, fecha_vencimiento__lte=hoy + timedelta(days=DIAS_POR_VENCER)),
+        'vencidas': Q(fecha_vencimiento__lt=hoy),
+    }
+
+
+def resumen_vencimientos(hoy=None):
+    """{'por_vencer': n, 'vencidas': n}, con una consulta (o ninguna, si está en caché)."""
+    hoy = hoy or timezone.now().date()
+    cache = _cache()
+    resumen = cache.get(_clave(hoy))
+    if resumen is None:
+        resumen = Constancia.objects.filter(es_webinar=False).aggregate(
+            **{nombre: Count('pk', filter=filtro) for nombre, filtro in _filtros(hoy).items()}
+        )
+        cache.set(_clave(hoy), resumen, getattr(settings, 'CONSTANCIAS_TABLERO_CACHE_SEGUNDOS', 60))
+    return resumen
+
+
+def pagina_vencimientos(tipo, numero, total, hoy=None):
+    """
+    Página `numero` de la lista `tipo` ('por_vencer' o 'vencidas'). `total`
+    viene del resumen, así el paginador no vuelve a contar.
+    """
+    hoy = hoy or timezone.now().date()
+    orden = ('fecha_vencimiento', 'pk') if tipo == 'por_vencer' else ('-fecha_vencimiento', '-pk')
+    constancias = (
+        Constancia.objects
+        .filter(_filtros(hoy)[tipo], es_webinar=False)
+        .select_related('participante', 'curso')
+        .order_by(*orden)
+    )
+    paginator = Paginator(constancias, getattr(settings, 'CONSTANCIAS_TABLERO_POR_PAGINA', 10))
+    paginator.count = total
+    return paginator.get_page(numero)
+
+
+def invalidar_tablero():
+    """Descarta el resumen de hoy al confirmarse la transacción actual."""
+    clave = _clave(timezone.now().date())
+    transaction.on_commit(lambda: _cache().delete(clave))
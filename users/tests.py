@@ -1,3 +1,276 @@
-from django.test import TestCase
+import csv
+import datetime
+import io
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
 
-# Create your tests here.
+from django.core import mail
+from django.core.exceptions import ValidationError
+from django.core.mail.backends.locmem import EmailBackend
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from . import descargas
+from .correo import enviar_constancias_por_correo
+from .exportar import respuesta_exportacion
+from .forms import LoteConstanciaForm
+from .lotes import cargar_constancias
+from .publico import buscar_constancias, consulta_constancias
+from .trabajos import encolar
+from .models import Constancia, Curso, EnvioCorreo, Evaluador, Participante, Trabajo
+
+
+def crear_constancias(cantidad, curso_nombre='Curso de prueba'):
+    gerente = Evaluador.objects.create(username='gerente', es_gerente=True)
+    especialista = Evaluador.objects.create(username='especialista')
+    curso = Curso.objects.create(nombre=curso_nombre)
+    constancias = []
+    for i in range(cantidad):
+        participante = Participante.objects.create(nombre_completo=f'Participante {i}', email=f'p{i}@ejemplo.com')
+        constancias.append(Constancia.objects.create(
+            participante=participante, curso=curso,
+            fecha_inicio=datetime.date(2026, 1, 1), fecha_termino=datetime.date(2026, 1, 2),
+            duracion_en_horas=4, firma_gerente=gerente, firma_especialista=especialista,
+            codigo_verificacion=f'PRUEBA{i:04d}',
+        ))
+    return constancias
+
+
+class BackendContado(EmailBackend):
+    """Backend locmem que recuerda cuántas conexiones se crearon y cuál mandó cada mensaje."""
+    instancias = []
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        BackendContado.instancias.append(self)
+        self.enviados = 0
+
+    def send_messages(self, messages):
+        self.enviados += len(messages)
+        return super().send_messages(messages)
+
+
+def _pdfs_falsos(constancias):
+    # El render no es lo que se prueba aquí
+    for constancia in constancias:
+        yield constancia, b'%PDF-1.4 prueba', None
+
+
+@override_settings(EMAIL_BACKEND='users.tests.BackendContado', CONSTANCIAS_CORREOS_POR_SEGUNDO=0)
+@mock.patch('users.correo.generar_pdfs_paralelo', _pdfs_falsos)
+class EnvioMasivoTests(TestCase):
+
+    def setUp(self):
+        BackendContado.instancias = []
+        self.constancias, _ = cargar_constancias([c.pk for c in crear_constancias(5)])
+
+    def test_una_sola_conexion_para_todo_el_lote(self):
+        enviados, errores = enviar_constancias_por_correo(self.constancias, lote='lote-1')
+
+        self.assertEqual((enviados, errores), (5, []))
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertEqual(len(BackendContado.instancias), 1)
+        self.assertEqual(BackendContado.instancias[0].enviados, 5)
+
+    def test_lote_retomado_salta_los_ya_enviados_y_reintenta_los_fallidos(self):
+        enviada, fallida = self.constancias[:2]
+        EnvioCorreo.objects.create(lote='lote-2', constancia=enviada, email=enviada.participante.email,
+                                   estado=EnvioCorreo.ENVIADO, intentos=1)
+        EnvioCorreo.objects.create(lote='lote-2', constancia=fallida, email=fallida.participante.email,
+                                   estado=EnvioCorreo.FALLIDO, intentos=1, error='timeout')
+
+        avances = []
+        enviados, errores = enviar_constancias_por_correo(self.constancias, avances.append, lote='lote-2')
+
+        self.assertEqual((enviados, errores), (4, []))
+        destinatarios = [m.to[0] for m in mail.outbox]
+        self.assertNotIn(enviada.participante.email, destinatarios)
+        self.assertIn(fallida.participante.email, destinatarios)
+        self.assertEqual(avances[0], 1)
+        self.assertEqual(avances[-1], 5)
+
+        fallida_envio = EnvioCorreo.objects.get(lote='lote-2', constancia=fallida)
+        self.assertEqual((fallida_envio.estado, fallida_envio.intentos, fallida_envio.error), (EnvioCorreo.ENVIADO, 2, ''))
+        self.assertEqual(EnvioCorreo.objects.get(lote='lote-2', constancia=enviada).intentos, 1)
+        self.assertFalse(EnvioCorreo.objects.filter(lote='lote-2').exclude(estado=EnvioCorreo.ENVIADO).exists())
+
+
+class _ServidorFirmas(BaseHTTPRequestHandler):
+    """Cloudinary de mentiras: /lenta tarda, /inestable falla dos veces, /firma.png responde 304 con el ETag."""
+    peticiones = []
+    fallas_pendientes = 0
+
+    def do_GET(self):
+        _ServidorFirmas.peticiones.append((self.path, self.headers.get('If-None-Match')))
+        if self.path == '/lenta':
+            time.sleep(1)
+            self._responder(200, b'tarde')
+        elif self.path == '/inestable' and _ServidorFirmas.fallas_pendientes:
+            _ServidorFirmas.fallas_pendientes -= 1
+            self._responder(503, b'')
+        elif self.path == '/firma.png' and self.headers.get('If-None-Match') == '"v1"':
+            self._responder(304, b'')
+        else:
+            self._responder(200, b'imagen', {'ETag': '"v1"'})
+
+    def _responder(self, estado, cuerpo, encabezados=None):
+        self.send_response(estado)
+        for nombre, valor in (encabezados or {}).items():
+            self.send_header(nombre, valor)
+        self.send_header('Content-Length', str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+@override_settings(
+    CONSTANCIAS_HTTP_TIMEOUT_CONEXION=1, CONSTANCIAS_HTTP_TIMEOUT_LECTURA=0.2,
+    CONSTANCIAS_HTTP_REINTENTOS=2, CONSTANCIAS_HTTP_BACKOFF=0,
+)
+class DescargasTests(SimpleTestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.servidor = ThreadingHTTPServer(('127.0.0.1', 0), _ServidorFirmas)
+        cls.url = f'http://127.0.0.1:{cls.servidor.server_port}'
+        threading.Thread(target=cls.servidor.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.servidor.shutdown()
+        cls.servidor.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        # La sesión toma los timeouts y reintentos de settings al crearse
+        descargas._sesion = None
+        descargas.copias.limpiar()
+        _ServidorFirmas.peticiones = []
+        _ServidorFirmas.fallas_pendientes = 0
+
+    def test_timeout_de_lectura_no_cuelga_el_render(self):
+        inicio = time.monotonic()
+        self.assertIsNone(descargas.descargar(self.url + '/lenta'))
+        # 3 intentos de 0.2 s, no 3 de 1 s
+        self.assertLess(time.monotonic() - inicio, 1)
+
+    def test_reintenta_errores_temporales(self):
+        _ServidorFirmas.fallas_pendientes = 2
+        self.assertEqual(descargas.descargar(self.url + '/inestable'), b'imagen')
+        self.assertEqual(len(_ServidorFirmas.peticiones), 3)
+
+    def test_se_rinde_despues_de_los_reintentos(self):
+        _ServidorFirmas.fallas_pendientes = 5
+        self.assertIsNone(descargas.descargar(self.url + '/inestable'))
+        self.assertEqual(len(_ServidorFirmas.peticiones), 3)
+
+    def test_peticion_condicional_usa_la_copia_con_304(self):
+        self.assertEqual(descargas.descargar(self.url + '/firma.png'), b'imagen')
+        self.assertEqual(descargas.descargar(self.url + '/firma.png'), b'imagen')
+        self.assertEqual(_ServidorFirmas.peticiones, [('/firma.png', None), ('/firma.png', '"v1"')])
+
+
+class IndicesBuscadorTests(TestCase):
+
+    def test_el_buscador_usa_los_indices_de_email_y_emision(self):
+        crear_constancias(3)
+        if connection.vendor == 'postgresql':
+            # Con tablas tan chicas Postgres prefiere recorrerlas completas
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        plan = consulta_constancias('P1@Ejemplo.com').explain()
+
+        self.assertIn('participante_email_upper_idx', plan)
+        self.assertIn('constancia_part_emision_idx', plan)
+
+
+@override_settings(CONSTANCIAS_BUSCADOR_CACHE_SEGUNDOS=60)
+class CacheBuscadorTests(TestCase):
+
+    def test_cambio_en_cualquier_participante_del_correo_invalida_la_busqueda(self):
+        primera, segunda = crear_constancias(2)
+        # Mismo correo con otras mayúsculas: el buscador junta a los dos participantes
+        Participante.objects.filter(pk=segunda.participante_id).update(email='P0@EJEMPLO.COM')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(len(buscar_constancias('p0@ejemplo.com')), 2)
+
+        # El resultado viene por fecha de emisión descendente: `primera` no es la del primer participante
+        with self.captureOnCommitCallbacks(execute=True):
+            primera.participante.nombre_completo = 'Nombre corregido'
+            primera.participante.save()
+        Constancia.objects.filter(pk=primera.pk).delete()
+
+        self.assertEqual([c.pk for c in buscar_constancias('p0@ejemplo.com')], [segunda.pk])
+
+
+class FirmantesTests(TestCase):
+
+    def test_el_selector_y_el_formulario_aceptan_los_mismos_especialistas(self):
+        activo = Evaluador.objects.create(username='activo', first_name='Ana')
+        inactivo = Evaluador.objects.create(username='inactivo', first_name='Ana', is_active=False)
+        self.client.force_login(activo)
+
+        opciones = self.client.get(reverse('users:buscar_evaluadores_json'), {'q': 'Ana'}).json()['resultados']
+        self.assertEqual([o['id'] for o in opciones], [activo.pk])
+
+        campo = LoteConstanciaForm().fields['firma_especialista']
+        self.assertEqual(campo.clean(activo.pk), activo)
+        with self.assertRaises(ValidationError):
+            campo.clean(inactivo.pk)
+
+
+class TrabajosTests(TestCase):
+
+    def test_el_resultado_se_guarda_donde_indican_los_settings_actuales(self):
+        crear_constancias(2)
+        with tempfile.TemporaryDirectory() as carpeta, override_settings(
+            CONSTANCIAS_TRABAJOS_STORAGE=None, CONSTANCIAS_TRABAJOS_DIR=carpeta, CONSTANCIAS_TRABAJOS_SINCRONOS=True,
+        ):
+            trabajo = encolar(Trabajo.TIPO_EXPORTAR, {'tipo': 'constancias', 'parametros': {}})
+
+            self.assertEqual(trabajo.estado, Trabajo.COMPLETADO, trabajo.errores)
+            self.assertTrue(os.path.isfile(os.path.join(carpeta, trabajo.resultado.name)))
+
+
+class ExportacionTests(TestCase):
+
+    @override_settings(CONSTANCIAS_EXPORTAR_BLOQUE=2)
+    def test_csv_lee_por_bloques_de_llave_sin_perder_filas(self):
+        crear_constancias(5)
+        # Un bloque de 2 da 3 consultas (2 + 2 + 1): ninguna trae la tabla completa
+        with self.assertNumQueries(3):
+            contenido = b''.join(respuesta_exportacion('constancias', 'csv', {}).streaming_content)
+        filas = list(csv.reader(io.StringIO(contenido.decode('utf-8-sig'))))
+
+        self.assertEqual(filas[0][0], 'Código')
+        self.assertEqual([f[0] for f in filas[1:]], [f'PRUEBA{i:04d}' for i in range(5)])
+
+    def test_encuestas_y_leads_solo_para_el_staff(self):
+        usuario = Evaluador.objects.create(username='capturista')
+        self.client.force_login(usuario)
+        self.assertEqual(self.client.get(reverse('users:exportar', args=['leads', 'csv'])).status_code, 403)
+        self.assertEqual(self.client.get(reverse('users:exportar', args=['encuestas', 'xlsx'])).status_code, 403)
+        self.assertEqual(self.client.get(reverse('users:exportar', args=['constancias', 'csv'])).status_code, 200)
+
+        usuario.is_staff = True
+        usuario.save()
+        self.assertEqual(self.client.get(reverse('users:exportar', args=['leads', 'csv'])).status_code, 200)
+
+    @override_settings(CONSTANCIAS_EXPORTAR_XLSX_DIRECTO_MAX=2)
+    def test_excel_grande_se_encola(self):
+        crear_constancias(3)
+        self.client.force_login(Evaluador.objects.get(username='gerente'))
+        respuesta = self.client.get(reverse('users:exportar', args=['constancias', 'xlsx']), {'tipo': 'curso'})
+
+        trabajo = Trabajo.objects.get()
+        self.assertRedirects(respuesta, reverse('users:trabajo', args=[trabajo.pk]), fetch_redirect_response=False)
+        self.assertEqual((trabajo.tipo, trabajo.total), (Trabajo.TIPO_EXPORTAR, 3))
+        self.assertEqual(trabajo.parametros, {'tipo': 'constancias', 'parametros': {'tipo': 'curso', 'q': ''}})
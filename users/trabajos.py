@@ -0,0 +1,232 @@
+# users/trabajos.py
+"""
+Cola de trabajos en la base de datos (sin broker externo).
+
+Las vistas llaman a `encolar(...)` y regresan de inmediato; el comando
+`python manage.py run_workers` toma los trabajos pendientes con
+`select_for_update(skip_locked=True)` y los ejecuta. Funciona igual con
+SQLite que con Postgres.
+"""
+import tempfile
+import threading
+import time
+import traceback
+from contextlib import nullcontext
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .almacen_pdf import prerenderizar_constancias
+from .correo import enviar_constancias_por_correo
+from .exportar import archivo_xlsx, contar_filas, nombre_archivo
+from .importar import importar_participantes
+from .lotes import RELACIONES_CONSTANCIA, cargar_constancias
+from .metricas import medir_consulta, recolectar, registrar
+from .models import Constancia, ImportacionWebinar, Trabajo
+from .webinar import emitir_constancias_webinar, participantes_importacion
+from .zip_streaming import entradas_zip_constancias, zip_en_streaming
+
+_MANEJADORES = {}
+
+
+def manejador(tipo):
+    """Registra la función que ejecuta un tipo de trabajo."""
+    def registrar(funcion):
+        _MANEJADORES[tipo] = funcion
+        return funcion
+    return registrar
+
+
+def encolar(tipo, parametros, usuario=None, total=0):
+    trabajo = Trabajo.objects.create(
+        tipo=tipo,
+        parametros=parametros,
+        total=total,
+        creado_por=usuario if usuario and usuario.is_authenticated else None,
+    )
+    if getattr(settings, 'CONSTANCIAS_TRABAJOS_SINCRONOS', False):
+        trabajo.estado = Trabajo.EN_PROCESO
+        trabajo.fecha_inicio = trabajo.latido = timezone.now()
+        trabajo.worker = 'sincrono'
+        trabajo.save(update_fields=['estado', 'fecha_inicio', 'latido', 'worker'])
+        ejecutar(trabajo)
+    return trabajo
+
+
+def reclamar_siguiente(worker):
+    """
+    Toma el trabajo pendiente más antiguo. Regresa None si no hay ninguno.
+    """
+    # En SQLite no hay FOR UPDATE y abrir la transacción solo provoca bloqueos
+    # entre workers; ahí basta el UPDATE condicional de abajo.
+    bloqueo = transaction.atomic() if connection.features.has_select_for_update else nullcontext()
+    with bloqueo:
+        candidato = (
+            Trabajo.objects.select_for_update(skip_locked=True)
+            .filter(estado=Trabajo.PENDIENTE)
+            .order_by('fecha_creacion', 'pk')
+            .first()
+        )
+        if candidato is None:
+            return None
+        ahora = timezone.now()
+        # El UPDATE condicional garantiza que solo un worker se quede con el trabajo
+        tomado = Trabajo.objects.filter(pk=candidato.pk, estado=Trabajo.PENDIENTE).update(
+            estado=Trabajo.EN_PROCESO, worker=worker, fecha_inicio=ahora, latido=ahora
+        )
+    if not tomado:
+        return None
+    candidato.refresh_from_db()
+    return candidato
+
+
+def liberar_atascados():
+    """
+    Vuelve a encolar los trabajos cuyo worker dejó de dar señales (se cayó
+    o lo reiniciaron). Regresa cuántos se liberaron.
+    """
+    limite = timezone.now() - timedelta(seconds=settings.CONSTANCIAS_TRABAJOS_TIMEOUT)
+    return Trabajo.objects.filter(estado=Trabajo.EN_PROCESO, latido__lt=limite).update(
+        estado=Trabajo.PENDIENTE, worker='', progreso=0
+    )
+
+
+class _Latido(threading.Thread):
+    """Actualiza `latido` cada cierto tiempo mientras el trabajo corre."""
+
+    def __init__(self, trabajo_pk, intervalo=30):
+        super().__init__(daemon=True)
+        self.trabajo_pk = trabajo_pk
+        self.intervalo = intervalo
+        self.detener = threading.Event()
+
+    def run(self):
+        try:
+            while not self.detener.wait(self.intervalo):
+                try:
+                    Trabajo.objects.filter(pk=self.trabajo_pk).update(latido=timezone.now())
+                except Exception:
+                    # Un latido perdido no debe afectar al trabajo; se reintenta en el siguiente
+                    pass
+        finally:
+            connection.close()
+
+
+class _Progreso:
+    """Guarda el avance en la base de datos como máximo una vez por segundo."""
+
+    def __init__(self, trabajo):
+        self.trabajo = trabajo
+        self._ultimo = 0
+
+    def __call__(self, hechos):
+        self.trabajo.progreso = hechos
+        ahora = time.monotonic()
+        if ahora - self._ultimo >= 1 or hechos >= self.trabajo.total:
+            self._ultimo = ahora
+            Trabajo.objects.filter(pk=self.trabajo.pk).update(progreso=hechos, latido=timezone.now())
+
+
+def ejecutar(trabajo):
+    """Corre un trabajo ya reclamado y deja registrado el resultado."""
+    latido = _Latido(trabajo.pk)
+    latido.start()
+    inicio = time.perf_counter()
+    try:
+        with recolectar() as metricas, connection.execute_wrapper(medir_consulta):
+            mensaje, errores = _MANEJADORES[trabajo.tipo](trabajo, _Progreso(trabajo))
+        trabajo.estado = Trabajo.COMPLETADO
+        trabajo.mensaje = mensaje[:255]
+        trabajo.errores = "\n".join(errores)
+    except Exception:
+        trabajo.estado = Trabajo.FALLIDO
+        trabajo.mensaje = "El trabajo terminó con un error."
+        trabajo.errores = traceback.format_exc()
+    finally:
+        latido.detener.set()
+    trabajo.fecha_fin = timezone.now()
+    trabajo.save()
+    registrar('trabajo', {
+        'trabajo': trabajo.pk,
+        'tipo_trabajo': trabajo.tipo,
+        'estado': trabajo.estado,
+    }, metricas, (time.perf_counter() - inicio) * 1000)
+    return trabajo
+
+
+# --- MANEJADORES ---
+
+@manejador(Trabajo.TIPO_ZIP)
+def _generar_zip(trabajo, avanzar):
+    constancias, faltantes = cargar_constancias(trabajo.parametros['ids'])
+    trabajo.total = len(constancias)
+    trabajo.save(update_fields=['total'])
+
+    errores = [f"La constancia {pk} ya no existe." for pk in faltantes]
+    with tempfile.TemporaryFile() as archivo:
+        for datos in zip_en_streaming(entradas_zip_constancias(constancias, avanzar, errores)):
+            archivo.write(datos)
+        archivo.seek(0)
+        trabajo.resultado.save(f"constancias_{trabajo.pk}.zip", File(archivo), save=False)
+    generadas = len(constancias) - (len(errores) - len(faltantes))
+    return f"ZIP listo con {generadas} constancias.", errores
+
+
+@manejador(Trabajo.TIPO_CORREO)
+def _enviar_correos(trabajo, avanzar):
+    constancias, faltantes = cargar_constancias(trabajo.parametros['ids'])
+    trabajo.total = len([c for c in constancias if c.participante.email])
+    trabajo.save(update_fields=['total'])
+
+    enviados, errores = enviar_constancias_por_correo(constancias, avanzar, lote=f"trabajo-{trabajo.pk}")
+    errores = [f"La constancia {pk} ya no existe." for pk in faltantes] + errores
+    return f"Se enviaron {enviados} correos.", errores
+
+
+@manejador(Trabajo.TIPO_WEBINAR)
+def _emitir_webinar(trabajo, avanzar):
+    importacion = ImportacionWebinar.objects.filter(pk=trabajo.parametros['importacion']).first()
+    if importacion is None:
+        return "La importación ya no existe (expiró o ya se había emitido).", []
+    curso, creadas = emitir_constancias_webinar(importacion.evento(), participantes_importacion(importacion))
+    # Ya quedó todo en Participante/Constancia; la importación no se vuelve a usar
+    importacion.delete()
+    avanzar(creadas)
+
+    # Después de un webinar todos descargan a la vez: los PDFs quedan listos en el almacén
+    _, fallidas = prerenderizar_constancias(
+        Constancia.objects.filter(curso=curso).select_related(*RELACIONES_CONSTANCIA)
+    )
+    errores = [f"No se pudo pre-generar el PDF {c.codigo_verificacion}: {motivo}" for c, motivo in fallidas]
+    return f"Se generaron {creadas} constancias correctamente.", errores
+
+
+@manejador(Trabajo.TIPO_PARTICIPANTES)
+def _importar_participantes(trabajo, avanzar):
+    storage = Trabajo._meta.get_field('resultado').storage
+    ruta = trabajo.parametros['archivo']
+    if not storage.exists(ruta):
+        return "El archivo a importar ya no existe.", []
+
+    def al_leer(total):
+        trabajo.total = total
+        trabajo.save(update_fields=['total'])
+
+    with storage.open(ruta, 'rb') as archivo:
+        mensaje, errores = importar_participantes(archivo, trabajo.parametros['nombre'], avanzar, al_leer)
+    storage.delete(ruta)
+    return mensaje, errores
+
+
+@manejador(Trabajo.TIPO_EXPORTAR)
+def _exportar_xlsx(trabajo, avanzar):
+    tipo, parametros = trabajo.parametros['tipo'], trabajo.parametros['parametros']
+    trabajo.total = contar_filas(tipo, parametros)
+    trabajo.save(update_fields=['total'])
+
+    with archivo_xlsx(tipo, parametros, avanzar) as archivo:
+        trabajo.resultado.save(nombre_archivo(tipo, 'xlsx'), File(archivo), save=False)
+    return f"Excel listo con {trabajo.total} filas.", []
@@ -35,10 +35,14 @@ urlpatterns = [
     path('historial/borrar-seleccion/', views.borrar_constancias_view, name='borrar_constancias'),
 
     path('historial/descargar-seleccion/', views.descargar_constancias_zip_view, name='descargar_constancias_zip'),
+    path('historial/exportar/<str:tipo>.<str:formato>', views.exportar_view, name='exportar'),
 
     path('participante/<int:pk>/historial/', views.historial_participante_view, name='historial_participante'),
 
     path('participantes/', views.lista_participantes_view, name='lista_participantes'),
+    path('participantes/importar/', views.importar_participantes_view, name='importar_participantes'),
+    path('participantes/buscar/', views.buscar_participantes_json_view, name='buscar_participantes_json'),
+    path('evaluadores/buscar/', views.buscar_evaluadores_json_view, name='buscar_evaluadores_json'),
     
     path('participante/<int:pk>/editar/', views.editar_participante_view, name='editar_participante'),
 
@@ -51,6 +55,14 @@ urlpatterns = [
     path('descargar/', views.buscador_constancias_publico, name='buscador_publico'),
 
     path('descargar-pdf/<int:pk>/', views.descargar_pdf_publico, name='descargar_pdf_publico'),
+
+    path('trabajos/<int:pk>/', views.trabajo_view, name='trabajo'),
+    path('trabajos/<int:pk>/estado/', views.trabajo_estado_view, name='trabajo_estado'),
+    path('trabajos/<int:pk>/resultado/', views.trabajo_resultado_view, name='trabajo_resultado'),
+
+    path('rendimiento/lentas/', views.peticiones_lentas_view, name='peticiones_lentas'),
+    path('encuestas/resumen/', views.resumen_encuestas_view, name='resumen_encuestas'),
+    path('encuestas/resumen.json', views.resumen_encuestas_json_view, name='resumen_encuestas_json'),
     
 
 ]
@@ -1,44 +1,53 @@
+# users/views.py
+# Este módulo se importa en cada arranque en frío (Vercel): las librerías
+# pesadas (xhtml2pdf, openpyxl, PIL, requests) se cargan solo en los módulos
+# que las usan, nunca aquí arriba.
+
 import os
-import uuid
-import io
-import base64
-import mimetypes
-import zipfile
-import openpyxl
-import csv
-from io import BytesIO
-from xhtml2pdf import pisa
-from django.template.loader import get_template
-from django.contrib.staticfiles import finders
-from django.conf import settings
-import os
-from datetime import date, timedelta
+
 from django.conf import settings
-from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib import messages
 from django.contrib.auth import authenticate, login
+from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth.decorators import login_required
-from django.contrib import messages
-from django.template.loader import render_to_string
-from django.contrib.staticfiles import finders
-from django.http import HttpResponse
+from django.core.exceptions import PermissionDenied
+from django.core.paginator import Paginator
+from django.db import IntegrityError, transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.http import FileResponse, Http404, HttpResponse, JsonResponse
+from django.shortcuts import render, redirect, get_object_or_404
 from django.urls import reverse
 from django.utils import timezone
-from dateutil.relativedelta import relativedelta
-from django.core.mail import EmailMessage
-from django.core.paginator import Paginator
-import os
-from django.conf import settings
-from .models import Participante, Curso, Constancia
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, urlencode
+from django.views.decorators.cache import never_cache
 
 from .forms import (
     EvaluadorCreationForm, ProfilePhotoForm, SignatureForm, 
     CursoForm, ParticipanteForm, InstitucionForm, LoteConstanciaForm,
-    WebinarStep1Form, EncuestaForm
+    WebinarStep1Form, EncuestaForm, ImportarParticipantesForm, especialistas_firmantes, etiqueta_participante
 )
 from .models import (
     Constancia, Evaluador, Curso, Participante, Institucion,
-    EncuestaRespuesta, LeadVenta
+    EncuestaRespuesta, LeadVenta, Trabajo, ImportacionWebinar
+)
+from .imagenes import cache_imagenes
+from .trabajos import encolar
+from .zip_streaming import zip_constancias
+from .almacen_pdf import abrir_pdf_constancia, validadores_pdf
+from .hojas import leer_reporte_webinar
+from .metricas import peticiones_lentas
+from .emision import emitir_lote
+from .webinar import crear_importacion, limpiar_importaciones_expiradas
+from .publico import buscar_constancias, esperar_limite, fecha_corte
+from .tablero import pagina_vencimientos, resumen_vencimientos
+from .paginacion import pagina_keyset
+from .busqueda import buscar_participantes, filtrar_constancias, filtro_participantes
+from .exportar import (
+    EXPORTACIONES, FORMATOS, SOLO_STAFF, contar_filas, parametros_exportacion, respuesta_exportacion,
 )
+from .encuestas import distribucion_para_mostrar, registrar_respuesta, resumen_cursos
 
 # --- VISTAS DE AUTENTICACIÓN Y PERFIL ---
 
@@ -59,23 +68,14 @@ def login_view(request):
 @login_required
 def dashboard_view(request):
     hoy = timezone.now().date()
-    
-    constancias_vencidas = Constancia.objects.filter(
-        es_webinar=False,
-        fecha_vencimiento__lt=hoy
-    )
-    
-    limite_30_dias = hoy + timedelta(days=30)
-    constancias_por_vencer = Constancia.objects.filter(
-        es_webinar=False,
-        fecha_vencimiento__gte=hoy,
-        fecha_vencimiento__lte=limite_30_dias
-    )
+    resumen = resumen_vencimientos(hoy)
 
     context = {
         'user': request.user,
-        'constancias_vencidas': constancias_vencidas,
-        'constancias_por_vencer': constancias_por_vencer,
+        'total_vencidas': resumen['vencidas'],
+        'total_por_vencer': resumen['por_vencer'],
+        'constancias_vencidas': pagina_vencimientos('vencidas', request.GET.get('pagina_vencidas'), resumen['vencidas'], hoy),
+        'constancias_por_vencer': pagina_vencimientos('por_vencer', request.GET.get('pagina_por_vencer'), resumen['por_vencer'], hoy),
     }
     return render(request, 'users/dashboard.html', context)
 
@@ -93,9 +93,13 @@ def change_photo_view(request):
 @login_required
 def change_signature_view(request):
     if request.method == 'POST':
+        # Guardamos el nombre anterior antes de que el form modifique la instancia
+        firma_anterior = request.user.firma_digital.name
         form = SignatureForm(request.POST, request.FILES, instance=request.user)
         if form.is_valid():
             form.save()
+            cache_imagenes.invalidar(firma_anterior)
+            cache_imagenes.invalidar(request.user.firma_digital.name)
             return redirect('users:dashboard')
     else:
         form = SignatureForm(instance=request.user)
@@ -130,12 +134,69 @@ def crear_curso_view(request):
 
 @login_required
 def lista_participantes_view(request):
-    participantes = Participante.objects.all().order_by('nombre_completo')
+    busqueda = request.GET.get('q', '').strip()
+    # Institución en el mismo JOIN y constancias contadas con una subconsulta
+    # por renglón: solo se calcula para los de la página, no para toda la tabla
+    participantes = (
+        Participante.objects
+        .select_related('institucion')
+        .annotate(total_constancias=Coalesce(Subquery(
+            Constancia.objects.filter(participante=OuterRef('pk'))
+            .values('participante').annotate(total=Count('pk')).values('total')
+        ), 0))
+        .order_by('nombre_completo', 'pk')
+    )
+    if busqueda:
+        participantes = buscar_participantes(participantes, busqueda)
+
+    page_obj = Paginator(participantes, 50).get_page(request.GET.get('page'))
     context = {
-        'participantes': participantes
+        'page_obj': page_obj,
+        'busqueda': busqueda,
     }
     return render(request, 'users/lista_participantes.html', context)
 
+# Resultados por página de los selectores de búsqueda (vistas JSON)
+OPCIONES_POR_PAGINA = 20
+
+
+def _opciones_json(request, queryset, texto_de):
+    """
+    Página `pagina` de `queryset` en el formato de `SelectorRemoto`. Pide un
+    renglón de más para saber si hay otra página, sin contar el total.
+    """
+    try:
+        pagina = max(1, int(request.GET.get('pagina', 1)))
+    except ValueError:
+        pagina = 1
+    inicio = (pagina - 1) * OPCIONES_POR_PAGINA
+    objetos = list(queryset[inicio:inicio + OPCIONES_POR_PAGINA + 1])
+    return JsonResponse({
+        'resultados': [{'id': obj.pk, 'texto': texto_de(obj)} for obj in objetos[:OPCIONES_POR_PAGINA]],
+        'mas': len(objetos) > OPCIONES_POR_PAGINA,
+    })
+
+
+@login_required
+def buscar_participantes_json_view(request):
+    participantes = Participante.objects.only('pk', 'nombre_completo', 'email').order_by('nombre_completo', 'pk')
+    busqueda = request.GET.get('q', '').strip()
+    if busqueda:
+        participantes = participantes.filter(filtro_participantes(busqueda))
+    return _opciones_json(request, participantes, etiqueta_participante)
+
+
+@login_required
+def buscar_evaluadores_json_view(request):
+    evaluadores = especialistas_firmantes().order_by('first_name', 'last_name', 'pk')
+    busqueda = request.GET.get('q', '').strip()
+    if busqueda:
+        evaluadores = evaluadores.filter(
+            Q(first_name__icontains=busqueda) | Q(last_name__icontains=busqueda) | Q(username__icontains=busqueda)
+        )
+    return _opciones_json(request, evaluadores, str)
+
+
 @login_required
 def crear_participante_view(request):
     if request.method == 'POST':
@@ -176,6 +237,20 @@ def crear_institucion_view(request):
     context = {'form': form}
     return render(request, 'users/crear_institucion.html', context)
 
+@staff_member_required
+def importar_participantes_view(request):
+    if request.method == 'POST':
+        form = ImportarParticipantesForm(request.POST, request.FILES)
+        if form.is_valid():
+            archivo = form.cleaned_data['archivo']
+            # El worker lo lee del mismo almacenamiento que los resultados de los trabajos
+            ruta = Trabajo._meta.get_field('resultado').storage.save(f"importaciones/{archivo.name}", archivo)
+            trabajo = encolar(Trabajo.TIPO_PARTICIPANTES, {'archivo': ruta, 'nombre': archivo.name}, request.user)
+            return redirect('users:trabajo', pk=trabajo.pk)
+    else:
+        form = ImportarParticipantesForm()
+    return render(request, 'users/importar_participantes.html', {'form': form})
+
 # --- VISTAS DE CONSTANCIAS ---
 
 @login_required
@@ -183,37 +258,21 @@ def crear_lote_constancias_view(request):
     if request.method == 'POST':
         form = LoteConstanciaForm(request.POST)
         if form.is_valid():
-            curso = form.cleaned_data['curso']
-            participantes_seleccionados = form.cleaned_data['participantes']
-            fecha_inicio = form.cleaned_data['fecha_inicio']
-            fecha_termino = form.cleaned_data['fecha_termino']
-            duracion = form.cleaned_data['duracion_en_horas']
-            especialista = form.cleaned_data['firma_especialista']
             try:
-                gerente = Evaluador.objects.get(es_gerente=True)
+                creadas, omitidas = emitir_lote(
+                    form.cleaned_data['curso'],
+                    form.cleaned_data['participantes'],
+                    form.cleaned_data['fecha_inicio'],
+                    form.cleaned_data['fecha_termino'],
+                    form.cleaned_data['duracion_en_horas'],
+                    form.cleaned_data['firma_especialista'],
+                )
             except Evaluador.DoesNotExist:
                 messages.error(request, 'Error: No se ha designado un gerente en el sistema.')
                 return redirect('users:dashboard')
-            constancias_creadas = 0
-            for participante in participantes_seleccionados:
-                constancia, created = Constancia.objects.get_or_create(
-                    participante=participante,
-                    curso=curso,
-                    fecha_inicio=fecha_inicio,
-                    defaults={
-                        'fecha_termino': fecha_termino,
-                        'duracion_en_horas': duracion,
-                        'firma_gerente': gerente,
-                        'firma_especialista': especialista,
-                        'codigo_verificacion': str(uuid.uuid4()).split('-')[0].upper(),
-                        'es_webinar': False
-                    }
-                )
-                if created:
-                    constancia.fecha_vencimiento = constancia.fecha_emision + relativedelta(years=1)
-                    constancia.save()
-                    constancias_creadas += 1
-            messages.success(request, f'¡Se crearon {constancias_creadas} constancias de curso exitosamente!')
+            messages.success(request, f'¡Se crearon {creadas} constancias de curso exitosamente!')
+            if omitidas:
+                messages.info(request, f'{omitidas} participantes ya tenían constancia de este curso y se omitieron.')
             return redirect('users:historial_constancias')
     else:
         form = LoteConstanciaForm()
@@ -224,25 +283,31 @@ def crear_lote_constancias_view(request):
 def historial_constancias_view(request):
     # Obtenemos el parámetro 'tipo' de la URL. Si no existe, es None.
     filtro_tipo = request.GET.get('tipo', None)
+    busqueda = request.GET.get('q', '').strip()
     
-    # Empezamos con todas las constancias
-    lista_constancias = Constancia.objects.all()
-    
-    # Aplicamos el filtro solo si se especifica uno
-    if filtro_tipo == 'webinar':
-        lista_constancias = lista_constancias.filter(es_webinar=True)
-    elif filtro_tipo == 'curso':
-        lista_constancias = lista_constancias.filter(es_webinar=False)
-    
-    # Ordenamos y paginamos el resultado
-    constancias_ordenadas = lista_constancias.order_by('-fecha_emision')
-    paginator = Paginator(constancias_ordenadas, 20)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Todas las constancias, con participante y curso en el mismo JOIN, y los
+    # filtros de tipo y búsqueda (los mismos que usan las exportaciones)
+    lista_constancias = filtrar_constancias(request.GET, Constancia.objects.select_related('participante', 'curso'))
     
+    # Paginación por llave (fecha_emision, id): sin COUNT(*) ni OFFSET
+    pagina = pagina_keyset(
+        lista_constancias, 20,
+        despues=request.GET.get('despues'), antes=request.GET.get('antes'),
+    )
+
+    filtros = {k: v for k, v in (('tipo', filtro_tipo), ('q', busqueda)) if v}
     context = {
-        'page_obj': page_obj,
-        'filtro_activo': filtro_tipo
+        'pagina': pagina,
+        'filtro_activo': filtro_tipo,
+        'busqueda': busqueda,
+        'filtros_url': urlencode(filtros),
+        'exportaciones': [
+            (tipo, nombre)
+            for tipo, nombre in (('constancias', 'Constancias'), ('encuestas', 'Encuestas'), ('leads', 'Leads'))
+            if request.user.is_staff or tipo not in SOLO_STAFF
+        ],
+        'url_siguiente': pagina.siguiente and '?' + urlencode({**filtros, 'despues': pagina.siguiente}),
+        'url_anterior': pagina.anterior and '?' + urlencode({**filtros, 'antes': pagina.anterior}),
     }
     return render(request, 'users/historial_constancias.html', context)
 
@@ -265,18 +330,28 @@ def descargar_constancias_zip_view(request):
         if not ids_a_descargar:
             messages.warning(request, "No se seleccionó ninguna constancia para descargar.")
             return redirect('users:historial_constancias')
-        zip_buffer = io.BytesIO()
-        with zipfile.ZipFile(zip_buffer, 'w', zipfile.ZIP_DEFLATED) as zip_file:
-            for constancia_id in ids_a_descargar:
-                constancia = get_object_or_404(Constancia, pk=constancia_id)
-                pdf_bytes = _generar_pdf_bytes(constancia)
-                filename = f"constancia_{constancia.participante.nombre_completo}_{constancia.pk}.pdf"
-                zip_file.writestr(filename, pdf_bytes)
-        response = HttpResponse(zip_buffer.getvalue(), content_type='application/zip')
-        response['Content-Disposition'] = 'attachment; filename="constancias.zip"'
-        return response
+        return zip_constancias(request, ids_a_descargar, reverse('users:historial_constancias'))
     return redirect('users:historial_constancias')
 
+
+@login_required
+def exportar_view(request, tipo, formato):
+    """Constancias, respuestas de encuesta o leads en CSV / Excel, con los filtros del historial."""
+    if tipo not in EXPORTACIONES or formato not in FORMATOS:
+        raise Http404
+    if tipo in SOLO_STAFF and not request.user.is_staff:
+        raise PermissionDenied
+
+    # El Excel se arma completo antes de enviarse: los grandes van en segundo plano
+    if formato == 'xlsx':
+        total = contar_filas(tipo, request.GET)
+        if total > settings.CONSTANCIAS_EXPORTAR_XLSX_DIRECTO_MAX:
+            parametros = {'tipo': tipo, 'parametros': parametros_exportacion(request.GET)}
+            trabajo = encolar(Trabajo.TIPO_EXPORTAR, parametros, request.user, total=total)
+            return redirect('users:trabajo', pk=trabajo.pk)
+    return respuesta_exportacion(tipo, formato, request.GET)
+
+
 @login_required
 def historial_participante_view(request, pk):
     participante = get_object_or_404(Participante, pk=pk)
@@ -288,166 +363,61 @@ def historial_participante_view(request, pk):
     return render(request, 'users/historial_participante.html', context)
 
 # --- VISTAS DEL ASISTENTE DE WEBINAR ---
-import csv
-from django.shortcuts import render, redirect
-from django.contrib import messages
-from django.contrib.auth.decorators import login_required
 
 @login_required
 def webinar_paso1_subir_view(request):
     if request.method == 'POST':
         form = WebinarStep1Form(request.POST, request.FILES)
         if form.is_valid():
-            # Guardamos datos del curso
-            request.session['webinar_event_data'] = {
-                'curso_nombre': form.cleaned_data['curso_nombre'],
-                'fecha_inicio': form.cleaned_data['fecha_inicio'].isoformat(),
-                'fecha_termino': form.cleaned_data['fecha_termino'].isoformat(),
-                'duracion_en_horas': float(form.cleaned_data['duracion_en_horas']),
-                'firma_especialista_id': form.cleaned_data['firma_especialista'].id,
-            }
-
             archivo_csv = form.cleaned_data['archivo_csv']
-            raw_data = archivo_csv.read()
-            decoded_file = None
-            
-            # Intentar decodificar (GoToWebinar suele usar UTF-16 o UTF-8 con BOM)
-            for encoding in ['utf-8-sig', 'utf-16']:
-                try:
-                    decoded_file = raw_data.decode(encoding).splitlines()
-                    break
-                except UnicodeDecodeError:
-                    continue
-
-            if decoded_file is None:
+            participantes_raw = leer_reporte_webinar(archivo_csv)
+            if participantes_raw is None:
                 messages.error(request, "Error de codificación. Prueba guardar el Excel como 'CSV UTF-8'.")
                 return redirect('users:webinar_paso1')
-            
-            reader = csv.reader(decoded_file, delimiter='\t')
-            next(reader, None) # Saltar encabezado
-            next(reader, None)  # Saltar fila 2 (nombres de columnas: "Attendee", "Duration"...)
-            participantes_raw = {}
-            for row in reader:
-                try:
-                    # Basado en tu archivo: 8:Nombre, 9:Apellido, 10:Institución, 11:Email, 14:Duración
-                    nombre_completo = f"{row[8]} {row[9]}".strip()
-                    institucion = row[10].strip() if row[10] else "N/A"
-                    email = row[11].strip().lower()
-                    minutos = int(row[14].split()[0])
-                    
-                    if not email: continue
-
-                    if email not in participantes_raw:
-                        participantes_raw[email] = {
-                            'nombre_completo': nombre_completo,
-                            'institucion': institucion,
-                            'duracion_total': 0
-                        }
-                    participantes_raw[email]['duracion_total'] += minutos
-                except (IndexError, ValueError):
-                    continue
-
-            # Clasificación
-            calificados = []
-            no_calificados = []
-            for email, data in participantes_raw.items():
-                info = {
-                    'nombre_completo': data['nombre_completo'],
-                    'email': email,
-                    'institucion': data['institucion'],
-                    'duracion_total': data['duracion_total']
-                }
-                if data['duracion_total'] >= 30:
-                    calificados.append(info)
-                else:
-                    no_calificados.append(info)
-
-            request.session['webinar_participantes_calificados'] = calificados
-            request.session['webinar_participantes_no_calificados'] = no_calificados
+
+            # Las importaciones que nadie confirmó ya no sirven
+            limpiar_importaciones_expiradas()
+
+            # Guardamos el reporte en la base de datos; en la sesión solo queda su ID
+            importacion = crear_importacion(request.user, form.cleaned_data, participantes_raw)
+            request.session['webinar_importacion_id'] = importacion.pk
             return redirect('users:webinar_paso2')
             
     return render(request, 'users/webinar_paso1_subir.html', {'form': WebinarStep1Form()})
 
-from django.db import transaction
-from .models import Participante, Curso, Constancia
-from .models import Participante, Curso, Constancia, Evaluador
 @login_required
 def webinar_paso2_previsualizar_view(request):
-    event_data = request.session.get('webinar_event_data')
-    participantes = request.session.get('webinar_participantes_calificados')
-    no_calificados = request.session.get('webinar_participantes_no_calificados')
+    importacion = ImportacionWebinar.objects.filter(
+        pk=request.session.get('webinar_importacion_id'),
+        creado_por=request.user,
+        expira__gte=timezone.now(),
+    ).first()
 
-    if not event_data or participantes is None:
+    if importacion is None:
         messages.error(request, "No hay datos para procesar.")
         return redirect('users:webinar_paso1')
 
     # --- INICIO DE LA LÓGICA POST ---
     if request.method == 'POST':
-        try:
-            with transaction.atomic():
-                
-                # 1. Crear el Curso en la Base de Datos
-                curso = Curso.objects.create(
-                    nombre=event_data['curso_nombre'],
-                )
-
-                # 2. Obtener los Firmantes (Evaluador)
-                # Especialista: Usamos el ID que guardaste en el paso 1
-                firma_e_id = event_data.get('firma_especialista_id')
-                firma_especialista = Evaluador.objects.filter(id=firma_e_id).first() if firma_e_id else None
-
-                # Gerente: Buscamos al Evaluador que tenga es_gerente=True (según tu models.py)
-                firma_gerente = Evaluador.objects.filter(es_gerente=True).first()
-
-                # 3. Crear Participantes y sus Constancias
-                for p_data in participantes:
-                    participante, created = Participante.objects.get_or_create(
-                        email=p_data['email'],
-                        defaults={
-                            'nombre_completo': p_data['nombre_completo'],
-                            'institucion_id': None  # Asumimos None si es texto libre, ajusta si vinculas al modelo Institucion
-                        }
-                    )
-
-                    if not created:
-                        participante.nombre_completo = p_data['nombre_completo']
-                        participante.save()
-
-                    import uuid # Asegúrate de que import uuid esté arriba en el archivo
-                    nuevo_codigo = str(uuid.uuid4()).split('-')[0].upper()
-
-                    # Finalmente, creamos la constancia con los datos exactos que pide tu modelo
-                    Constancia.objects.create(
-                        participante=participante,
-                        curso=curso,
-                        fecha_inicio=event_data['fecha_inicio'],
-                        fecha_termino=event_data['fecha_termino'],
-                        duracion_en_horas=event_data['duracion_en_horas'],
-                        firma_gerente=firma_gerente,
-                        firma_especialista=firma_especialista,
-                        codigo_verificacion=nuevo_codigo,
-                        es_webinar=True # Marcamos que viene del flujo de Webinar
-                    )
-
-            # 4. Limpiar la sesión 
-            del request.session['webinar_event_data']
-            del request.session['webinar_participantes_calificados']
-            del request.session['webinar_participantes_no_calificados']
-
-            # 5. Mensaje de éxito y redirección
-            messages.success(request, f"¡Éxito! Se generaron {len(participantes)} constancias correctamente.")
-            return redirect('users:historial_constancias')
+        trabajo = encolar(
+            Trabajo.TIPO_WEBINAR,
+            {'importacion': importacion.pk},
+            request.user,
+            total=importacion.calificados,
+        )
 
-        except Exception as e:
-            messages.error(request, f"Hubo un error al generar las constancias: {str(e)}")
-            return redirect('users:webinar_paso2')
+        # Limpiar la sesión; la importación se borra cuando el trabajo termina
+        del request.session['webinar_importacion_id']
 
+        return redirect('users:trabajo', pk=trabajo.pk)
 
-    # Si es GET (solo cargar la página), muestra el HTML
+    # Si es GET (solo cargar la página), muestra el HTML por páginas
+    asistentes = importacion.asistentes.order_by('pk')
     context = {
-        'participantes': participantes,
-        'no_calificados': no_calificados,
-        'evento': event_data,
+        'importacion': importacion,
+        'participantes': Paginator(asistentes.filter(califica=True), 50).get_page(request.GET.get('page')),
+        'no_calificados': Paginator(asistentes.filter(califica=False), 50).get_page(request.GET.get('page_nc')),
+        'evento': importacion,
     }
     return render(request, 'users/webinar_paso2_previsualizar.html', context)
 
@@ -464,12 +434,19 @@ def encuesta_view(request, token):
             respuesta.constancia = constancia
             respuesta.nombre_completo = constancia.participante.nombre_completo
             respuesta.email = constancia.participante.email
-            respuesta.save()
-            if form.cleaned_data.get('interes_productos'):
-                LeadVenta.objects.get_or_create(
-                    participante=constancia.participante,
-                    curso=constancia.curso
-                )
+            # Respuesta, lead y resumen del curso entran juntos o no entra nada
+            try:
+                with transaction.atomic():
+                    respuesta.save(force_insert=True)
+                    if form.cleaned_data.get('interes_productos'):
+                        LeadVenta.objects.get_or_create(
+                            participante=constancia.participante,
+                            curso=constancia.curso
+                        )
+                    registrar_respuesta(respuesta, constancia.curso_id)
+            except IntegrityError:
+                # Dos envíos simultáneos del mismo formulario: el otro ya la guardó
+                return render(request, 'users/encuesta_gracias.html', {'mensaje': 'Ya has completado esta encuesta anteriormente. ¡Gracias!'})
             return render(request, 'users/encuesta_gracias.html', {'mensaje': '¡Gracias por tus respuestas! Tu constancia está siendo procesada.'})
     else:
         form = EncuestaForm()
@@ -477,166 +454,16 @@ def encuesta_view(request, token):
     return render(request, 'users/encuesta.html', context)
 
 # --- LÓGICA DE GENERACIÓN DE PDF ---
-import os
-import tempfile
-import requests
-from django.conf import settings
-from PIL import Image  # <--- NUEVO IMPORT
-import io
-import requests
-import base64
-import os
-
-def _imagen_a_base64(imagen_source):
-    """
-    Descarga/Lee imagen, elimina transparencia (para evitar cuadros negros)
-    y retorna Base64.
-    """
-    if not imagen_source:
-        return ""
-
-    try:
-        image_data = None
-        
-        # 1. OBTENER LOS DATOS DE LA IMAGEN (Sea URL o Archivo Local)
-        ruta_o_url = str(imagen_source)
-        if hasattr(imagen_source, 'url'):
-            ruta_o_url = imagen_source.url
-
-        if ruta_o_url.startswith('http'):
-            response = requests.get(ruta_o_url)
-            if response.status_code == 200:
-                image_data = response.content
-        else:
-            # Lógica para archivo local
-            path_local = ""
-            if hasattr(imagen_source, 'path'):
-                try: path_local = imagen_source.path
-                except: pass
-            if not path_local: path_local = ruta_o_url
-            
-            if os.path.exists(path_local):
-                with open(path_local, "rb") as f:
-                    image_data = f.read()
-
-        if not image_data:
-            return ""
-
-        # 2. PROCESAMIENTO CON PILLOW (El secreto anti-cuadros negros)
-        img = Image.open(io.BytesIO(image_data))
-        
-        # Si tiene transparencia (RGBA), la convertimos a fondo blanco
-        if img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info):
-            # Crear lienzo blanco del mismo tamaño
-            background = Image.new("RGB", img.size, (255, 255, 255))
-            # Convertir a RGBA para asegurar compatibilidad de pegado
-            img = img.convert("RGBA")
-            # Pegar la imagen original usando su canal alfa como máscara
-            background.paste(img, mask=img.split()[3]) # 3 es el canal Alpha
-            img = background
-        else:
-            img = img.convert("RGB")
-
-        # 3. GUARDAR EN BUFFER COMO JPEG (Más ligero y sin transparencia)
-        buffered = io.BytesIO()
-        img.save(buffered, format="JPEG", quality=95)
-        encoded = base64.b64encode(buffered.getvalue()).decode('utf-8')
-        
-        return f"data:image/jpeg;base64,{encoded}"
-
-    except Exception as e:
-        print(f"Error procesando imagen {imagen_source}: {e}")
-        return ""
 
-    
-
-def link_callback(uri, rel):
-    if uri.startswith('data:'):
-        return uri
-    if uri.startswith('http://') or uri.startswith('https://'):
-        return uri
-    # Para cualquier archivo local
-    path = uri.lstrip('/').lstrip('\\')
-    full_path = os.path.join(settings.BASE_DIR, 'static', path)
-    if os.path.exists(full_path):
-        return full_path
-    return uri
-
-def _generar_pdf_bytes(constancia):
-    
-    # 1. Procesar FONDO (Archivo Estático Local)
-    # Construimos la ruta absoluta usando BASE_DIR para que funcione en Windows/Linux
-    bg_path = os.path.join(settings.BASE_DIR, 'static', 'images', 'fondo_constancia.png')
-
-    if not os.path.exists(bg_path):
-        bg_path = os.path.join(settings.BASE_DIR, 'staticfiles', 'images', 'fondo_constancia.png')
-    
-    bg_url = _imagen_a_base64(bg_path)
-
-    # 2. Procesar FIRMAS (Pueden estar en Local o en Cloudinary)
-    firma_g_url = ""
-    if constancia.firma_gerente and constancia.firma_gerente.firma_digital:
-        firma_g_url = _imagen_a_base64(constancia.firma_gerente.firma_digital)
-
-    firma_e_url = ""
-    if constancia.firma_especialista and constancia.firma_especialista.firma_digital:
-        firma_e_url = _imagen_a_base64(constancia.firma_especialista.firma_digital)
-
-    # 3. Formateo de Fechas
-    meses = {
-        1: "enero", 2: "febrero", 3: "marzo", 4: "abril",
-        5: "mayo", 6: "junio", 7: "julio", 8: "agosto",
-        9: "septiembre", 10: "octubre", 11: "noviembre", 12: "diciembre"
-    }
-    f = constancia.fecha_termino
-    fecha_texto = f"{f.day} de {meses[f.month]} de {f.year}" if f else ""
-    duracion_formateada = f"{int(constancia.duracion_en_horas):02d}" if constancia.duracion_en_horas else "00"
-
-    # 4. Preparar Contexto para el HTML
-    context = {
-        'constancia': constancia,
-        'bg_url': bg_url,         # <--- Base64 del fondo
-        'firma_g_url': firma_g_url, # <--- Base64 de firma gerente
-        'firma_e_url': firma_e_url, # <--- Base64 de firma especialista
-        'fecha_texto': fecha_texto,
-        'duracion_formateada': duracion_formateada,
-    }
-    
-    print(f"DEBUG especialista: {constancia.firma_especialista}")
-    print(f"DEBUG especialista full_name: {constancia.firma_especialista.get_full_name()}")
-    print(f"DEBUG especialista first_name: {constancia.firma_especialista.first_name}")
-    print(f"DEBUG especialista last_name: {constancia.firma_especialista.last_name}")
-    # 5. Renderizar el HTML con los datos
-    # Asegúrate de que tu template HTML use: <img src="{{ bg_url }}">
-    html_string = render_to_string('pdf/constancia_template.html', context)
-
-    # 6. Generar el PDF en Memoria
-    buffer = io.BytesIO()
-    pisa_status = pisa.CreatePDF(
-        html_string, 
-        dest=buffer, 
-        link_callback=link_callback,
-        encoding='UTF-8'
-    )
-    
-    # DEBUG LOGS (Verás esto en la terminal si algo falla)
-    print(f"DEBUG: PDF Generado. Errores: {pisa_status.err}")
-    if not bg_url: print("ALERTA: No se pudo cargar el fondo en Base64")
-
-    if pisa_status.err:
-        return None
-        
-    return buffer.getvalue()
-
-   
 @login_required
 def generar_pdf_constancia_view(request, pk):
     constancia = get_object_or_404(Constancia, pk=pk)
-    pdf_file = _generar_pdf_bytes(constancia)
-    response = HttpResponse(pdf_file, content_type='application/pdf')
+    pdf_file = abrir_pdf_constancia(constancia)
+    if pdf_file is None:
+        messages.error(request, "Error al generar el archivo PDF.")
+        return redirect('users:historial_constancias')
     filename = f"constancia_{constancia.participante.nombre_completo}.pdf"
-    response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    return response
+    return FileResponse(pdf_file, as_attachment=True, filename=filename, content_type='application/pdf')
 
 
 
@@ -651,52 +478,78 @@ def enviar_constancias_masivo_view(request):
             messages.warning(request, "Por favor, selecciona al menos una constancia.")
             return redirect('users:historial_constancias')
 
-        enviados = 0
-        for c_id in constancias_ids:
-            constancia = get_object_or_404(Constancia, pk=c_id)
-            email_destino = constancia.participante.email
-
-            if email_destino:
-                # Generar el PDF en memoria
-                context = {'constancia': constancia}
-                html_string = render_to_string('pdf/constancia_template.html', context)
-                result = io.BytesIO()
-                
-                # Aquí usamos pisa y link_callback sin errores
-                pisa_status = pisa.pisaDocument(
-                    io.BytesIO(html_string.encode("UTF-8")), 
-                    result, 
-                    link_callback=link_callback
-                )
-                
-                pdf_content = result.getvalue()
-
-                # Configurar el correo
-                subject = f"Constancia: {constancia.curso.nombre}"
-                body = f"Hola {constancia.participante.nombre_completo},\n\nAdjuntamos tu constancia de participación.\n\nSaludos."
-                
-                email = EmailMessage(
-                    subject, 
-                    body, 
-                    settings.DEFAULT_FROM_EMAIL, 
-                    [email_destino]
-                )
-                
-                filename = f"Constancia_{constancia.participante.nombre_completo}.pdf"
-                email.attach(filename, pdf_content, 'application/pdf')
-                
-                try:
-                    email.send()
-                    enviados += 1
-                except Exception as e:
-                    print(f"Error enviando a {email_destino}: {e}")
-
-        messages.success(request, f"¡Éxito! Se enviaron {enviados} correos automáticamente.")
-        return redirect('users:historial_constancias')
+        trabajo = encolar(Trabajo.TIPO_CORREO, {'ids': constancias_ids}, request.user, total=len(constancias_ids))
+        return redirect('users:trabajo', pk=trabajo.pk)
     
     return redirect('users:historial_constancias')
 
 
+# --- VISTAS DE TRABAJOS EN SEGUNDO PLANO ---
+
+def _trabajo_del_usuario(request, pk, **filtros):
+    """El trabajo, si lo creó el usuario; el staff puede ver los de todos."""
+    trabajos = Trabajo.objects.all() if request.user.is_staff else Trabajo.objects.filter(creado_por=request.user)
+    return get_object_or_404(trabajos, pk=pk, **filtros)
+
+@login_required
+def trabajo_view(request, pk):
+    trabajo = _trabajo_del_usuario(request, pk)
+    return render(request, 'users/trabajo.html', {'trabajo': trabajo})
+
+@login_required
+def trabajo_estado_view(request, pk):
+    trabajo = _trabajo_del_usuario(request, pk)
+    return JsonResponse({
+        'estado': trabajo.estado,
+        'estado_display': trabajo.get_estado_display(),
+        'terminado': trabajo.terminado,
+        'progreso': trabajo.progreso,
+        'total': trabajo.total,
+        'mensaje': trabajo.mensaje,
+        'errores': trabajo.errores,
+        'url_resultado': reverse('users:trabajo_resultado', args=[trabajo.pk]) if trabajo.resultado else None,
+    })
+
+@login_required
+def trabajo_resultado_view(request, pk):
+    trabajo = _trabajo_del_usuario(request, pk, estado=Trabajo.COMPLETADO)
+    if not trabajo.resultado:
+        raise Http404("Este trabajo no generó ningún archivo.")
+    return FileResponse(
+        trabajo.resultado.open('rb'), as_attachment=True, filename=os.path.basename(trabajo.resultado.name)
+    )
+
+
+# --- RENDIMIENTO ---
+
+@staff_member_required
+def peticiones_lentas_view(request):
+    if request.method == 'POST':
+        peticiones_lentas.limpiar()
+        messages.success(request, "Se vació el registro de peticiones lentas.")
+        return redirect('users:peticiones_lentas')
+    context = {
+        'entradas': peticiones_lentas.listar(),
+        'umbral_ms': settings.CONSTANCIAS_UMBRAL_LENTO_MS,
+    }
+    return render(request, 'users/peticiones_lentas.html', context)
+
+
+@staff_member_required
+def resumen_encuestas_view(request):
+    cursos = resumen_cursos()
+    for curso in cursos:
+        curso['preguntas'] = distribucion_para_mostrar(curso)
+    return render(request, 'users/resumen_encuestas.html', {'cursos': cursos})
+
+
+@staff_member_required
+def resumen_encuestas_json_view(request):
+    """Lo mismo que el reporte, en JSON. ?curso=<id> (se puede repetir) limita a esos cursos."""
+    curso_ids = [int(pk) for pk in request.GET.getlist('curso') if pk.isdigit()] or None
+    return JsonResponse({'cursos': resumen_cursos(curso_ids)})
+
+
 def enviar_constancia_view(request, pk):
     """
     Esta es la función que Django no encontraba.
@@ -709,10 +562,6 @@ def enviar_constancia_view(request, pk):
     return redirect('users:login')
 
 
-from django.utils import timezone
-from datetime import timedelta
-
-from django.views.decorators.cache import never_cache # <--- Importar esto
 @never_cache
 def buscador_constancias_publico(request):
     constancias = None
@@ -720,19 +569,18 @@ def buscador_constancias_publico(request):
     
     if request.method == 'POST':
         email_query = request.POST.get('email')
+
+        espera = esperar_limite(request, 'buscador', settings.CONSTANCIAS_LIMITE_BUSQUEDAS_POR_MINUTO)
+        if espera:
+            messages.error(request, f"Demasiadas búsquedas seguidas. Intenta de nuevo en {espera} segundos.")
+            response = render(request, 'users/buscador.html', {'email': email_query}, status=429)
+            response['Retry-After'] = str(espera)
+            return response
+
+        # Constancias de los últimos 40 días, de la caché si el participante no ha cambiado
+        constancias = buscar_constancias(email_query)
         
-        # 1. Ajustamos la fecha para que cubra desde el 13 de febrero (aprox 40 días)
-        hace_40_dias = timezone.now().date() - timedelta(days=40)
-        
-        # 2. El FILTRO CORRECTO:
-        # 'participante' es el nombre del campo en el modelo Constancia
-        # 'email' es el nombre del campo en tu modelo Participante
-        constancias = Constancia.objects.filter(
-            participante__email__iexact=email_query, 
-            fecha_emision__gte=hace_40_dias
-        )
-        
-        if not constancias.exists():
+        if not constancias:
             messages.error(request, f"No se encontraron constancias recientes para: {email_query}")
             
     return render(request, 'users/buscador.html', {
@@ -741,39 +589,44 @@ def buscador_constancias_publico(request):
     })
 
 
-
-from django.contrib.auth import logout as auth_logout
-
-def logout_view(request):
-    # 1. Limpiamos los datos específicos que guardamos en la sesión
-    # (por si acaso quedaron rastros del webinar)
-    request.session.flush() 
-    
-    # 2. Cerramos la sesión del usuario en Django
-    auth_logout(request)
-    
-    # 3. Redirigimos al buscador público o al login
-    return redirect('users:buscador_publico')
-
 def descargar_pdf_publico(request, pk):
-    # Calculamos la fecha de corte: hoy menos 20 días
-    hace_40_dias = timezone.now().date() - timedelta(days=40)
-    
+    espera = esperar_limite(request, 'descarga', settings.CONSTANCIAS_LIMITE_DESCARGAS_POR_MINUTO)
+    if espera:
+        response = HttpResponse(
+            "Demasiadas descargas seguidas. Intenta de nuevo en unos segundos.",
+            status=429, content_type='text/plain; charset=utf-8',
+        )
+        response['Retry-After'] = str(espera)
+        return response
+
     try:
-        # IMPORTANTE: Usar la variable hace_20_dias aquí
-        constancia = Constancia.objects.get(pk=pk, fecha_emision__gte=hace_40_dias)
-        
-        pdf_bytes = _generar_pdf_bytes(constancia)
-        
-        if pdf_bytes:
-            response = HttpResponse(pdf_bytes, content_type='application/pdf')
+        constancia = Constancia.objects.select_related(
+            'participante', 'curso', 'firma_gerente', 'firma_especialista'
+        ).get(pk=pk, fecha_emision__gte=fecha_corte())
+
+        # Si el navegador ya tiene esta misma versión, no hace falta abrir el PDF
+        etag, modificado = validadores_pdf(constancia)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=int(modificado.timestamp()) if modificado else None,
+        )
+        if response is None:
+            pdf_file = abrir_pdf_constancia(constancia)
+            if not pdf_file:
+                messages.error(request, "Error al generar el archivo PDF.")
+                return redirect('users:buscador_publico')
             # Mejora: El nombre del archivo ahora incluye el nombre del participante
             filename = f"Constancia_{constancia.participante.nombre_completo}.pdf"
-            response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            return response
-        else:
-            messages.error(request, "Error al generar el archivo PDF.")
-            return redirect('users:buscador_publico')
+            response = FileResponse(pdf_file, as_attachment=True, filename=filename, content_type='application/pdf')
+            if modificado is None:
+                # Recién generado: ahora ya tiene fecha en el almacén
+                _, modificado = validadores_pdf(constancia)
+            if modificado:
+                response['Last-Modified'] = http_date(modificado.timestamp())
+
+        response['ETag'] = etag
+        # El navegador puede guardarlo, pero debe revalidar cada vez
+        response['Cache-Control'] = 'private, no-cache'
+        return response
 
     except Constancia.DoesNotExist:
         messages.error(request, "El enlace ha expirado o no es válido (máximo 20 días).")
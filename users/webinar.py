@@ -0,0 +1,151 @@
+# users/webinar.py
+from datetime import timedelta
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .emision import generar_codigos
+from .importar import IndiceInstituciones
+from .models import AsistenteWebinar, Constancia, Curso, Evaluador, ImportacionWebinar, Participante
+from .publico import invalidar_participantes
+
+# Minutos mínimos de conexión para recibir constancia
+MINUTOS_MINIMOS = 30
+
+
+def emitir_constancias_webinar(event_data, participantes):
+    """
+    Crea el curso del webinar, los participantes y sus constancias en una
+    sola transacción. Regresa (curso, número de constancias creadas).
+
+    Todo se hace por conjuntos: el número de consultas no depende de cuántos
+    asistentes haya (salvo los bloques en que Django parte cada inserción).
+    """
+    # Un asistente por email (si viene repetido, gana el último nombre)
+    por_email = {p_data['email']: p_data for p_data in participantes}
+
+    with transaction.atomic():
+
+        # 1. Crear el Curso en la Base de Datos
+        curso = Curso.objects.create(
+            nombre=event_data['curso_nombre'],
+        )
+
+        # 2. Obtener los Firmantes (Evaluador)
+        # Especialista: Usamos el ID que guardaste en el paso 1
+        firma_e_id = event_data.get('firma_especialista_id')
+        firma_especialista = Evaluador.objects.filter(id=firma_e_id).first() if firma_e_id else None
+
+        # Gerente: Buscamos al Evaluador que tenga es_gerente=True (según tu models.py)
+        firma_gerente = Evaluador.objects.filter(es_gerente=True).first()
+
+        # 3. Participantes: los que ya existen se traen de una vez, los nuevos se insertan juntos
+        existentes = Participante.objects.in_bulk(list(por_email), field_name='email')
+
+        # La institución viene como texto libre: se busca por nombre normalizado o se crea
+        instituciones = IndiceInstituciones()
+        instituciones.resolver(p_data.get('institucion', '') for p_data in por_email.values())
+
+        cambiados = []
+        for email, participante in existentes.items():
+            nombre = por_email[email]['nombre_completo']
+            institucion_id = participante.institucion_id or instituciones.id_de(por_email[email].get('institucion'))
+            if participante.nombre_completo != nombre or participante.institucion_id != institucion_id:
+                participante.nombre_completo = nombre
+                participante.institucion_id = institucion_id
+                cambiados.append(participante)
+        if cambiados:
+            Participante.objects.bulk_update(cambiados, ['nombre_completo', 'institucion'])
+
+        nuevos = [
+            Participante(
+                email=email, nombre_completo=p_data['nombre_completo'],
+                institucion_id=instituciones.id_de(p_data.get('institucion')),
+            )
+            for email, p_data in por_email.items()
+            if email not in existentes
+        ]
+        if nuevos:
+            Participante.objects.bulk_create(nuevos)
+            if any(p.pk is None for p in nuevos):
+                # Backends que no regresan los IDs al insertar
+                existentes = Participante.objects.in_bulk(list(por_email), field_name='email')
+            else:
+                existentes.update((p.email, p) for p in nuevos)
+
+        # 4. Constancias, con códigos ya verificados contra la tabla
+        codigos = generar_codigos(len(por_email))
+        Constancia.objects.bulk_create([
+            Constancia(
+                participante=existentes[email],
+                curso=curso,
+                fecha_inicio=event_data['fecha_inicio'],
+                fecha_termino=event_data['fecha_termino'],
+                duracion_en_horas=event_data['duracion_en_horas'],
+                firma_gerente=firma_gerente,
+                firma_especialista=firma_especialista,
+                codigo_verificacion=codigo,
+                es_webinar=True # Marcamos que viene del flujo de Webinar
+            )
+            for email, codigo in zip(por_email, codigos)
+        ])
+        # bulk_create/bulk_update no mandan señales: avisamos al buscador público directamente
+        invalidar_participantes(p.pk for p in existentes.values())
+
+    return curso, len(por_email)
+
+
+def crear_importacion(usuario, datos_evento, participantes_raw):
+    """
+    Guarda el reporte ya leído como `ImportacionWebinar` con sus asistentes,
+    insertándolos por bloques. Regresa la importación.
+    """
+    horas = getattr(settings, 'CONSTANCIAS_IMPORTACION_WEBINAR_HORAS', 24)
+    with transaction.atomic():
+        importacion = ImportacionWebinar.objects.create(
+            creado_por=usuario,
+            curso_nombre=datos_evento['curso_nombre'],
+            fecha_inicio=datos_evento['fecha_inicio'],
+            fecha_termino=datos_evento['fecha_termino'],
+            duracion_en_horas=datos_evento['duracion_en_horas'],
+            firma_especialista=datos_evento['firma_especialista'],
+            expira=timezone.now() + timedelta(hours=horas),
+        )
+        asistentes = (
+            AsistenteWebinar(
+                importacion=importacion,
+                email=email,
+                nombre_completo=data['nombre_completo'],
+                institucion=data['institucion'],
+                duracion_total=data['duracion_total'],
+                califica=data['duracion_total'] >= MINUTOS_MINIMOS,
+            )
+            for email, data in participantes_raw.items()
+        )
+        tamano = getattr(settings, 'CONSTANCIAS_IMPORTACION_BLOQUE', 500)
+        while bloque := list(islice(asistentes, tamano)):
+            AsistenteWebinar.objects.bulk_create(bloque)
+            for asistente in bloque:
+                if asistente.califica:
+                    importacion.calificados += 1
+                else:
+                    importacion.no_calificados += 1
+        importacion.save(update_fields=['calificados', 'no_calificados'])
+    return importacion
+
+
+def participantes_importacion(importacion):
+    """Asistentes que califican, con la forma que espera `emitir_constancias_webinar`."""
+    return list(
+        importacion.asistentes.filter(califica=True)
+        .order_by('pk')
+        .values('email', 'nombre_completo', 'institucion', 'duracion_total')
+    )
+
+
+def limpiar_importaciones_expiradas():
+    """Borra las importaciones que nadie confirmó a tiempo. Regresa cuántas."""
+    borradas, _ = ImportacionWebinar.objects.filter(expira__lt=timezone.now()).delete()
+    return borradas
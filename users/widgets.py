@@ -0,0 +1,46 @@
+# users/widgets.py
+from django import forms
+from django.urls import reverse
+
+
+class SelectorRemoto(forms.Select):
+    """
+    <select> que solo lleva como opciones lo ya elegido (una consulta por
+    los IDs de `value`); el resto lo busca el navegador en la vista JSON
+    `url_busqueda` mientras se escribe. Así la página pesa lo mismo con diez
+    participantes que con cien mil.
+
+    La vista debe regresar {"resultados": [{"id": ..., "texto": ...}], "mas": bool}
+    y aceptar los parámetros `q` y `pagina`.
+    """
+    template_name = 'users/widgets/selector_remoto.html'
+
+    def __init__(self, url_busqueda, attrs=None):
+        super().__init__(attrs)
+        self.url_busqueda = url_busqueda
+
+    def use_required_attribute(self, initial):
+        # El <select> va oculto: el navegador no podría señalarlo; lo valida el formulario
+        return False
+
+    def get_context(self, name, value, attrs):
+        context = super().get_context(name, value, attrs)
+        context['widget']['url_busqueda'] = reverse(self.url_busqueda)
+        context['widget']['multiple'] = self.allow_multiple_selected
+        return context
+
+    def optgroups(self, name, value, attrs=None):
+        # Lo que no sea un ID (datos alterados) ni se consulta; el campo ya lo marca como inválido
+        elegidos = {str(v) for v in value if str(v).isdigit()}
+        if not elegidos:
+            return []
+        campo = self.choices.field
+        opciones = [
+            self.create_option(name, obj.pk, campo.label_from_instance(obj), True, indice)
+            for indice, obj in enumerate(campo.queryset.filter(pk__in=elegidos))
+        ]
+        return [(None, opciones, 0)]
+
+
+class SelectorRemotoMultiple(SelectorRemoto, forms.SelectMultiple):
+    pass
@@ -0,0 +1,107 @@
+# users/zip_streaming.py
+"""
+ZIP armado al vuelo para StreamingHttpResponse.
+
+Como la salida no se puede "rebobinar", zipfile escribe cada entrada con
+data descriptor (tamaños y CRC al final de la entrada) y forzamos ZIP64
+para no tener límite de tamaño. Nunca se guarda el archivo completo en memoria.
+"""
+import io
+import zipfile
+
+from django.conf import settings
+from django.contrib import messages
+from django.http import StreamingHttpResponse
+from django.shortcuts import redirect
+
+from .lotes import cargar_constancias
+from .metricas import medir
+from .models import Trabajo
+from .render_paralelo import generar_pdfs_paralelo
+
+TAMANO_TROZO = 64 * 1024
+
+
+class _SalidaSinRetroceso(io.RawIOBase):
+    """Acumula lo que escribe zipfile hasta que lo mandamos al navegador."""
+
+    def __init__(self):
+        self._partes = []
+
+    def writable(self):
+        return True
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes.clear()
+        return datos
+
+
+def zip_en_streaming(entradas):
+    """
+    Recibe un iterable de (nombre_archivo, contenido_bytes) y produce los
+    bytes del ZIP conforme cada entrada está lista.
+    """
+    salida = _SalidaSinRetroceso()
+    with zipfile.ZipFile(salida, mode='w', compression=zipfile.ZIP_DEFLATED) as zip_file:
+        for nombre, contenido in entradas:
+            with zip_file.open(nombre, mode='w', force_zip64=True) as destino:
+                for i in range(0, len(contenido), TAMANO_TROZO):
+                    with medir('zip'):
+                        destino.write(contenido[i:i + TAMANO_TROZO])
+                    datos = salida.vaciar()
+                    if datos:
+                        yield datos
+            datos = salida.vaciar()
+            if datos:
+                yield datos
+    # Directorio central
+    yield salida.vaciar()
+
+
+def entradas_zip_constancias(constancias, al_avanzar=None, errores=None):
+    """
+    Archivos del ZIP conforme se van generando; las constancias que fallan
+    se reportan al final en errores.txt (y en la lista `errores`, si se pasa).
+    """
+    errores = [] if errores is None else errores
+    for i, (constancia, pdf_bytes, error) in enumerate(generar_pdfs_paralelo(constancias), start=1):
+        if error:
+            errores.append(f"Constancia {constancia.pk} ({constancia.participante.nombre_completo}): {error}")
+        else:
+            filename = f"constancia_{constancia.participante.nombre_completo}_{constancia.pk}.pdf"
+            yield filename, pdf_bytes
+        if al_avanzar:
+            al_avanzar(i)
+    if errores:
+        yield "errores.txt", "\n\n".join(errores).encode('utf-8')
+
+
+def zip_constancias(request, ids, volver):
+    """
+    ZIP en streaming de las constancias `ids`, o un trabajo en segundo plano
+    si son más de CONSTANCIAS_ZIP_DIRECTO_MAX. `volver` es a dónde regresar si
+    no queda nada que descargar. Lo usan el historial y el admin.
+    """
+    # trabajos importa este módulo para armar los ZIP grandes
+    from .trabajos import encolar
+
+    # Las descargas grandes se arman en segundo plano para no agotar el tiempo de la petición
+    if len(set(ids)) > settings.CONSTANCIAS_ZIP_DIRECTO_MAX:
+        trabajo = encolar(Trabajo.TIPO_ZIP, {'ids': ids}, request.user, total=len(set(ids)))
+        return redirect('users:trabajo', pk=trabajo.pk)
+
+    constancias, faltantes = cargar_constancias(ids)
+    if faltantes:
+        messages.warning(request, f"{len(faltantes)} constancias seleccionadas ya no existen y se omitieron.")
+    if not constancias:
+        return redirect(volver)
+    response = StreamingHttpResponse(
+        zip_en_streaming(entradas_zip_constancias(constancias)), content_type='application/zip'
+    )
+    response['Content-Disposition'] = 'attachment; filename="constancias.zip"'
+    return response